@@ -12,11 +12,13 @@ import asyncio
 import tempfile
 import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
+from recodex.cli import run_async
 from recodex.config import RecodeXConfig, WatchFolder, TranscodeProfile
 from recodex.monitoring import FileMonitor
 from recodex.database import DatabaseManager, TranscodeRecord
+from recodex.utils import basename
 
 
 async def demonstrate_file_monitoring_fix():
@@ -49,6 +51,7 @@ async def demonstrate_file_monitoring_fix():
         
         print(f"Starting file monitor for: {watch_path}")
         await file_monitor.start()
+        await file_monitor.ready.wait()
         
         # Create a test file to trigger the event
         test_file = watch_path / "test_video.mp4"
@@ -56,8 +59,11 @@ async def demonstrate_file_monitoring_fix():
         
         print("Created test file, waiting for processing...")
         
-        # Wait a bit for file processing
-        await asyncio.sleep(2)
+        # Wait until the monitor queues a job (fake content may be skipped)
+        try:
+            await asyncio.wait_for(file_monitor._first_job.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
+            pass
         
         # Check if job was added to queue
         queue_size = file_monitor.get_queue_size()
@@ -78,13 +84,14 @@ async def demonstrate_job_management():
     
     # Create temporary database
     with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
-        db_url = f"sqlite:///{temp_db.name}"
+        db_url = f"sqlite+aiosqlite:///{temp_db.name}"
         db_manager = DatabaseManager(db_url)
         await db_manager.initialize()
         
         print("Creating test job records...")
         
         # Create sample jobs
+        now = datetime.now(timezone.utc)
         jobs = [
             TranscodeRecord(
                 input_path="/demo/pending_job.mp4",
@@ -97,7 +104,7 @@ async def demonstrate_job_management():
                 output_path="/demo/completed_job_output.mp4",
                 profile_name="demo_profile",
                 status="completed",
-                completed_at=datetime.utcnow(),
+                completed_at=now,
                 processing_time=45.5,
                 original_size=2000000,
                 final_size=1200000
@@ -111,36 +118,38 @@ async def demonstrate_job_management():
             )
         ]
         
-        # Add jobs to database
-        for job in jobs:
-            await db_manager.add_record(job)
+        # Add jobs to database in a single transaction
+        await db_manager.add_records(jobs)
         
         # Demonstrate job listing features
         print("\n📋 Getting job lists:")
         
-        pending_jobs = await db_manager.get_pending_jobs()
+        # One query returns all three lists, grouped by status
+        grouped = await db_manager.get_jobs_grouped()
+        pending_jobs = grouped["pending"]
+        completed_jobs = grouped["completed"]
+        failed_jobs = grouped["failed"]
+        
         print(f"Pending jobs: {len(pending_jobs)}")
         for job in pending_jobs:
-            print(f"  - {Path(job.input_path).name} (Profile: {job.profile_name})")
+            print(f"  - {basename(job.input_path)} (Profile: {job.profile_name})")
         
-        completed_jobs = await db_manager.get_completed_jobs()
         print(f"Completed jobs: {len(completed_jobs)}")
         for job in completed_jobs:
             space_saved = job.space_saved or 0
             compression = job.compression_ratio or 0
-            print(f"  - {Path(job.input_path).name} (Saved: {space_saved/1024/1024:.1f}MB, Compression: {compression:.2f}x)")
+            print(f"  - {basename(job.input_path)} (Saved: {space_saved/1024/1024:.1f}MB, Compression: {compression:.2f}x)")
         
-        failed_jobs = await db_manager.get_failed_jobs()
         print(f"Failed jobs: {len(failed_jobs)}")
         for job in failed_jobs:
-            print(f"  - {Path(job.input_path).name} (Error: {job.error_message})")
+            print(f"  - {basename(job.input_path)} (Error: {job.error_message})")
         
         # Demonstrate job reprocessing
         print("\n🔄 Demonstrating job reprocessing:")
         
         if completed_jobs:
             job_to_reprocess = completed_jobs[0]
-            print(f"Reprocessing completed job: {Path(job_to_reprocess.input_path).name}")
+            print(f"Reprocessing completed job: {basename(job_to_reprocess.input_path)}")
             
             reprocess_result = await db_manager.reprocess_job(job_to_reprocess.id)
             print(f"✅ Reprocessing successful! New job ID: {reprocess_result['id']}")
@@ -151,7 +160,7 @@ async def demonstrate_job_management():
         
         if failed_jobs:
             job_to_reprocess = failed_jobs[0]
-            print(f"Reprocessing failed job: {Path(job_to_reprocess.input_path).name}")
+            print(f"Reprocessing failed job: {basename(job_to_reprocess.input_path)}")
             
             reprocess_result = await db_manager.reprocess_job(job_to_reprocess.id)
             print(f"✅ Reprocessing successful! New job ID: {reprocess_result['id']}")
@@ -180,6 +189,7 @@ def demonstrate_web_features():
     print("   - One-click reprocessing from the web interface")
     print()
     print("✅ New API endpoints:")
+    print("   - GET /api/jobs (pending, completed and failed in one request)")
     print("   - GET /api/jobs/pending")
     print("   - GET /api/jobs/completed") 
     print("   - GET /api/jobs/failed")
@@ -209,4 +219,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_async(main())
\ No newline at end of file
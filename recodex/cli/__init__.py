@@ -2,6 +2,9 @@
 
 import asyncio
 import logging
+import os
+import shutil
+import subprocess
 import sys
 from pathlib import Path
 from typing import Optional
@@ -14,11 +17,27 @@ from rich.panel import Panel
 from rich.text import Text
 
 from ..config import RecodeXConfig, load_config, get_config_path
+from ..utils import basename
 from ..workers import RecodeXService
 
 console = Console()
 
 
+def run_async(coro):
+    """Run a coroutine to completion, on uvloop when it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(coro)
+    
+    uvloop.install()
+    return asyncio.run(coro)
+
+
 def setup_logging(log_level: str, log_file: Optional[Path] = None):
     """Setup logging configuration."""
     level = getattr(logging, log_level.upper(), logging.INFO)
@@ -39,6 +58,15 @@ def setup_logging(log_level: str, log_file: Optional[Path] = None):
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
 
 
+def print_table(table: Table):
+    """Print a table, paging it when it is taller than the terminal."""
+    if console.is_terminal and table.row_count > console.height:
+        with console.pager(styles=True):
+            console.print(table)
+    else:
+        console.print(table)
+
+
 @click.group()
 @click.option('--config', '-c', type=click.Path(path_type=Path), help='Configuration file path')
 @click.option('--log-level', default='INFO', help='Logging level')
@@ -109,7 +137,7 @@ def start(ctx):
     
     # Run the service
     try:
-        asyncio.run(run_service())
+        run_async(run_service())
     except KeyboardInterrupt:
         pass
 
@@ -149,7 +177,7 @@ def web(ctx):
     
     # Run the web interface
     try:
-        asyncio.run(run_web_only())
+        run_async(run_web_only())
     except KeyboardInterrupt:
         pass
 
@@ -179,7 +207,7 @@ def status(ctx):
                 ", ".join(folder.extensions)
             )
         
-        console.print(table)
+        print_table(table)
     else:
         console.print("[yellow]No watch folders configured[/yellow]")
     
@@ -201,7 +229,7 @@ def status(ctx):
                 "Yes" if profile.hardware_accel else "No"
             )
         
-        console.print(table)
+        print_table(table)
     else:
         console.print("[yellow]No profiles configured[/yellow]")
 
@@ -243,7 +271,7 @@ def config_init(ctx):
             return
     
     # Create default configuration
-    default_config = RecodeXConfig().get_default_config()
+    default_config = RecodeXConfig.get_default_config()
     
     # Ensure config directory exists
     config_path.parent.mkdir(parents=True, exist_ok=True)
@@ -267,21 +295,18 @@ def config_edit(ctx):
         else:
             return
     
-    # Try to open with default editor
+    # Open with the user's editor ($VISUAL/$EDITOR, resolved by click)
     try:
-        import os
-        import sys
-        if sys.platform.startswith('linux'):
-            editor = os.environ.get('EDITOR', 'nano')
-        elif sys.platform == 'darwin':
-            editor = os.environ.get('EDITOR', 'open')
-        else:
-            editor = os.environ.get('EDITOR', 'notepad')
-        os.system(f'{editor} {config_path}')
+        click.edit(filename=str(config_path), require_save=False)
         console.print("[green]Configuration edited.[/green]")
-    except Exception as e:
-        console.print(f"[red]Error opening editor: {e}[/red]")
-        console.print(f"Please manually edit: {config_path}")
+    except click.ClickException:
+        editor = shutil.which(os.environ.get('EDITOR', 'nano')) or 'nano'
+        try:
+            subprocess.run([editor, str(config_path)], check=True)
+            console.print("[green]Configuration edited.[/green]")
+        except (OSError, subprocess.CalledProcessError) as e:
+            console.print(f"[red]Error opening editor: {e}[/red]")
+            console.print(f"Please manually edit: {config_path}")
 
 
 @cli.command()
@@ -325,14 +350,7 @@ def transcode(ctx, input_path: Path, profile: str, output: Optional[Path], dry_r
                 console.print(f"[green]Job added:[/green] {job['input_path']} -> {job['output_path']}")
                 
                 # Wait for job to complete
-                while True:
-                    status = service.get_status()
-                    active_jobs = status.get('workers', {}).get('workers', [])
-                    
-                    if not any(worker['current_job']['status'] == 'running' for worker in active_jobs):
-                        break
-                    
-                    await asyncio.sleep(1)
+                await job['done'].wait()
                 
                 progress.remove_task(task)
                 console.print("[green]Transcoding completed![/green]")
@@ -342,7 +360,7 @@ def transcode(ctx, input_path: Path, profile: str, output: Optional[Path], dry_r
         finally:
             await service.stop()
     
-    asyncio.run(run_transcode())
+    run_async(run_transcode())
 
 
 @cli.command()
@@ -355,7 +373,8 @@ def stats(ctx):
         service = RecodeXService(config)
         
         try:
-            await service.start()
+            # Statistics only need the database, not watchers, workers or the web server
+            await service.db_manager.initialize()
             
             with Progress(
                 SpinnerColumn(),
@@ -400,18 +419,18 @@ def stats(ctx):
                 for record in top_savers[:10]:
                     space_saved = record.space_saved or 0
                     top_table.add_row(
-                        Path(record.input_path).name,
+                        basename(record.input_path),
                         f"{space_saved / (1024**2):.1f} MB"
                     )
                 
-                console.print(top_table)
+                print_table(top_table)
             
         except Exception as e:
             console.print(f"[red]Error: {e}[/red]")
         finally:
-            await service.stop()
+            await service.db_manager.close()
     
-    asyncio.run(show_stats())
+    run_async(show_stats())
 
 
 def main():
@@ -1,15 +1,26 @@
 """Configuration management for RecodeX."""
 
+import os
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
 from pydantic import BaseModel, Field, ConfigDict
 from pydantic_settings import BaseSettings
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
 
 class TranscodeProfile(BaseModel):
     """Configuration for a transcoding profile."""
     
+    # Profiles are shared by every job using them; edits replace the whole profile
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     video_codec: str = "h264"  # h264, h265, av1
     video_bitrate: Optional[str] = None  # e.g., "2M", "1500k"
@@ -23,6 +34,18 @@ class TranscodeProfile(BaseModel):
     preset: str = "medium"  # ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow
 
 
+def build_profile_index(profiles: Mapping[str, TranscodeProfile]) -> Mapping[str, Tuple[str, TranscodeProfile]]:
+    """Map every profile key and profile name to its (key, profile) pair.
+    
+    Keys win over names, and the first profile with a given name wins.
+    """
+    index: Dict[str, Tuple[str, TranscodeProfile]] = {}
+    for key, profile in profiles.items():
+        index.setdefault(profile.name, (key, profile))
+    index.update((key, (key, profile)) for key, profile in profiles.items())
+    return MappingProxyType(index)
+
+
 class WatchFolder(BaseModel):
     """Configuration for a watch folder."""
     
@@ -34,6 +57,14 @@ class WatchFolder(BaseModel):
     ])
     output_path: Optional[Path] = None
     delete_original: bool = False
+    
+    @cached_property
+    def ext_set(self) -> FrozenSet[str]:
+        """Lower-cased, dot-prefixed extensions for O(1) membership checks."""
+        return frozenset(
+            ext.lower() if ext.startswith(".") else f".{ext.lower()}"
+            for ext in self.extensions
+        )
 
 
 class DatabaseConfig(BaseModel):
@@ -41,6 +72,8 @@ class DatabaseConfig(BaseModel):
     
     url: str = "sqlite:///recodex.db"
     echo: bool = False
+    # Transcoding decisions for watched files, kept so restarts skip re-probing
+    state_path: Optional[Path] = Path("recodex_state.db")
 
 
 class WebConfig(BaseModel):
@@ -84,30 +117,24 @@ class RecodeXConfig(BaseSettings):
             return cls()
         
         with open(path, "r") as f:
-            data = yaml.safe_load(f) or {}
+            data = yaml.load(f, Loader=SafeLoader) or {}
         
         return cls(**data)
     
     def to_yaml(self, path: Path) -> None:
         """Save configuration to YAML file."""
+        # JSON mode already turns Path objects into plain strings
         data = self.model_dump(mode="json")
         
-        # Convert Path objects to strings for YAML serialization
-        def convert_paths(obj):
-            if isinstance(obj, dict):
-                return {k: convert_paths(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_paths(item) for item in obj]
-            elif isinstance(obj, Path):
-                return str(obj)
-            return obj
-        
-        data = convert_paths(data)
-        
-        with open(path, "w") as f:
+        # Write beside the target and swap it in, so readers never see a half-written file
+        path = Path(path)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "w") as f:
             yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+        os.replace(temp_path, path)
     
-    def get_default_config(self) -> "RecodeXConfig":
+    @classmethod
+    def get_default_config(cls) -> "RecodeXConfig":
         """Create a default configuration."""
         default_profiles = {
             "high_quality": TranscodeProfile(
@@ -138,7 +165,12 @@ class RecodeXConfig(BaseSettings):
             )
         }
         
-        return RecodeXConfig(profiles=default_profiles)
+        return cls(profiles=default_profiles)
+
+
+# Parsed configs keyed by path, along with the file's (mtime, size) when loaded;
+# the size catches quick edits on filesystems with coarse mtimes
+_CONFIG_CACHE: Dict[Path, Tuple[Tuple[int, int], RecodeXConfig]] = {}
 
 
 def get_config_path() -> Path:
@@ -151,11 +183,27 @@ def load_config(config_path: Optional[Path] = None) -> RecodeXConfig:
     if config_path is None:
         config_path = get_config_path()
     
-    if config_path.exists():
-        return RecodeXConfig.from_yaml(config_path)
+    try:
+        st = config_path.stat()
+        version = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        version = None
+    
+    if version is not None:
+        # Reuse the previously parsed config while the file is unchanged
+        cached = _CONFIG_CACHE.get(config_path)
+        if cached and cached[0] == version:
+            # Callers edit their config in place, so never hand out the cached one
+            return cached[1].model_copy(deep=True)
+        
+        config = RecodeXConfig.from_yaml(config_path)
     else:
         # Create default config
-        config = RecodeXConfig().get_default_config()
+        config = RecodeXConfig.get_default_config()
         config_path.parent.mkdir(parents=True, exist_ok=True)
         config.to_yaml(config_path)
-        return config
\ No newline at end of file
+        st = config_path.stat()
+        version = (st.st_mtime_ns, st.st_size)
+    
+    _CONFIG_CACHE[config_path] = (version, config)
+    return config.model_copy(deep=True)
\ No newline at end of file
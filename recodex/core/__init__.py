@@ -1,81 +1,135 @@
 """Core transcoding functionality for RecodeX."""
 
 import asyncio
+import functools
 import logging
 import os
+import shutil
 import subprocess
-import tempfile
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
 import ffmpeg
-import psutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 from ..config import TranscodeProfile
 
 logger = logging.getLogger(__name__)
 
+# Render node used for VA-API decoding and encoding
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# Concurrent encode sessions allowed by consumer NVIDIA drivers
+NVENC_SESSION_LIMIT = 2
+
+# ioctl that makes a file share another file's blocks (Btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def _clone_file(source: Path, destination: Path) -> None:
+    """Copy a file, sharing its blocks through a reflink when the filesystem allows it."""
+    if fcntl is not None:
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return
+            except OSError:
+                pass
+    # copyfile uses an in-kernel copy where available
+    shutil.copyfile(source, destination)
+
 
 class HardwareAcceleration:
-    """Hardware acceleration detection and configuration."""
+    """Hardware acceleration detection and configuration.
+    
+    Support is read from ffmpeg itself (``-hwaccels`` and ``-encoders``), so
+    a method is only reported when the installed ffmpeg can actually use it.
+    Results are cached for the lifetime of the process; call
+    ``invalidate_cache()`` to probe again.
+    """
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _probe_ffmpeg() -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """Get the hwaccel methods and encoder names compiled into ffmpeg."""
+        def run(flag: str) -> str:
+            try:
+                result = subprocess.run(
+                    ["ffmpeg", "-hide_banner", flag],
+                    capture_output=True,
+                    text=True,
+                    timeout=5
+                )
+            except (subprocess.TimeoutExpired, OSError):
+                return ""
+            return result.stdout if result.returncode == 0 else ""
+        
+        # "Hardware acceleration methods:" followed by one method per line
+        hwaccels = frozenset(
+            line.strip() for line in run("-hwaccels").splitlines()[1:] if line.strip()
+        )
+        
+        # Encoder lines look like " V....D h264_nvenc   NVIDIA NVENC H.264 encoder"
+        encoders = set()
+        listing = run("-encoders").split(" ------", 1)
+        if len(listing) == 2:
+            for line in listing[1].splitlines():
+                fields = line.split(None, 2)
+                if len(fields) >= 2:
+                    encoders.add(fields[1])
+        
+        return hwaccels, frozenset(encoders)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
     def detect_nvidia() -> bool:
         """Detect NVIDIA GPU with NVENC support."""
-        try:
-            result = subprocess.run(
-                ["nvidia-smi", "--query-gpu=name", "--format=csv,noheader"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return result.returncode == 0 and result.stdout.strip()
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+        hwaccels, encoders = HardwareAcceleration._probe_ffmpeg()
+        return "cuda" in hwaccels and "h264_nvenc" in encoders
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def detect_intel_qsv() -> bool:
         """Detect Intel Quick Sync Video support."""
-        try:
-            # Check for Intel GPU
-            result = subprocess.run(
-                ["lspci", "-nn"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return "Intel" in result.stdout and "VGA" in result.stdout
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            # Try alternative method on non-Linux systems
-            return Path("/dev/dri").exists()
+        hwaccels, encoders = HardwareAcceleration._probe_ffmpeg()
+        return "qsv" in hwaccels and "h264_qsv" in encoders
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def detect_amd_amf() -> bool:
         """Detect AMD AMF support."""
-        try:
-            result = subprocess.run(
-                ["lspci", "-nn"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return "AMD" in result.stdout and ("VGA" in result.stdout or "Display" in result.stdout)
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+        _hwaccels, encoders = HardwareAcceleration._probe_ffmpeg()
+        return "h264_amf" in encoders or "hevc_amf" in encoders
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def detect_vaapi() -> bool:
         """Detect VA-API support."""
-        return Path("/dev/dri").exists()
+        hwaccels, _encoders = HardwareAcceleration._probe_ffmpeg()
+        return "vaapi" in hwaccels and Path("/dev/dri").exists()
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def get_available_accelerations(cls) -> Dict[str, bool]:
-        """Get all available hardware accelerations."""
+        """Get all available hardware accelerations (shared dict; don't modify)."""
         return {
             "nvenc": cls.detect_nvidia(),
             "qsv": cls.detect_intel_qsv(),
             "amf": cls.detect_amd_amf(),
             "vaapi": cls.detect_vaapi(),
         }
+    
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Forget cached detection results, e.g. after hardware changes."""
+        for detector in (
+            cls._probe_ffmpeg, cls.detect_nvidia, cls.detect_intel_qsv, cls.detect_amd_amf, cls.detect_vaapi,
+            cls.get_available_accelerations
+        ):
+            detector.cache_clear()
 
 
 class MediaInfo:
@@ -84,12 +138,16 @@ class MediaInfo:
     def __init__(self, file_path: Path):
         self.file_path = file_path
         self._info: Optional[Dict] = None
+        self._stat: Optional[os.stat_result] = None
     
     async def get_info(self) -> Dict:
         """Get media file information using ffprobe."""
         if self._info is None:
             try:
-                self._info = ffmpeg.probe(str(self.file_path))
+                # ffmpeg.probe blocks on the ffprobe subprocess, so keep it off the loop
+                self._info = await asyncio.get_running_loop().run_in_executor(
+                    None, ffmpeg.probe, str(self.file_path)
+                )
             except ffmpeg.Error as e:
                 logger.error(f"Failed to probe {self.file_path}: {e}")
                 raise
@@ -118,9 +176,11 @@ class MediaInfo:
         duration = format_info.get("duration")
         return float(duration) if duration else None
     
-    async def get_file_size(self) -> int:
+    def get_file_size(self) -> int:
         """Get file size in bytes."""
-        return self.file_path.stat().st_size
+        if self._stat is None:
+            self._stat = os.stat(self.file_path)
+        return self._stat.st_size
     
     async def get_bitrate(self) -> Optional[int]:
         """Get overall bitrate in bits/second."""
@@ -143,9 +203,20 @@ class MediaInfo:
     async def needs_transcoding(self, profile: TranscodeProfile) -> bool:
         """Determine if file needs transcoding based on profile."""
         try:
-            video_codec = await self.get_video_codec()
-            audio_codec = await self.get_audio_codec()
-            bitrate = await self.get_bitrate()
+            # Read everything from one pass over the probe result
+            info = await self.get_info()
+            video_codec = audio_codec = None
+            for stream in info.get("streams", []):
+                codec_type = stream.get("codec_type")
+                if codec_type == "video" and video_codec is None:
+                    video_codec = stream.get("codec_name")
+                elif codec_type == "audio" and audio_codec is None:
+                    audio_codec = stream.get("codec_name")
+                if video_codec and audio_codec:
+                    break
+            
+            bitrate = info.get("format", {}).get("bit_rate")
+            bitrate = int(bitrate) if bitrate else None
             
             # Check video codec
             if video_codec and video_codec.lower() not in [profile.video_codec.lower(), "h264", "h265", "av1"]:
@@ -192,16 +263,35 @@ class MediaInfo:
 class TranscodeJob:
     """A transcoding job with progress tracking."""
     
-    def __init__(self, input_path: Path, output_path: Path, profile: TranscodeProfile):
+    # One instance per queued/running job; slots keep them small and fast to access
+    __slots__ = (
+        "input_path", "output_path", "profile", "outputs", "media_info", "progress", "status",
+        "error_message", "start_time", "end_time", "original_size", "final_size"
+    )
+    
+    def __init__(
+        self,
+        input_path: Path,
+        output_path: Path,
+        profile: TranscodeProfile,
+        media_info: Optional[MediaInfo] = None,
+        outputs: Optional[List[Tuple[Path, TranscodeProfile]]] = None,
+        original_size: Optional[int] = None
+    ):
         self.input_path = input_path
         self.output_path = output_path
         self.profile = profile
+        # Every (output path, profile) rendition produced from the input in one ffmpeg run
+        self.outputs = outputs or [(output_path, profile)]
+        # Probe results from scanning, reused instead of running ffprobe again
+        self.media_info = media_info
         self.progress = 0.0
         self.status = "pending"
         self.error_message: Optional[str] = None
         self.start_time: Optional[float] = None
         self.end_time: Optional[float] = None
-        self.original_size: Optional[int] = None
+        # Known when the scanner already stat'ed the input; filled in by the engine otherwise
+        self.original_size = original_size
         self.final_size: Optional[int] = None
     
     def get_duration(self) -> Optional[float]:
@@ -235,41 +325,37 @@ class TranscodeEngine:
         try:
             job.status = "running"
             job.start_time = asyncio.get_event_loop().time()
-            job.original_size = job.input_path.stat().st_size
+            if job.original_size is None:
+                job.original_size = os.stat(job.input_path).st_size
             
             logger.info(f"Starting transcode: {job.input_path} -> {job.output_path}")
             
-            # Create temporary output file
-            temp_output = job.output_path.with_suffix(f".tmp{job.output_path.suffix}")
-            
-            # Build ffmpeg command
-            input_stream = ffmpeg.input(str(job.input_path))
+            # Create temporary output files
+            temp_outputs = [
+                output_path.with_suffix(f".tmp{output_path.suffix}")
+                for output_path, _profile in job.outputs
+            ]
             
-            # Video encoding options
-            video_options = self._get_video_options(job.profile)
-            audio_options = self._get_audio_options(job.profile)
-            
-            # Build output stream
-            output_args = {**video_options, **audio_options}
-            
-            # Add subtitle options
-            if job.profile.subtitles == "copy":
-                output_args["c:s"] = "copy"
-            elif job.profile.subtitles == "none":
-                output_args["sn"] = None  # No subtitles
-            
-            output_stream = ffmpeg.output(input_stream, str(temp_output), **output_args)
-            
-            # Add overwrite option
-            output_stream = ffmpeg.overwrite_output(output_stream)
-            
-            # Execute ffmpeg
-            process = await self._run_ffmpeg(output_stream, job)
+            if self._is_passthrough(job.input_path, job.outputs):
+                # ffmpeg would only copy every stream into the same container
+                await asyncio.get_event_loop().run_in_executor(
+                    None, _clone_file, job.input_path, temp_outputs[0]
+                )
+                job.progress = 100.0
+                returncode = 0
+            else:
+                # Build ffmpeg command
+                output_stream = self._build_command(job.input_path, job.outputs, temp_outputs)
+                
+                # Execute ffmpeg
+                process = await self._run_ffmpeg(output_stream, job)
+                returncode = process.returncode
             
-            if process.returncode == 0:
-                # Move temp file to final location
-                temp_output.replace(job.output_path)
-                job.final_size = job.output_path.stat().st_size
+            if returncode == 0:
+                # Move temp files to final location
+                for temp_output, (output_path, _profile) in zip(temp_outputs, job.outputs):
+                    temp_output.replace(output_path)
+                job.final_size = sum(output_path.stat().st_size for output_path, _profile in job.outputs)
                 job.status = "completed"
                 job.end_time = asyncio.get_event_loop().time()
                 
@@ -277,12 +363,13 @@ class TranscodeEngine:
                 return True
             else:
                 job.status = "failed"
-                job.error_message = f"FFmpeg failed with return code {process.returncode}"
+                job.error_message = f"FFmpeg failed with return code {returncode}"
                 logger.error(job.error_message)
                 
-                # Clean up temp file
-                if temp_output.exists():
-                    temp_output.unlink()
+                # Clean up temp files
+                for temp_output in temp_outputs:
+                    if temp_output.exists():
+                        temp_output.unlink()
                 
                 return False
                 
@@ -293,6 +380,91 @@ class TranscodeEngine:
             logger.error(f"Transcode failed: {job.input_path}: {e}")
             return False
     
+    def default_concurrency(self) -> int:
+        """Get how many ffmpeg processes are worth running side by side."""
+        if self.hardware_accel.get("nvenc"):
+            return NVENC_SESSION_LIMIT
+        # Software encoders are multithreaded, so leave them cores to use
+        return max(1, (os.cpu_count() or 2) // 2)
+    
+    async def run_many(self, jobs: Sequence[TranscodeJob], concurrency: Optional[int] = None) -> List[bool]:
+        """Execute several jobs concurrently, with at most ``concurrency`` running at once."""
+        semaphore = asyncio.Semaphore(concurrency or self.default_concurrency())
+        
+        async def run(job: TranscodeJob) -> bool:
+            async with semaphore:
+                return await self.transcode(job)
+        
+        return list(await asyncio.gather(*(run(job) for job in jobs)))
+    
+    def _build_command(self, input_path: Path, outputs: List[Tuple[Path, TranscodeProfile]], temp_outputs: List[Path]):
+        """Build one ffmpeg command that writes every requested output.
+        
+        With several outputs the input is decoded once and its video is split
+        to each encoder, instead of decoding the file again per rendition.
+        """
+        output_args = [self._get_output_args(profile) for _path, profile in outputs]
+        
+        # Decode on the encoder's GPU only if every output can take those frames
+        input_options = [self._get_input_options(args) for args in output_args]
+        shared_input_options = input_options[0] if all(
+            options == input_options[0] for options in input_options
+        ) else {}
+        input_stream = ffmpeg.input(str(input_path), **shared_input_options)
+        
+        if len(outputs) == 1:
+            output_stream = ffmpeg.output(input_stream, str(temp_outputs[0]), **output_args[0])
+        else:
+            video_split = input_stream.video.filter_multi_output("split", len(outputs))
+            streams = []
+            for index, (temp_output, args) in enumerate(zip(temp_outputs, output_args)):
+                video = video_split.stream(index)
+                
+                # -vf can't be used on filter_complex outputs, so chain it in the graph
+                video_filter = args.pop("vf", None)
+                if video_filter:
+                    for filter_spec in video_filter.split(","):
+                        name, _, filter_args = filter_spec.partition("=")
+                        video = video.filter(name, filter_args) if filter_args else video.filter(name)
+                
+                mapped = [video, input_stream["a?"]]
+                if "c:s" in args:
+                    mapped.append(input_stream["s?"])
+                args.pop("sn", None)
+                
+                streams.append(ffmpeg.output(*mapped, str(temp_output), **args))
+            output_stream = ffmpeg.merge_outputs(*streams)
+        
+        # Add overwrite option
+        return ffmpeg.overwrite_output(output_stream)
+    
+    @staticmethod
+    def _is_passthrough(input_path: Path, outputs: List[Tuple[Path, TranscodeProfile]]) -> bool:
+        """Whether the job copies every stream unchanged into the input's container."""
+        if len(outputs) != 1:
+            return False
+        
+        output_path, profile = outputs[0]
+        return (
+            profile.video_codec.lower() == "copy"
+            and profile.audio_codec == "copy"
+            and not profile.audio_normalize
+            and profile.subtitles == "copy"
+            and output_path.suffix.lower() == Path(input_path).suffix.lower()
+        )
+    
+    def _get_output_args(self, profile: TranscodeProfile) -> Dict[str, str]:
+        """Get all output options (video, audio and subtitles) for a profile."""
+        output_args = {**self._get_video_options(profile), **self._get_audio_options(profile)}
+        
+        # Add subtitle options
+        if profile.subtitles == "copy":
+            output_args["c:s"] = "copy"
+        elif profile.subtitles == "none":
+            output_args["sn"] = None  # No subtitles
+        
+        return output_args
+    
     def _get_video_options(self, profile: TranscodeProfile) -> Dict[str, str]:
         """Get video encoding options for profile."""
         options = {}
@@ -301,6 +473,10 @@ class TranscodeEngine:
         codec = profile.video_codec.lower()
         hardware_used = False
         
+        if codec == "copy":
+            # Stream copy ignores quality and preset settings
+            return {"c:v": "copy"}
+        
         if profile.hardware_accel and self.hardware_accel.get("nvenc"):
             # NVIDIA NVENC
             if codec in ["h264", "avc"]:
@@ -325,13 +501,15 @@ class TranscodeEngine:
             # VA-API - add initialization filters
             if codec in ["h264", "avc"]:
                 options["c:v"] = "h264_vaapi"
-                options["vaapi_device"] = "/dev/dri/renderD128"
-                options["vf"] = "format=nv12,hwupload"
+                options["vaapi_device"] = VAAPI_DEVICE
+                # GPU-decoded frames pass straight through; software frames get uploaded
+                options["vf"] = "format=nv12|vaapi,hwupload"
                 hardware_used = True
             elif codec in ["h265", "hevc"]:
                 options["c:v"] = "hevc_vaapi"
-                options["vaapi_device"] = "/dev/dri/renderD128"
-                options["vf"] = "format=nv12,hwupload"
+                options["vaapi_device"] = VAAPI_DEVICE
+                # GPU-decoded frames pass straight through; software frames get uploaded
+                options["vf"] = "format=nv12|vaapi,hwupload"
                 hardware_used = True
             else:
                 options["c:v"] = "libx264"
@@ -378,6 +556,28 @@ class TranscodeEngine:
         
         return options
     
+    @staticmethod
+    def _get_input_options(video_options: Dict[str, str]) -> Dict[str, str]:
+        """Get input options that decode on the GPU used by the selected encoder.
+        
+        Decoded frames stay in GPU memory, so a hardware encode avoids copying
+        every frame back and forth. Inputs the GPU cannot decode fall back to
+        software decoding inside ffmpeg.
+        """
+        encoder = video_options.get("c:v", "")
+        
+        if encoder.endswith("_nvenc"):
+            return {"hwaccel": "cuda", "hwaccel_output_format": "cuda"}
+        if encoder.endswith("_qsv"):
+            return {"hwaccel": "qsv", "hwaccel_output_format": "qsv"}
+        if encoder.endswith("_vaapi"):
+            return {
+                "hwaccel": "vaapi",
+                "hwaccel_device": VAAPI_DEVICE,
+                "hwaccel_output_format": "vaapi"
+            }
+        return {}
+    
     def _get_audio_options(self, profile: TranscodeProfile) -> Dict[str, str]:
         """Get audio encoding options for profile."""
         options = {}
@@ -398,23 +598,19 @@ class TranscodeEngine:
     
     async def _run_ffmpeg(self, output_stream, job: TranscodeJob) -> subprocess.CompletedProcess:
         """Run ffmpeg process with progress tracking."""
-        import re
-        
-        # Get ffmpeg command and add progress option
+        # Get ffmpeg command and have it write key=value progress blocks to stdout,
+        # leaving stderr for log messages only
         cmd = ffmpeg.compile(output_stream)
-        # Add progress reporting to stderr
-        cmd = cmd + ['-progress', 'pipe:2']
+        cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + cmd[1:]
         
         logger.debug(f"FFmpeg command: {' '.join(cmd)}")
         
         # Get duration from input file for progress calculation
         duration = None
         try:
-            probe = ffmpeg.probe(str(job.input_path))
-            format_info = probe.get('format', {})
-            duration_str = format_info.get('duration')
-            if duration_str:
-                duration = float(duration_str)
+            if job.media_info is None:
+                job.media_info = MediaInfo(job.input_path)
+            duration = await job.media_info.get_duration()
         except Exception as e:
             logger.warning(f"Could not get duration for progress tracking: {e}")
         
@@ -425,53 +621,42 @@ class TranscodeEngine:
             stderr=asyncio.subprocess.PIPE
         )
         
-        # Read stderr line by line for progress tracking
-        stderr_lines = []
         stdout_data = b''
+        stderr_data = b''
         
-        # Read stdout (shouldn't have much)
+        # Read progress records from stdout
         async def read_stdout():
-            nonlocal stdout_data
-            if process.stdout:
-                stdout_data = await process.stdout.read()
-        
-        # Read stderr for progress
-        async def read_stderr():
-            if not process.stderr:
+            if not process.stdout:
                 return
             
+            duration_us = duration * 1_000_000 if duration else None
             while True:
-                line = await process.stderr.readline()
+                line = await process.stdout.readline()
                 if not line:
                     break
                 
-                line_str = line.decode('utf-8', errors='replace').strip()
-                stderr_lines.append(line_str)
-                
-                # Parse progress information
-                if duration and 'time=' in line_str:
-                    # Look for time=HH:MM:SS.mmm format
-                    time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line_str)
-                    if time_match:
-                        hours = int(time_match.group(1))
-                        minutes = int(time_match.group(2))
-                        seconds = float(time_match.group(3))
-                        current_time = hours * 3600 + minutes * 60 + seconds
-                        
-                        # Calculate progress percentage
-                        progress = min(100.0, (current_time / duration) * 100)
-                        job.progress = progress
-                        
-                        logger.debug(f"FFmpeg progress: {progress:.1f}% ({current_time:.1f}s / {duration:.1f}s)")
-        
-        # Start reading both streams
-        await asyncio.gather(read_stdout(), read_stderr())
-        
-        # Wait for process to complete
-        returncode = await process.wait()
-        
-        # Join stderr lines
-        stderr_data = '\n'.join(stderr_lines).encode('utf-8')
+                # out_time_us=<microseconds>, or N/A before the first frame
+                if duration_us and line.startswith(b'out_time_us='):
+                    value = line[12:].strip()
+                    if value.isdigit():
+                        job.progress = min(100.0, int(value) / duration_us * 100)
+        
+        # Collect stderr for error reporting
+        async def read_stderr():
+            nonlocal stderr_data
+            if process.stderr:
+                stderr_data = await process.stderr.read()
+        
+        # Start reading both streams; the readers stop on EOF once ffmpeg exits
+        readers = asyncio.gather(read_stdout(), read_stderr())
+        
+        # Wait for process to complete, then collect what the readers drained
+        try:
+            returncode = await process.wait()
+        except BaseException:
+            readers.cancel()
+            raise
+        await readers
         
         # Create a completed process object
         completed_process = subprocess.CompletedProcess(
@@ -479,9 +664,9 @@ class TranscodeEngine:
         )
         
         if completed_process.returncode != 0:
-            logger.error(f"FFmpeg stderr: {stderr_data.decode()}")
+            logger.error(f"FFmpeg stderr: {stderr_data.decode('utf-8', errors='replace')}")
         else:
             # Set progress to 100% on successful completion
             job.progress = 100.0
         
-        return completed_process
\ No newline at end of file
+        return completed_process
@@ -1,23 +1,48 @@
 """Database models and statistics tracking for RecodeX."""
 
 import asyncio
-from datetime import datetime
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Index, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import func, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.sql import case, func, literal, select, text, update
 import aiosqlite
 
 Base = declarative_base()
 
+# Upper bound on records committed together by the background writer
+WRITE_BATCH_MAX = 64
+
+# Session shared by everything running inside DatabaseManager.session_scope(),
+# together with the task that opened it (child tasks inherit the variable)
+_current_session: ContextVar[Optional[Tuple[asyncio.Task, AsyncSession]]] = ContextVar(
+    "recodex_db_session", default=None
+)
+
 
 class TranscodeRecord(Base):
     """Record of a completed transcoding job."""
     
     __tablename__ = "transcode_records"
+    __table_args__ = (
+        # Job lists filter on status and show the newest jobs first
+        Index("ix_transcode_status_id", "status", text("id DESC")),
+        # The completed list is ordered by completion time
+        Index("ix_transcode_status_completed", "status", "completed_at"),
+        # Statistics filter on status, then aggregate sizes or sort by recency/savings
+        Index("ix_transcode_status_created", "status", "created_at"),
+        Index("ix_transcode_status_sizes", "status", "original_size", "final_size"),
+        Index("ix_transcode_status_space_saved", "status", "space_saved"),
+    )
     
     id = Column(Integer, primary_key=True)
     input_path = Column(String, nullable=False)
@@ -25,7 +50,7 @@ class TranscodeRecord(Base):
     profile_name = Column(String, nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     started_at = Column(DateTime)
     completed_at = Column(DateTime)
     
@@ -44,6 +69,9 @@ class TranscodeRecord(Base):
     processing_time = Column(Float)  # seconds
     hardware_accel_used = Column(Boolean, default=False)
     
+    # Derived from the sizes on write so statistics can sum and sort on an index
+    space_saved = Column(Integer)  # bytes
+    
     @property
     def compression_ratio(self) -> Optional[float]:
         """Get compression ratio (original_size / final_size)."""
@@ -51,13 +79,6 @@ class TranscodeRecord(Base):
             return self.original_size / self.final_size
         return None
     
-    @property
-    def space_saved(self) -> Optional[int]:
-        """Get space saved in bytes."""
-        if self.original_size and self.final_size:
-            return max(0, self.original_size - self.final_size)
-        return None
-    
     @property
     def space_saved_percentage(self) -> Optional[float]:
         """Get space saved as percentage."""
@@ -66,11 +87,66 @@ class TranscodeRecord(Base):
         return None
 
 
+def _space_saved(original_size, final_size):
+    """SQL expression for the bytes saved between two size expressions."""
+    return case(
+        (original_size.is_(None) | final_size.is_(None), None),
+        (original_size > final_size, original_size - final_size),
+        else_=0
+    )
+
+
+@event.listens_for(TranscodeRecord, "before_insert")
+@event.listens_for(TranscodeRecord, "before_update")
+def _set_space_saved(mapper, connection, record):
+    """Keep the stored space_saved in step with the sizes."""
+    if record.original_size is not None and record.final_size is not None:
+        record.space_saved = max(0, record.original_size - record.final_size)
+    else:
+        record.space_saved = None
+
+
+# How each job list is sorted: (column, descending). Pending jobs run oldest
+# first, so that list starts with the next ones to run.
+JOB_LIST_ORDER = {
+    "pending": (TranscodeRecord.created_at, False),
+    "completed": (TranscodeRecord.completed_at, True),
+    "failed": (TranscodeRecord.created_at, True),
+}
+
+
+def _job_list_order(status: str):
+    """ORDER BY clause of a status's job list."""
+    column, descending = JOB_LIST_ORDER[status]
+    return column.desc() if descending else column.asc()
+
+
+def current_session() -> AsyncSession:
+    """Get the session of the enclosing DatabaseManager.session_scope()."""
+    session = _scoped_session()
+    if session is None:
+        raise RuntimeError("No database session in scope")
+    return session
+
+
+def _scoped_session() -> Optional[AsyncSession]:
+    """Get the current task's scoped session, if it opened one."""
+    scope = _current_session.get()
+    if scope is not None and scope[0] is asyncio.current_task():
+        return scope[1]
+    return None
+
+
 class Statistics:
     """Statistics calculations and aggregations."""
     
-    def __init__(self, session: AsyncSession):
-        self.session = session
+    def __init__(self, session: Optional[AsyncSession] = None):
+        self._session = session
+    
+    @property
+    def session(self) -> AsyncSession:
+        """Session given at construction, otherwise the one currently in scope."""
+        return self._session if self._session is not None else current_session()
     
     async def get_total_processed(self) -> int:
         """Get total number of files processed."""
@@ -83,13 +159,8 @@ class Statistics:
     async def get_total_space_saved(self) -> int:
         """Get total space saved in bytes."""
         result = await self.session.execute(
-            select(func.sum(TranscodeRecord.original_size - TranscodeRecord.final_size))
-            .where(
-                TranscodeRecord.status == "completed",
-                TranscodeRecord.original_size.isnot(None),
-                TranscodeRecord.final_size.isnot(None),
-                TranscodeRecord.original_size > TranscodeRecord.final_size
-            )
+            select(func.sum(TranscodeRecord.space_saved))
+            .where(TranscodeRecord.status == "completed")
         )
         return result.scalar() or 0
     
@@ -106,8 +177,8 @@ class Statistics:
     
     async def get_average_compression_ratio(self) -> float:
         """Get average compression ratio."""
-        records = await self.session.execute(
-            select(TranscodeRecord.original_size, TranscodeRecord.final_size)
+        result = await self.session.execute(
+            select(func.avg(TranscodeRecord.original_size * 1.0 / TranscodeRecord.final_size))
             .where(
                 TranscodeRecord.status == "completed",
                 TranscodeRecord.original_size.isnot(None),
@@ -115,12 +186,7 @@ class Statistics:
                 TranscodeRecord.final_size > 0
             )
         )
-        
-        ratios = []
-        for original, final in records:
-            ratios.append(original / final)
-        
-        return sum(ratios) / len(ratios) if ratios else 0.0
+        return result.scalar() or 0.0
     
     async def get_average_processing_time(self) -> float:
         """Get average processing time in seconds."""
@@ -133,43 +199,62 @@ class Statistics:
         )
         return result.scalar() or 0.0
     
-    async def get_top_space_savers(self, limit: int = 10) -> List[TranscodeRecord]:
-        """Get top files by space saved."""
-        result = await self.session.execute(
+    @staticmethod
+    def _top_space_savers_query(limit: int):
+        """Build the query for the files that saved the most space."""
+        return (
             select(TranscodeRecord)
             .where(
                 TranscodeRecord.status == "completed",
-                TranscodeRecord.original_size.isnot(None),
-                TranscodeRecord.final_size.isnot(None),
-                TranscodeRecord.original_size > TranscodeRecord.final_size
+                TranscodeRecord.space_saved > 0
             )
-            .order_by((TranscodeRecord.original_size - TranscodeRecord.final_size).desc())
+            .order_by(TranscodeRecord.space_saved.desc())
             .limit(limit)
         )
-        return result.scalars().all()
     
-    async def get_recent_records(self, limit: int = 20) -> List[TranscodeRecord]:
-        """Get recent transcoding records."""
-        result = await self.session.execute(
+    @staticmethod
+    def _recent_records_query(limit: int):
+        """Build the query for the most recently created records."""
+        return (
             select(TranscodeRecord)
             .order_by(TranscodeRecord.created_at.desc())
             .limit(limit)
         )
+    
+    async def get_top_space_savers(self, limit: int = 10) -> List[TranscodeRecord]:
+        """Get top files by space saved."""
+        result = await self.session.execute(self._top_space_savers_query(limit))
         return result.scalars().all()
     
+    async def iter_top_space_savers(self, limit: int = 10) -> AsyncIterator[TranscodeRecord]:
+        """Yield top files by space saved without buffering the whole result."""
+        result = await self.session.stream_scalars(self._top_space_savers_query(limit))
+        async for record in result:
+            yield record
+    
+    async def get_recent_records(self, limit: int = 20) -> List[TranscodeRecord]:
+        """Get recent transcoding records."""
+        result = await self.session.execute(self._recent_records_query(limit))
+        return result.scalars().all()
+    
+    async def iter_recent_records(self, limit: int = 20) -> AsyncIterator[TranscodeRecord]:
+        """Yield recent transcoding records without buffering the whole result."""
+        result = await self.session.stream_scalars(self._recent_records_query(limit))
+        async for record in result:
+            yield record
+    
     async def get_statistics_by_profile(self) -> dict:
         """Get statistics grouped by profile."""
         result = await self.session.execute(
             select(
                 TranscodeRecord.profile_name,
                 func.count(TranscodeRecord.id).label("count"),
-                func.sum(TranscodeRecord.original_size - TranscodeRecord.final_size).label("space_saved"),
+                func.sum(TranscodeRecord.space_saved).label("space_saved"),
                 func.avg(TranscodeRecord.processing_time).label("avg_time")
             )
             .where(
                 TranscodeRecord.status == "completed",
-                TranscodeRecord.original_size.isnot(None),
-                TranscodeRecord.final_size.isnot(None)
+                TranscodeRecord.space_saved.isnot(None)
             )
             .group_by(TranscodeRecord.profile_name)
         )
@@ -207,31 +292,17 @@ class Statistics:
     
     async def get_queue_status(self) -> dict:
         """Get current queue status."""
-        # Pending jobs
-        pending_result = await self.session.execute(
-            select(func.count(TranscodeRecord.id))
-            .where(TranscodeRecord.status == "pending")
-        )
-        pending_count = pending_result.scalar() or 0
-        
-        # Running jobs
-        running_result = await self.session.execute(
-            select(func.count(TranscodeRecord.id))
-            .where(TranscodeRecord.status == "running")
-        )
-        running_count = running_result.scalar() or 0
-        
-        # Failed jobs
-        failed_result = await self.session.execute(
-            select(func.count(TranscodeRecord.id))
-            .where(TranscodeRecord.status == "failed")
+        result = await self.session.execute(
+            select(TranscodeRecord.status, func.count(TranscodeRecord.id))
+            .where(TranscodeRecord.status.in_(["pending", "running", "failed"]))
+            .group_by(TranscodeRecord.status)
         )
-        failed_count = failed_result.scalar() or 0
+        counts = dict(result.all())
         
         return {
-            "pending": pending_count,
-            "running": running_count,
-            "failed": failed_count
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0)
         }
     
     async def get_pending_jobs(self, limit: int = 50) -> List[TranscodeRecord]:
@@ -239,7 +310,7 @@ class Statistics:
         result = await self.session.execute(
             select(TranscodeRecord)
             .where(TranscodeRecord.status == "pending")
-            .order_by(TranscodeRecord.created_at.asc())
+            .order_by(_job_list_order("pending"))
             .limit(limit)
         )
         return result.scalars().all()
@@ -249,7 +320,7 @@ class Statistics:
         result = await self.session.execute(
             select(TranscodeRecord)
             .where(TranscodeRecord.status == "completed")
-            .order_by(TranscodeRecord.completed_at.desc())
+            .order_by(_job_list_order("completed"))
             .limit(limit)
         )
         return result.scalars().all()
@@ -259,10 +330,105 @@ class Statistics:
         result = await self.session.execute(
             select(TranscodeRecord)
             .where(TranscodeRecord.status == "failed")
-            .order_by(TranscodeRecord.created_at.desc())
+            .order_by(_job_list_order("failed"))
             .limit(limit)
         )
         return result.scalars().all()
+    
+    async def get_jobs_grouped(
+        self,
+        statuses: Sequence[str] = ("pending", "completed", "failed"),
+        limit_each: int = 50
+    ) -> Dict[str, List[TranscodeRecord]]:
+        """Get the job lists of several statuses in a single query.
+        
+        Each list is sorted and limited like its get_*_jobs counterpart;
+        statuses without a list order show the newest jobs first.
+        """
+        # Within a partition only its own status's keys vary; ties go by id
+        # in the same direction, as they do when reading the status indexes
+        order_by = []
+        for status in statuses:
+            if status in JOB_LIST_ORDER:
+                column, descending = JOB_LIST_ORDER[status]
+                for key in (column, TranscodeRecord.id):
+                    key = case((TranscodeRecord.status == status, key))
+                    order_by.append(key.desc() if descending else key.asc())
+        order_by.append(TranscodeRecord.id.desc())
+        row_number = func.row_number().over(
+            partition_by=TranscodeRecord.status,
+            order_by=order_by
+        ).label("row_number")
+        ranked = (
+            select(TranscodeRecord, row_number)
+            .where(TranscodeRecord.status.in_(statuses))
+            .subquery()
+        )
+        record = aliased(TranscodeRecord, ranked)
+        result = await self.session.execute(
+            select(record)
+            .where(ranked.c.row_number <= limit_each)
+            .order_by(record.status, ranked.c.row_number)
+        )
+        
+        grouped = {status: [] for status in statuses}
+        for status, jobs in groupby(result.scalars(), key=attrgetter("status")):
+            grouped[status] = list(jobs)
+        
+        return grouped
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so dashboard reads don't block on worker writes."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _add_space_saved_column(connection):
+    """Add and backfill space_saved on databases created before it was stored."""
+    columns = {column["name"] for column in inspect(connection).get_columns("transcode_records")}
+    if "space_saved" in columns:
+        return
+    
+    table = TranscodeRecord.__table__
+    connection.execute(text("ALTER TABLE transcode_records ADD COLUMN space_saved INTEGER"))
+    connection.execute(
+        update(table).values(space_saved=_space_saved(table.c.original_size, table.c.final_size))
+    )
+
+
+class ChangeNotifier:
+    """Version counter that lets readers wait for the next committed write."""
+    
+    def __init__(self):
+        self.version = 0
+        self._waiters: List[asyncio.Future] = []
+    
+    def notify(self) -> None:
+        """Record a change and wake everyone waiting for one."""
+        self.version += 1
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+    
+    async def wait_for_change(self, since: int) -> int:
+        """Wait until the version moves past ``since`` and return the new version."""
+        if self.version == since:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        return self.version
 
 
 class DatabaseManager:
@@ -272,23 +438,40 @@ class DatabaseManager:
         self.database_url = database_url
         self.engine = None
         self.session_factory = None
+        self.changes = ChangeNotifier()
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
     
     async def initialize(self):
         """Initialize database connection."""
         # Convert sync URL to async for SQLite
-        if self.database_url.startswith("sqlite:///"):
-            async_url = self.database_url.replace("sqlite:///", "sqlite+aiosqlite:///")
+        if self.database_url.startswith("sqlite:"):
+            async_url = self.database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
         else:
             async_url = self.database_url
         
-        self.engine = create_async_engine(async_url, echo=False)
-        self.session_factory = sessionmaker(
-            self.engine, class_=AsyncSession, expire_on_commit=False
-        )
+        engine_options = {}
+        if ":memory:" not in async_url and async_url != "sqlite+aiosqlite://":
+            # A pool of connections lets dashboard reads proceed while
+            # workers are writing, instead of queuing behind one connection
+            engine_options.update(
+                poolclass=AsyncAdaptedQueuePool, pool_size=5, max_overflow=10
+            )
+        
+        self.engine = create_async_engine(async_url, echo=False, **engine_options)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
         
         # Create tables
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_space_saved_column)
+            # create_all skips existing tables, so add indexes missing from older databases
+            # (IF NOT EXISTS because reflection can't see expression indexes on SQLite)
+            for index in TranscodeRecord.__table__.indexes:
+                await conn.execute(CreateIndex(index, if_not_exists=True))
     
     async def get_session(self) -> AsyncSession:
         """Get a database session."""
@@ -296,29 +479,149 @@ class DatabaseManager:
             await self.initialize()
         return self.session_factory()
     
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[AsyncSession]:
+        """Share one session with every call made inside this block.
+        
+        Nested scopes in the same task reuse the outer session; other tasks,
+        including ones started inside the block, get their own.
+        """
+        session = _scoped_session()
+        if session is not None:
+            yield session
+            return
+        
+        async with await self.get_session() as session:
+            token = _current_session.set((asyncio.current_task(), session))
+            try:
+                yield session
+            finally:
+                _current_session.reset(token)
+    
     async def close(self):
         """Close database connection."""
+        if self._writer_task is not None:
+            if self._writer_task.get_loop() is asyncio.get_running_loop():
+                await self.flush()
+            self._writer_task.cancel()
+            self._writer_task = None
+            self._write_queue = None
         if self.engine:
             await self.engine.dispose()
     
     async def add_record(self, record: TranscodeRecord) -> None:
-        """Add a transcoding record to the database."""
+        """Add a transcoding record to the database.
+        
+        Records from concurrent callers are committed together by a background
+        writer; this returns once the record's transaction has committed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._writer_task is None or self._writer_task.get_loop() is not loop:
+            self._write_queue = asyncio.Queue(maxsize=WRITE_BATCH_MAX * 4)
+            self._writer_task = loop.create_task(self._write_records(self._write_queue))
+        
+        committed = loop.create_future()
+        await self._write_queue.put((record, committed))
+        await committed
+    
+    async def flush(self) -> None:
+        """Wait until every queued record has been written."""
+        if self._write_queue is not None:
+            await self._write_queue.join()
+    
+    async def _write_records(self, queue: asyncio.Queue) -> None:
+        """Commit queued records, batching whatever accumulated during the last commit."""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < WRITE_BATCH_MAX and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            errors = await self._add_batch([record for record, _ in batch])
+            
+            for (_, committed), error in zip(batch, errors):
+                if not committed.done():
+                    if error is None:
+                        committed.set_result(None)
+                    else:
+                        committed.set_exception(error)
+                queue.task_done()
+    
+    async def _add_batch(self, records: List[TranscodeRecord]) -> List[Optional[Exception]]:
+        """Commit records together, returning the error (if any) for each record."""
+        try:
+            await self.add_records(records)
+            return [None] * len(records)
+        except Exception as e:
+            if len(records) == 1:
+                return [e]
+        
+        # Retry one by one so a bad record only fails its own caller
+        errors = []
+        for record in records:
+            errors.extend(await self._add_batch([record]))
+        return errors
+    
+    async def add_records(self, records: List[TranscodeRecord]) -> None:
+        """Add several transcoding records in a single transaction."""
+        if not records:
+            return
+        
+        # One timestamp for the whole batch instead of one per row
+        now = datetime.now(timezone.utc)
+        for record in records:
+            if record.created_at is None:
+                record.created_at = now
+        
         async with await self.get_session() as session:
-            session.add(record)
+            session.add_all(records)
             await session.commit()
+        self.changes.notify()
     
     async def update_record(self, record_id: int, **updates) -> None:
         """Update a transcoding record."""
-        async with await self.get_session() as session:
-            result = await session.execute(
-                select(TranscodeRecord).where(TranscodeRecord.id == record_id)
-            )
-            record = result.scalar_one_or_none()
-            
-            if record:
-                for key, value in updates.items():
-                    setattr(record, key, value)
+        if "original_size" in updates or "final_size" in updates:
+            # Sizes not being updated come from the row itself
+            sizes = [
+                literal(updates[name], Integer) if name in updates else getattr(TranscodeRecord, name)
+                for name in ("original_size", "final_size")
+            ]
+            updates["space_saved"] = _space_saved(*sizes)
+        
+        async with self.session_scope() as session:
+            try:
+                await session.execute(
+                    update(TranscodeRecord)
+                    .where(TranscodeRecord.id == record_id)
+                    .values(**updates)
+                )
+                await session.commit()
+            except Exception:
+                # Leave a shared session usable for the rest of the scope
+                await session.rollback()
+                raise
+        self.changes.notify()
+    
+    async def claim_record(self, record_id: int, **updates) -> bool:
+        """Move a pending record to running, unless someone else got to it first.
+        
+        The status check is part of the UPDATE, so of several workers claiming
+        the same record exactly one succeeds.
+        """
+        async with self.session_scope() as session:
+            try:
+                result = await session.execute(
+                    update(TranscodeRecord)
+                    .where(TranscodeRecord.id == record_id, TranscodeRecord.status == "pending")
+                    .values(status="running", **updates)
+                )
                 await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+        claimed = result.rowcount == 1
+        if claimed:
+            self.changes.notify()
+        return claimed
     
     async def get_statistics(self) -> Statistics:
         """Get statistics helper."""
@@ -327,27 +630,33 @@ class DatabaseManager:
     
     async def get_pending_jobs(self, limit: int = 50) -> List[TranscodeRecord]:
         """Get pending jobs."""
-        stats = await self.get_statistics()
-        return await stats.get_pending_jobs(limit)
+        async with self.session_scope():
+            return await Statistics().get_pending_jobs(limit)
     
     async def get_completed_jobs(self, limit: int = 50) -> List[TranscodeRecord]:
         """Get completed jobs."""
-        stats = await self.get_statistics()
-        return await stats.get_completed_jobs(limit)
+        async with self.session_scope():
+            return await Statistics().get_completed_jobs(limit)
     
     async def get_failed_jobs(self, limit: int = 50) -> List[TranscodeRecord]:
         """Get failed jobs."""
-        stats = await self.get_statistics()
-        return await stats.get_failed_jobs(limit)
+        async with self.session_scope():
+            return await Statistics().get_failed_jobs(limit)
+    
+    async def get_jobs_grouped(
+        self,
+        statuses: Sequence[str] = ("pending", "completed", "failed"),
+        limit_each: int = 50
+    ) -> Dict[str, List[TranscodeRecord]]:
+        """Get jobs for several statuses at once, keyed by status."""
+        async with self.session_scope():
+            return await Statistics().get_jobs_grouped(statuses, limit_each)
     
     async def reprocess_job(self, job_id: int) -> dict:
         """Mark a completed/failed job for reprocessing."""
-        async with await self.get_session() as session:
-            # Get the original job record
-            result = await session.execute(
-                select(TranscodeRecord).where(TranscodeRecord.id == job_id)
-            )
-            record = result.scalar_one_or_none()
+        async with self.session_scope() as session:
+            # Get the original job record by primary key
+            record = await session.get(TranscodeRecord, job_id)
             
             if not record:
                 raise ValueError(f"Job {job_id} not found")
@@ -367,8 +676,9 @@ class DatabaseManager:
             )
             
             session.add(new_record)
+            # The flush fills in the id and sessions don't expire on commit, so no refresh SELECT is needed
             await session.commit()
-            await session.refresh(new_record)
+            self.changes.notify()
             
             return {
                 "id": new_record.id,
@@ -1,50 +1,340 @@
 """File monitoring system for RecodeX."""
 
 import asyncio
+import ctypes
+import ctypes.util
+import functools
+import hashlib
 import logging
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileMovedEvent
 
-from ..config import WatchFolder, TranscodeProfile
+from ..config import WatchFolder, TranscodeProfile, build_profile_index
 from ..core import MediaInfo
 
 logger = logging.getLogger(__name__)
 
+# inotify(7) event flags
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# Fixed part of struct inotify_event (wd, mask, cookie, len)
+_EVENT = struct.Struct("iIII")
+
+# Existing files processed at once during the startup scan
+SCAN_CONCURRENCY = 8
+
+# Transcoding decisions remembered per handler, keyed by file version
+PROBE_CACHE_SIZE = 10_000
+
+# Output directory listings remembered per handler, and for how many seconds;
+# the expiry covers changes no event reported, e.g. outputs written by others
+DIR_NAMES_CACHE_SIZE = 1_000
+DIR_NAMES_TTL = 5.0
+
+# Processed files remembered per handler; older ones fall back to the output check
+PROCESSED_FILES_LIMIT = 100_000
+
+# Seconds between walks of folders that can't deliver change notifications
+POLL_INTERVAL = 30.0
+
+# Mount types whose remote changes never reach the local inotify
+NETWORK_FILESYSTEMS = frozenset({
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph",
+    "glusterfs", "fuse.glusterfs", "fuse.sshfs", "fuse.rclone"
+})
+
+
+class Inotify:
+    """Thin ctypes wrapper around a single inotify instance.
+    
+    One instance serves every watch folder, so the number of kernel inotify
+    instances stays constant regardless of how many directories are watched.
+    """
+    
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    
+    @staticmethod
+    def is_supported() -> bool:
+        """Check whether the current platform provides inotify."""
+        return sys.platform.startswith("linux")
+    
+    def add_watch(self, path: Path, mask: int) -> int:
+        """Add a watch for a directory and return its watch descriptor."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        return wd
+    
+    def read_events(self) -> List[Tuple[int, int, bytes]]:
+        """Read pending events as (wd, mask, name) tuples."""
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        
+        events = []
+        offset = 0
+        header_size = _EVENT.size
+        unpack_from = _EVENT.unpack_from
+        while offset + header_size <= len(buf):
+            wd, mask, _cookie, name_len = unpack_from(buf, offset)
+            offset += header_size
+            name = buf[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            events.append((wd, mask, name))
+        return events
+    
+    def close(self):
+        """Close the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _iter_media_files(root: Path, recursive: bool, extensions: FrozenSet[str]) -> Iterator[Path]:
+    """Yield files under root whose lower-cased extension is in extensions.
+    
+    Uses the file types reported by os.scandir, so rejected entries cost
+    neither a stat nor a Path.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                        continue
+                    
+                    name = entry.name
+                    dot = name.rfind(".")
+                    if dot > 0 and name[dot:].lower() in extensions and entry.is_file():
+                        yield Path(entry.path)
+        except OSError as e:
+            logger.warning(f"Failed to scan {e.filename}: {e}")
+
+
+def _mount_type(path: Path) -> Optional[str]:
+    """Return the filesystem type of the mount containing path (Linux only)."""
+    try:
+        with open("/proc/self/mounts") as mounts:
+            entries = [line.split() for line in mounts]
+    except OSError:
+        return None
+    
+    target = os.path.realpath(path)
+    best, fs_type = "", None
+    for fields in entries:
+        if len(fields) < 3:
+            continue
+        # Mount points escape spaces as \040
+        mount_point = fields[1].replace("\\040", " ")
+        if (
+            len(mount_point) >= len(best)
+            and (target == mount_point or target.startswith(mount_point.rstrip("/") + "/"))
+        ):
+            best, fs_type = mount_point, fields[2]
+    return fs_type
+
+
+class DirectoryPoller:
+    """Periodic scandir diff for a folder that can't deliver change notifications.
+    
+    Keeps the set of media files seen by the previous walk and only reports
+    paths that are new, so the work per poll is one listing of the tree.
+    """
+    
+    def __init__(self, handler: "MediaFileHandler", interval: float = POLL_INTERVAL):
+        self.handler = handler
+        self.interval = interval
+        self._known: Set[str] = set()
+    
+    def _walk(self) -> Set[str]:
+        """List the folder's media files."""
+        folder = self.handler.watch_folder
+        return {os.fspath(path) for path in _iter_media_files(folder.path, folder.recursive, folder.ext_set)}
+    
+    async def prime(self):
+        """Record the files already present, which the startup scan handles."""
+        self._known = await asyncio.get_running_loop().run_in_executor(None, self._walk)
+    
+    async def poll(self) -> List[Path]:
+        """Walk the folder and return files that appeared since the last walk."""
+        current = await asyncio.get_running_loop().run_in_executor(None, self._walk)
+        new_files = current - self._known
+        self._known = current
+        return [Path(path) for path in sorted(new_files)]
+
+
+def _list_names(directory: str) -> FrozenSet[str]:
+    """List the entry names of a directory; a missing one has none."""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except FileNotFoundError:
+        return frozenset()
+
+
+@functools.lru_cache(maxsize=256)
+def _profile_key(profile: TranscodeProfile) -> str:
+    """Identify a profile's settings, so decisions made under an edited profile don't apply."""
+    digest = hashlib.blake2b(profile.model_dump_json().encode(), digest_size=8).hexdigest()
+    return f"{profile.name}:{digest}"
+
+
+class DecisionStore:
+    """Transcoding decisions persisted across restarts in a small SQLite file.
+    
+    Entries only apply to the file size and mtime they were recorded for, so
+    a file that changed is probed again. Handlers call it from executor
+    threads, so access to the connection is serialized.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.fspath(path), isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            "path TEXT NOT NULL, profile TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, needs INTEGER NOT NULL, PRIMARY KEY (path, profile))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)"
+        )
+    
+    def get(self, path: str, profile: str, size: int, mtime_ns: int) -> Optional[bool]:
+        """Get the recorded decision for this version of a file, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT needs FROM decisions WHERE path = ? AND profile = ? AND size = ? AND mtime_ns = ?",
+                (path, profile, size, mtime_ns)
+            ).fetchone()
+        return None if row is None else bool(row[0])
+    
+    def put(self, path: str, profile: str, size: int, mtime_ns: int, needs: bool):
+        """Record whether this version of a file needs transcoding."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)",
+                (path, profile, size, mtime_ns, int(needs))
+            )
+    
+    def is_processed(self, path: str, size: int, mtime_ns: int) -> bool:
+        """Check whether this version of a file was transcoded before."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM processed WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns)
+            ).fetchone() is not None
+    
+    def mark_processed(self, path: str, size: int, mtime_ns: int):
+        """Record that this version of a file was transcoded."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?)", (path, size, mtime_ns)
+            )
+    
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
 
 class MediaFileHandler(FileSystemEventHandler):
     """File system event handler for media files."""
     
-    def __init__(self, watch_folder: WatchFolder, job_queue: asyncio.Queue, profiles: Dict[str, TranscodeProfile], event_loop: asyncio.AbstractEventLoop):
+    def __init__(self, watch_folder: WatchFolder, job_queue: asyncio.Queue, profiles: Dict[str, TranscodeProfile], event_loop: asyncio.AbstractEventLoop, job_added: Optional[asyncio.Event] = None, decisions: Optional[DecisionStore] = None):
         super().__init__()
         self.watch_folder = watch_folder
         self.job_queue = job_queue
         self.profiles = profiles
+        # Profile key or name -> (key, profile), rebuilt when the profiles are edited
+        self._profile_index = build_profile_index(profiles)
+        # Bound once so a lookup is a single call; rebound whenever the index is rebuilt
+        self._profile_index_get = self._profile_index.get
+        # (key, profile) for the watch folder's profile, resolved up front
+        self._resolved_profile: Optional[Tuple[str, TranscodeProfile]] = None
+        self._resolved_profile = self._lookup_profile(watch_folder.profile)
+        if self._resolved_profile is None:
+            # Files are skipped until the profile is added, so say so up front
+            logger.error(
+                f"Watch folder {watch_folder.path} uses unknown profile '{watch_folder.profile}' "
+                f"(available: {', '.join(sorted(profiles)) or 'none'})"
+            )
         self.event_loop = event_loop
-        self.processed_files: Set[Path] = set()
-        self.processing_files: Set[Path] = set()
+        self.job_added = job_added
+        # Keyed by path string, which hashes faster than Path; processed_files
+        # is ordered so the oldest entries can be evicted
+        self.processed_files: "OrderedDict[str, None]" = OrderedDict()
+        self.processing_files: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        # Names in each output directory with the time they were listed, so
+        # checking outputs for every profile costs one directory read instead
+        # of a stat per profile; least recently used first
+        self._dir_names_cache: "OrderedDict[str, Tuple[float, FrozenSet[str]]]" = OrderedDict()
+        # Output directories already created
+        self._known_dirs: Set[str] = set()
+        # (path, mtime_ns, size, profile key) -> needs transcoding, least recently used first
+        self._probe_cache: "OrderedDict[Tuple[str, int, int, str], bool]" = OrderedDict()
+        # Persistent decisions shared by all handlers, consulted on cache misses
+        self.decisions = decisions
+        # Lower-cased extensions as bytes, for filtering raw inotify names
+        self.extension_bytes = frozenset(
+            os.fsencode(ext) for ext in watch_folder.ext_set
+        )
     
     def on_created(self, event):
         """Handle file creation events."""
-        if not event.is_directory:
-            file_path = Path(event.src_path)
-            # Schedule coroutine on the main event loop from watchdog thread
-            future = asyncio.run_coroutine_threadsafe(self._process_new_file(file_path), self.event_loop)
-            # Add callback to handle any exceptions
-            future.add_done_callback(self._handle_future_result)
+        # Filter on the raw path string so other files never get a Path
+        if not event.is_directory and self._is_media_file(event.src_path):
+            # Hand the path over from the watchdog thread; the task is created on the loop
+            self.event_loop.call_soon_threadsafe(self._schedule, Path(event.src_path))
     
     def on_moved(self, event):
         """Handle file move events."""
-        if not event.is_directory:
-            file_path = Path(event.dest_path)
-            # Schedule coroutine on the main event loop from watchdog thread
-            future = asyncio.run_coroutine_threadsafe(self._process_new_file(file_path), self.event_loop)
-            # Add callback to handle any exceptions
-            future.add_done_callback(self._handle_future_result)
+        if not event.is_directory and self._is_media_file(event.dest_path):
+            self.event_loop.call_soon_threadsafe(self._schedule, Path(event.dest_path))
+    
+    def _schedule(self, file_path: Path):
+        """Start processing a file; runs on the event loop thread."""
+        # A live event means the directory changed since it was last listed
+        self._forget_dir_names(file_path)
+        task = self.event_loop.create_task(self._process_new_file(file_path))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(self._handle_future_result)
     
     def _handle_future_result(self, future):
         """Handle the result of a scheduled coroutine."""
+        if future.cancelled():
+            return
         try:
             # Get the result to ensure any exceptions are raised
             future.result()
@@ -60,53 +350,79 @@ class MediaFileHandler(FileSystemEventHandler):
         Returns:
             TranscodeProfile if found, None otherwise
         """
-        # First try direct key lookup
-        profile = self.profiles.get(profile_identifier)
-        if profile:
-            return profile
-            
-        # If not found, try to find by profile name
-        for profile_key, profile_obj in self.profiles.items():
-            if profile_obj.name == profile_identifier:
-                return profile_obj
-                
-        return None
+        entry = self._lookup_profile(profile_identifier)
+        return entry[1] if entry else None
+    
+    def _lookup_profile(self, profile_identifier: str) -> Optional[Tuple[str, TranscodeProfile]]:
+        """Find a profile by key or name, returning its key along with it."""
+        # The dashboard edits the profiles dict in place, so an entry only counts
+        # while its key still holds that profile and, for a name match, no key
+        # has since taken the same string; otherwise the index is rebuilt once.
+        entry = self._profile_index_get(profile_identifier)
+        if entry is None or self.profiles.get(entry[0]) is not entry[1] or (
+            entry[0] != profile_identifier and profile_identifier in self.profiles
+        ):
+            self._profile_index = build_profile_index(self.profiles)
+            self._profile_index_get = self._profile_index.get
+            entry = self._profile_index_get(profile_identifier)
+        
+        return entry
+    
+    def _watch_profile(self) -> Optional[TranscodeProfile]:
+        """The watch folder's profile, looked up again only after the profiles were edited."""
+        entry = self._resolved_profile
+        if entry is None or self.profiles.get(entry[0]) is not entry[1]:
+            entry = self._resolved_profile = self._lookup_profile(self.watch_folder.profile)
+        return entry[1] if entry else None
     
-    async def _process_new_file(self, file_path: Path):
-        """Process a newly detected file."""
+    async def _process_new_file(self, file_path: Path, closed: bool = False):
+        """Process a newly detected file.
+        
+        ``closed`` means the file was reported after its writer closed it (or it
+        was moved into place), so there is no need to wait for it to settle.
+        """
+        key = os.fspath(file_path)
         try:
             # Check if file extension is supported
             if not self._is_media_file(file_path):
                 return
             
-            # Avoid duplicate processing
-            if file_path in self.processed_files or file_path in self.processing_files:
+            # Avoid duplicate processing; claim the file before the first await so
+            # a second event for it during the readiness wait is dropped
+            if key in self.processed_files or key in self.processing_files:
                 return
+            self.processing_files.add(key)
+            
+            # A live event means the directory changed since it was last listed
+            if closed:
+                self._forget_dir_names(file_path)
             
             # Wait for file to be completely written
-            await self._wait_for_file_ready(file_path)
+            file_size = os.stat(file_path).st_size if closed else None
+            if not file_size:
+                file_size = await self._wait_for_file_ready(file_path)
             
             # Check if file already exists in output location
             if await self._is_already_processed(file_path):
                 logger.info(f"File already processed, skipping: {file_path}")
-                self.processed_files.add(file_path)
+                self.processing_files.discard(key)
+                self._remember_processed(key)
                 return
             
-            # Add to processing set
-            self.processing_files.add(file_path)
-            
             # Get profile
-            profile = self._find_profile(self.watch_folder.profile)
+            profile = self._watch_profile()
             if not profile:
                 logger.error(f"Profile '{self.watch_folder.profile}' not found for {file_path}")
+                # Not claimed, so the file is picked up again once the profile exists
+                self.processing_files.discard(key)
                 return
             
             # Check if transcoding is needed
             media_info = MediaInfo(file_path)
-            if not await media_info.needs_transcoding(profile):
+            if not await self._needs_transcoding(media_info, profile):
                 logger.info(f"File doesn't need transcoding, skipping: {file_path}")
-                self.processed_files.add(file_path)
-                self.processing_files.remove(file_path)
+                self.processing_files.discard(key)
+                self._remember_processed(key)
                 return
             
             # Generate output path
@@ -117,102 +433,219 @@ class MediaFileHandler(FileSystemEventHandler):
                 "input_path": file_path,
                 "output_path": output_path,
                 "profile": profile,
-                "watch_folder": self.watch_folder
+                "watch_folder": self.watch_folder,
+                "media_info": media_info,  # Already probed; reused by the worker
+                "original_size": file_size
             }
             
             await self.job_queue.put(job)
+            if self.job_added is not None:
+                self.job_added.set()
             logger.info(f"Added job to queue: {file_path} -> {output_path}")
             
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
-            if file_path in self.processing_files:
-                self.processing_files.remove(file_path)
+            self.processing_files.discard(key)
     
-    def _is_media_file(self, file_path: Path) -> bool:
+    async def _needs_transcoding(self, media_info: MediaInfo, profile: TranscodeProfile) -> bool:
+        """Check whether a file needs transcoding, probing each file version once per profile."""
+        loop = asyncio.get_running_loop()
+        st = await loop.run_in_executor(None, os.stat, media_info.file_path)
+        profile_key = _profile_key(profile)
+        key = (os.fspath(media_info.file_path), st.st_mtime_ns, st.st_size, profile_key)
+        
+        decision = self._probe_cache.get(key)
+        if decision is not None:
+            self._probe_cache.move_to_end(key)
+            return decision
+        
+        # The store is a blocking SQLite connection, so it is only used off the loop
+        if self.decisions is not None:
+            decision = await loop.run_in_executor(
+                None, self.decisions.get, key[0], profile_key, st.st_size, st.st_mtime_ns
+            )
+        if decision is None:
+            decision = await media_info.needs_transcoding(profile)
+            if self.decisions is not None:
+                await loop.run_in_executor(
+                    None, self.decisions.put, key[0], profile_key, st.st_size, st.st_mtime_ns, decision
+                )
+        
+        self._probe_cache[key] = decision
+        if len(self._probe_cache) > PROBE_CACHE_SIZE:
+            self._probe_cache.popitem(last=False)
+        return decision
+    
+    def _is_media_file(self, file_path: Union[str, Path]) -> bool:
         """Check if file is a supported media file."""
-        return file_path.suffix.lower() in self.watch_folder.extensions
+        return os.path.splitext(file_path)[1].lower() in self.watch_folder.ext_set
     
-    async def _wait_for_file_ready(self, file_path: Path, timeout: int = 30):
-        """Wait for file to be completely written."""
+    async def _wait_for_file_ready(self, file_path: Path, timeout: int = 30) -> Optional[int]:
+        """Wait for file to be completely written and return its size."""
         previous_size = 0
         stable_count = 0
         
+        stat = os.stat
+        
         for _ in range(timeout):
             try:
-                if not file_path.exists():
-                    await asyncio.sleep(1)
-                    continue
-                
-                current_size = file_path.stat().st_size
-                
-                if current_size == previous_size and current_size > 0:
-                    stable_count += 1
-                    if stable_count >= 3:  # File size stable for 3 seconds
-                        return
-                else:
-                    stable_count = 0
-                    previous_size = current_size
-                
-                await asyncio.sleep(1)
-                
-            except (OSError, IOError):
+                # One stat per check; a missing file raises FileNotFoundError
+                current_size = stat(file_path).st_size
+            except OSError:
                 await asyncio.sleep(1)
                 continue
+            
+            if current_size == previous_size and current_size > 0:
+                stable_count += 1
+                if stable_count >= 3:  # File size stable for 3 seconds
+                    return current_size
+            else:
+                stable_count = 0
+                previous_size = current_size
+            
+            await asyncio.sleep(1)
         
         logger.warning(f"File may not be ready after {timeout} seconds: {file_path}")
+        return None
     
     async def _is_already_processed(self, file_path: Path) -> bool:
         """Check if file has already been processed."""
         # Check if output file already exists
-        for profile_name, profile in self.profiles.items():
-            output_path = self._get_output_path(file_path, profile)
-            if output_path.exists():
+        names = await self._dir_names(self._get_output_dir(file_path))
+        stem = file_path.stem
+        for profile in self.profiles.values():
+            if self._get_output_name(stem, profile) in names:
                 return True
         
-        # TODO: Check database for processing history
+        # Outputs may have been moved away since this file was transcoded
+        if self.decisions is not None:
+            return await asyncio.get_running_loop().run_in_executor(None, self._stored_as_processed, file_path)
         return False
     
-    def _get_output_path(self, input_path: Path, profile: TranscodeProfile) -> Path:
-        """Generate output path for processed file."""
-        # Determine output directory
-        if self.watch_folder.output_path:
-            output_dir = self.watch_folder.output_path
-        else:
-            output_dir = input_path.parent
+    def _stored_as_processed(self, file_path: Path) -> bool:
+        """Check the decision store for this version of a file; blocking."""
+        st = os.stat(file_path)
+        return self.decisions.is_processed(os.fspath(file_path), st.st_size, st.st_mtime_ns)
+    
+    async def _dir_names(self, directory: Path) -> FrozenSet[str]:
+        """Get the entry names of a directory, cached until invalidated or expired."""
+        key = os.fspath(directory)
+        now = time.monotonic()
+        cached = self._dir_names_cache.get(key)
+        if cached is not None and now - cached[0] < DIR_NAMES_TTL:
+            self._dir_names_cache.move_to_end(key)
+            return cached[1]
         
+        # Output folders can be large or on network mounts, so list them off the loop
+        names = await asyncio.get_running_loop().run_in_executor(None, _list_names, key)
+        self._dir_names_cache[key] = (now, names)
+        self._dir_names_cache.move_to_end(key)
+        if len(self._dir_names_cache) > DIR_NAMES_CACHE_SIZE:
+            self._dir_names_cache.popitem(last=False)
+        return names
+    
+    def _forget_dir_names(self, file_path: Path):
+        """Drop the cached listing of the directory a file's outputs go to."""
+        self._dir_names_cache.pop(os.fspath(self._get_output_dir(file_path)), None)
+    
+    def _get_output_dir(self, input_path: Path) -> Path:
+        """Get the directory outputs for a file are written to."""
+        if self.watch_folder.output_path:
+            return self.watch_folder.output_path
+        return input_path.parent
+    
+    @staticmethod
+    def _get_output_name(stem: str, profile: TranscodeProfile) -> str:
+        """Generate the output file name for an input's stem and a profile."""
         # Generate filename with profile suffix
-        stem = input_path.stem
         if not stem.endswith(f"_{profile.name}"):
             stem = f"{stem}_{profile.name}"
         
         # Use profile container format
-        extension = f".{profile.container}"
-        
-        output_path = output_dir / f"{stem}{extension}"
+        return f"{stem}.{profile.container}"
+    
+    def _get_output_path(self, input_path: Path, profile: TranscodeProfile) -> Path:
+        """Generate output path for processed file."""
+        output_dir = self._get_output_dir(input_path)
+        output_path = output_dir / self._get_output_name(input_path.stem, profile)
         
-        # Ensure output directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure output directory exists, once per directory
+        dir_key = os.fspath(output_dir)
+        if dir_key not in self._known_dirs:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(dir_key)
         
         return output_path
     
-    def mark_processed(self, file_path: Path):
-        """Mark file as processed."""
-        if file_path in self.processing_files:
-            self.processing_files.remove(file_path)
-        self.processed_files.add(file_path)
+    def _remember_processed(self, key: str):
+        """Record a processed file, forgetting the oldest beyond the limit."""
+        self.processed_files[key] = None
+        self.processed_files.move_to_end(key)
+        if len(self.processed_files) > PROCESSED_FILES_LIMIT:
+            self.processed_files.popitem(last=False)
+    
+    def mark_processed(self, file_path: Path) -> Optional[asyncio.Future]:
+        """Mark file as processed.
+        
+        Returns the executor future recording it in the decision store, if
+        there is one; the store's lock may be held by scan threads, so the
+        write never runs on the loop.
+        """
+        key = os.fspath(file_path)
+        self.processing_files.discard(key)
+        self._remember_processed(key)
+        # The transcode just wrote into the output directory
+        self._forget_dir_names(file_path)
+        if self.decisions is None:
+            return None
+        return asyncio.get_running_loop().run_in_executor(None, self._store_processed, key)
+    
+    def _store_processed(self, key: str):
+        """Record a processed file in the decision store; blocking."""
+        try:
+            st = os.stat(key)
+            self.decisions.mark_processed(key, st.st_size, st.st_mtime_ns)
+        except (OSError, sqlite3.Error) as e:
+            # Also raised when the monitor closed the store before this ran
+            logger.warning(f"Could not record {key} as processed: {e}")
 
 
 class FileMonitor:
-    """Main file monitoring coordinator."""
+    """Main file monitoring coordinator.
+    
+    On Linux all watch folders share a single inotify file descriptor that is
+    registered with the running event loop, so events are handled on the loop
+    thread without any observer threads. Other platforms fall back to
+    watchdog observers. Folders on network filesystems, and every folder when
+    inotify can't be initialised on Linux, are polled with a DirectoryPoller.
+    """
     
-    def __init__(self, watch_folders: List[WatchFolder], profiles: Dict[str, TranscodeProfile], db_manager=None):
+    # Files are only handed over once they are closed after writing or moved
+    # into place, so partial writes never wake the monitor.
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+    # Recursive folders also need IN_CREATE to pick up new subdirectories;
+    # file creation events are ignored.
+    RECURSIVE_WATCH_MASK = WATCH_MASK | IN_CREATE
+    
+    def __init__(self, watch_folders: List[WatchFolder], profiles: Dict[str, TranscodeProfile], db_manager=None, state_path: Optional[Path] = None):
         self.watch_folders = watch_folders
         self.profiles = profiles
         self.db_manager = db_manager
+        self.state_path = state_path
+        self._decisions: Optional[DecisionStore] = None
         self.job_queue: asyncio.Queue = asyncio.Queue()
         self.observers: List[Observer] = []
         self.handlers: List[MediaFileHandler] = []
+        self._handler_by_root: Dict[Path, MediaFileHandler] = {}
         self.running = False
+        self._inotify: Optional[Inotify] = None
+        self._watches: Dict[int, Tuple[MediaFileHandler, Path]] = {}
+        self.pollers: List[DirectoryPoller] = []
+        self._tasks: Set[asyncio.Future] = set()
+        # Set once all watches are installed and existing files were scanned
+        self.ready = asyncio.Event()
+        # Set when the first job is put on the queue
+        self._first_job = asyncio.Event()
     
     async def start(self):
         """Start monitoring all watch folders."""
@@ -224,32 +657,61 @@ class FileMonitor:
         # Get the current event loop
         event_loop = asyncio.get_running_loop()
         
+        if Inotify.is_supported():
+            try:
+                self._inotify = Inotify()
+            except OSError as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {e}")
+                self._inotify = None
+        
+        if self.state_path is not None:
+            self._decisions = DecisionStore(self.state_path)
+        
         for watch_folder in self.watch_folders:
             if not watch_folder.path.exists():
                 logger.warning(f"Watch folder does not exist: {watch_folder.path}")
                 continue
             
             # Create handler for this watch folder with event loop reference
-            handler = MediaFileHandler(watch_folder, self.job_queue, self.profiles, event_loop)
-            self.handlers.append(handler)
-            
-            # Create observer
-            observer = Observer()
-            observer.schedule(
-                handler,
-                str(watch_folder.path),
-                recursive=watch_folder.recursive
+            handler = MediaFileHandler(
+                watch_folder, self.job_queue, self.profiles, event_loop, self._first_job, self._decisions
             )
+            self.handlers.append(handler)
+            self._handler_by_root.setdefault(watch_folder.path, handler)
             
-            self.observers.append(observer)
-            observer.start()
+            if self._needs_polling(watch_folder.path):
+                poller = DirectoryPoller(handler)
+                await poller.prime()
+                self.pollers.append(poller)
+            elif self._inotify:
+                self._add_watches(handler, watch_folder.path)
+            else:
+                # Create observer
+                observer = Observer()
+                observer.schedule(
+                    handler,
+                    str(watch_folder.path),
+                    recursive=watch_folder.recursive
+                )
+                
+                self.observers.append(observer)
+                observer.start()
             
             logger.info(f"Monitoring: {watch_folder.path} (profile: {watch_folder.profile})")
         
+        if self._inotify:
+            event_loop.add_reader(self._inotify.fd, self._drain)
+        
         # Scan existing files
         await self._scan_existing_files()
         
+        for poller in self.pollers:
+            task = asyncio.ensure_future(self._poll(poller))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        
         self.running = True
+        self.ready.set()
         logger.info("File monitoring started")
     
     async def stop(self):
@@ -259,79 +721,248 @@ class FileMonitor:
         
         logger.info("Stopping file monitoring...")
         
+        if self._inotify:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+        
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        
         for observer in self.observers:
             observer.stop()
             observer.join()
         
         self.observers.clear()
+        self.pollers.clear()
         self.handlers.clear()
+        
+        if self._decisions is not None:
+            self._decisions.close()
+            self._decisions = None
+        self._handler_by_root.clear()
         self.running = False
+        self.ready.clear()
         
         logger.info("File monitoring stopped")
     
-    async def _scan_existing_files(self):
-        """Scan existing files in watch folders."""
-        logger.info("Scanning existing files...")
+    def _needs_polling(self, path: Path) -> bool:
+        """Whether a watch folder has to be polled instead of watched."""
+        if not Inotify.is_supported():
+            # watchdog uses the platform's native notifier
+            return False
+        if self._inotify is None:
+            # watchdog would hit the same inotify failure
+            return True
         
-        for watch_folder in self.watch_folders:
-            if not watch_folder.path.exists():
+        fs_type = _mount_type(path)
+        if fs_type in NETWORK_FILESYSTEMS:
+            logger.info(f"{path} is on {fs_type}, polling every {POLL_INTERVAL:g}s instead of watching")
+            return True
+        return False
+    
+    async def _poll(self, poller: DirectoryPoller):
+        """Dispatch files that appear in a polled folder."""
+        while True:
+            await asyncio.sleep(poller.interval)
+            for file_path in await poller.poll():
+                poller.handler._forget_dir_names(file_path)
+                self._dispatch(poller.handler, file_path)
+    
+    def _add_watches(self, handler: MediaFileHandler, directory: Path, dispatch_existing: bool = False):
+        """Add inotify watches for a directory and, if recursive, its subdirectories.
+        
+        When ``dispatch_existing`` is set, media files already present in the
+        walked directories are dispatched too (used for directories created
+        after monitoring started, which may be filled before the watch exists).
+        """
+        recursive = handler.watch_folder.recursive
+        mask = self.RECURSIVE_WATCH_MASK if recursive else self.WATCH_MASK
+        
+        stack = [os.fspath(directory)]
+        while stack:
+            current = stack.pop()
+            try:
+                wd = self._inotify.add_watch(Path(current), mask)
+            except OSError as e:
+                logger.error(f"Failed to watch {current}: {e}")
                 continue
+            self._watches[wd] = (handler, Path(current))
             
-            # Find handler for this watch folder
-            handler = None
-            for h in self.handlers:
-                if h.watch_folder == watch_folder:
-                    handler = h
-                    break
+            if not recursive and not dispatch_existing:
+                continue
             
-            if not handler:
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                        elif dispatch_existing and self._matches_extension(handler, os.fsencode(entry.name)):
+                            self._dispatch(handler, Path(entry.path))
+            except OSError as e:
+                logger.warning(f"Failed to scan {current}: {e}")
+    
+    @staticmethod
+    def _matches_extension(handler: MediaFileHandler, name: bytes) -> bool:
+        """Check a raw file name against the handler's extensions."""
+        dot = name.rfind(b".")
+        return dot > 0 and name[dot:].lower() in handler.extension_bytes
+    
+    def _dispatch(self, handler: MediaFileHandler, path: Path, closed: bool = False):
+        """Process a file on the event loop, keeping a reference to the task."""
+        task = asyncio.ensure_future(handler._process_new_file(path, closed))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def _drain(self):
+        """Read pending inotify events and dispatch them to their handlers."""
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                self._rescan_after_overflow()
                 continue
             
-            # Scan directory
-            if watch_folder.recursive:
-                pattern = "**/*"
-            else:
-                pattern = "*"
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            
+            watch = self._watches.get(wd)
+            if watch is None or not name:
+                continue
+            
+            handler, directory = watch
+            
+            if mask & IN_ISDIR:
+                if handler.watch_folder.recursive:
+                    self._add_watches(handler, directory / os.fsdecode(name), dispatch_existing=True)
+                continue
             
-            for file_path in watch_folder.path.glob(pattern):
-                if file_path.is_file() and handler._is_media_file(file_path):
-                    await handler._process_new_file(file_path)
+            if not mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                continue
+            
+            if self._matches_extension(handler, name):
+                # Only close-after-write and moves get here, so the file is complete
+                self._dispatch(handler, directory / os.fsdecode(name), closed=True)
+    
+    def _rescan_after_overflow(self):
+        """Reconcile watch folders after the kernel dropped queued events."""
+        logger.warning("inotify event queue overflowed, rescanning watch folders")
+        polled = {poller.handler for poller in self.pollers}
+        for handler in self.handlers:
+            if handler in polled:
+                continue
+            # Listings may predate the dropped events
+            handler._dir_names_cache.clear()
+            # Re-adding a watch on a watched directory keeps its descriptor;
+            # files already queued or processed are skipped by the handler
+            self._add_watches(handler, handler.watch_folder.path, dispatch_existing=True)
+    
+    async def _scan_existing_files(self):
+        """Scan existing files in watch folders."""
+        logger.info("Scanning existing files...")
+        
+        def found_files():
+            for watch_folder in self.watch_folders:
+                if not watch_folder.path.exists():
+                    continue
+                
+                handler = self._handler_by_root.get(watch_folder.path)
+                if not handler or handler.watch_folder != watch_folder:
+                    continue
+                
+                for file_path in _iter_media_files(watch_folder.path, watch_folder.recursive, watch_folder.ext_set):
+                    yield handler, file_path
+        
+        # A few consumers share one walk, so probes and readiness waits overlap
+        # without creating a task per file
+        files = found_files()
+        
+        async def consume():
+            for handler, file_path in files:
+                await handler._process_new_file(file_path)
+        
+        await asyncio.gather(*(consume() for _ in range(SCAN_CONCURRENCY)))
+        
+        # Listings were only needed while scanning; live events invalidate their own
+        for handler in self.handlers:
+            handler._dir_names_cache.clear()
         
         logger.info("Existing file scan completed")
     
-    async def get_job(self) -> Optional[dict]:
-        """Get next job from queue or database."""
-        try:
-            # First, try to get a job from the queue
-            return await asyncio.wait_for(self.job_queue.get(), timeout=1.0)
-        except asyncio.TimeoutError:
-            # If no job in queue, check database for pending jobs
-            if self.db_manager:
-                return await self._get_pending_job_from_db()
-            return None
+    async def get_job(self) -> dict:
+        """Wait for the next job from the queue or the database.
+        
+        Pending database jobs (e.g. reprocess requests) are looked up when the
+        caller starts waiting and again after each database write, so idle
+        workers sleep instead of polling.
+        """
+        if not self.db_manager:
+            return await self.job_queue.get()
+        
+        changes = self.db_manager.changes
+        while True:
+            # Queued files come first
+            if not self.job_queue.empty():
+                return self.job_queue.get_nowait()
+            
+            version = changes.version
+            job = await self._get_pending_job_from_db()
+            if job:
+                return job
+            
+            queued = asyncio.ensure_future(self.job_queue.get())
+            changed = asyncio.ensure_future(changes.wait_for_change(version))
+            try:
+                await asyncio.wait({queued, changed}, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                changed.cancel()
+                if not queued.cancel():
+                    # Hand a job taken during cancellation back to the queue
+                    self.job_queue.put_nowait(queued.result())
+                raise
+            
+            changed.cancel()
+            # A get cancelled before returning leaves its item on the queue
+            if not queued.cancel():
+                return queued.result()
     
     async def _get_pending_job_from_db(self) -> Optional[dict]:
         """Get a pending job from database and convert to job format."""
         try:
-            pending_jobs = await self.db_manager.get_pending_jobs(limit=1)
-            if not pending_jobs:
-                return None
-            
-            record = pending_jobs[0]
+            while True:
+                pending_jobs = await self.db_manager.get_pending_jobs(limit=1)
+                if not pending_jobs:
+                    return None
+                
+                record = pending_jobs[0]
+                
+                # Every idle worker wakes on a change, so only the one whose
+                # claim flips the record to running takes it; the others retry
+                now = datetime.now(timezone.utc)
+                if not await self.db_manager.claim_record(record.id, started_at=now):
+                    continue
+                
+                # Find matching profile
+                profile = self.profiles.get(record.profile_name)
+                if profile:
+                    break
+                
+                # Fail it rather than leave it pending, where it would hold up
+                # every job queued behind it
+                error = f"Profile '{record.profile_name}' not found"
+                logger.error(f"{error} for job {record.id}")
+                await self.db_manager.update_record(
+                    record.id, status="failed", completed_at=now, error_message=error
+                )
             
             # Convert database record to job format
             input_path = Path(record.input_path)
             output_path = Path(record.output_path)
             
-            # Find matching profile
-            profile = self.profiles.get(record.profile_name)
-            if not profile:
-                logger.error(f"Profile '{record.profile_name}' not found for job {record.id}")
-                return None
-            
-            # Mark the job as running in the database
-            await self.db_manager.update_record(record.id, status="running")
-            
             job = {
                 "input_path": input_path,
                 "output_path": output_path,
@@ -351,20 +982,43 @@ class FileMonitor:
         """Mark job as processed."""
         input_path = job["input_path"]
         
-        # Find corresponding handler and mark file as processed
-        for handler in self.handlers:
-            if handler.watch_folder.path in input_path.parents or handler.watch_folder.path == input_path.parent:
-                handler.mark_processed(input_path)
+        # Mark the file as processed by the handler of the closest watch folder
+        recorded = None
+        for directory in input_path.parents:
+            handler = self._handler_by_root.get(directory)
+            if handler:
+                recorded = handler.mark_processed(input_path)
                 break
+        if recorded is not None:
+            self._track(recorded)
         
-        # Delete original file if configured
+        # Delete original file if configured (manual jobs have no watch folder);
+        # unlinking a large file can block, so it runs in the executor
         watch_folder = job["watch_folder"]
-        if watch_folder.delete_original and input_path.exists():
-            try:
-                input_path.unlink()
-                logger.info(f"Deleted original file: {input_path}")
-            except Exception as e:
-                logger.error(f"Failed to delete original file {input_path}: {e}")
+        if watch_folder is not None and watch_folder.delete_original:
+            self._track(asyncio.ensure_future(self._delete_original_after(recorded, input_path)))
+    
+    def _track(self, future: asyncio.Future):
+        """Keep a reference to background work until it finishes."""
+        self._tasks.add(future)
+        future.add_done_callback(self._tasks.discard)
+    
+    async def _delete_original_after(self, recorded: Optional[asyncio.Future], input_path: Path):
+        """Delete a transcoded input once its processed record, which stats it, is written."""
+        if recorded is not None:
+            await asyncio.wait({recorded})
+        await asyncio.get_running_loop().run_in_executor(None, self._delete_original, input_path)
+    
+    @staticmethod
+    def _delete_original(input_path: Path):
+        """Delete a transcoded input file."""
+        try:
+            input_path.unlink()
+            logger.info(f"Deleted original file: {input_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to delete original file {input_path}: {e}")
     
     def get_queue_size(self) -> int:
         """Get current queue size."""
@@ -391,10 +1045,12 @@ class FileMonitor:
             "input_path": input_path,
             "output_path": output_path,
             "profile": profile,
-            "watch_folder": None  # Manual job
+            "watch_folder": None,  # Manual job
+            "done": asyncio.Event()  # Set by the worker once the job finishes
         }
         
         await self.job_queue.put(job)
+        self._first_job.set()
         logger.info(f"Added manual job: {input_path} -> {output_path}")
         
         return job
\ No newline at end of file
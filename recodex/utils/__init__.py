@@ -0,0 +1,15 @@
+"""Small shared helpers for RecodeX."""
+
+import os
+
+
+def basename(path: str) -> str:
+    """Get the file name of a stored path string without building a Path.
+    
+    Splits on the platform's separators like ``Path(path).name`` does, but
+    skips the Path construction, which adds up when rendering job lists.
+    """
+    name = path.rpartition(os.sep)[2]
+    if os.altsep:
+        name = name.rpartition(os.altsep)[2]
+    return name
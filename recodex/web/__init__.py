@@ -1,32 +1,60 @@
 """Web dashboard for RecodeX."""
 
 import asyncio
+import hashlib
 import json
 import logging
+import time
 from pathlib import Path
-from typing import Dict, Optional, TYPE_CHECKING, List
+from typing import Dict, Optional, TYPE_CHECKING, List, Tuple
 
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
+import orjson
 import uvicorn
 
 from ..config import RecodeXConfig, TranscodeProfile, WatchFolder
+from ..core import HardwareAcceleration
+from ..database import TranscodeRecord
 
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
     from ..workers import RecodeXService
 
-# Web models
+def _orjson_default(obj):
+    """Serialize values orjson does not handle natively."""
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder.
+    
+    FastAPI still runs jsonable_encoder over plain return values, so hot
+    endpoints return an instance directly to skip that pass.
+    """
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+
+# Web models; unknown fields are rejected instead of silently dropped
 class TranscodeRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     input_path: str
     profile: str
     output_path: Optional[str] = None
 
 class ProfileRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     name: str
     video_codec: str = "h264"
     video_bitrate: Optional[str] = None
@@ -40,52 +68,214 @@ class ProfileRequest(BaseModel):
     preset: str = "medium"
 
 class WatchFolderRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+    
     path: str
     profile: str
     recursive: bool = True
-    extensions: List[str] = [".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".m4v", ".webm"]
+    extensions: List[str] = Field(
+        default_factory=lambda: [".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".m4v", ".webm"]
+    )
     output_path: Optional[str] = None
     delete_original: bool = False
 
 
+def _isoformat(value):
+    """Format an optional datetime for JSON output."""
+    return value.isoformat() if value else None
+
+
+def _pending_job_dict(job) -> dict:
+    """Serialize a pending job record."""
+    return {
+        "id": job.id,
+        "input_path": job.input_path,
+        "output_path": job.output_path,
+        "profile_name": job.profile_name,
+        "created_at": _isoformat(job.created_at),
+        "status": job.status
+    }
+
+
+def _completed_job_dict(job) -> dict:
+    """Serialize a completed job record."""
+    return {
+        "id": job.id,
+        "input_path": job.input_path,
+        "output_path": job.output_path,
+        "profile_name": job.profile_name,
+        "created_at": _isoformat(job.created_at),
+        "completed_at": _isoformat(job.completed_at),
+        "status": job.status,
+        "processing_time": job.processing_time,
+        "original_size": job.original_size,
+        "final_size": job.final_size,
+        "space_saved": job.space_saved,
+        "compression_ratio": job.compression_ratio
+    }
+
+
+def _failed_job_dict(job) -> dict:
+    """Serialize a failed job record."""
+    return {
+        "id": job.id,
+        "input_path": job.input_path,
+        "output_path": job.output_path,
+        "profile_name": job.profile_name,
+        "created_at": _isoformat(job.created_at),
+        "status": job.status,
+        "error_message": job.error_message
+    }
+
+
+_RECORD_COLUMNS = tuple(column.key for column in TranscodeRecord.__table__.columns)
+
+
+def _record_dict(record) -> dict:
+    """Serialize every column of a record."""
+    return {name: getattr(record, name) for name in _RECORD_COLUMNS}
+
+
+JOB_SERIALIZERS = {
+    "pending": _pending_job_dict,
+    "completed": _completed_job_dict,
+    "failed": _failed_job_dict,
+}
+
+
+def _etag(content: bytes) -> str:
+    """Build a strong entity tag for a response body."""
+    return f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an entity tag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+# Seconds of quiet after a config edit before it is written to disk
+CONFIG_SAVE_DELAY = 0.5
+
+# Seconds a rendered /api/status payload is served to repeated polls
+STATUS_CACHE_TTL = 1.0
+
+# Seconds between /ws pushes while jobs are running, so progress keeps moving
+LIVE_UPDATE_INTERVAL = 2.0
+
+# uvicorn limits: past SERVER_LIMIT_CONCURRENCY open connections/tasks new requests get a 503
+# instead of piling up on the event loop the transcoding service shares
+SERVER_LIMIT_CONCURRENCY = 200
+SERVER_BACKLOG = 512
+SERVER_KEEP_ALIVE = 5
+SERVER_SHUTDOWN_TIMEOUT = 10
+
+
 class WebDashboard:
     """FastAPI web dashboard for RecodeX."""
     
     def __init__(self, config: RecodeXConfig, service: "RecodeXService"):
         self.config = config
         self.service = service
-        self.app = FastAPI(title="RecodeX Dashboard", version="0.1.0")
+        # Rendered JSON for the polled endpoints; config is cleared on every edit
+        self._config_json: Optional[bytes] = None
+        self._config_etag = ""
+        # Edits not yet written to disk, and the task that will write them
+        self._config_dirty = False
+        self._config_saver: Optional[asyncio.Task] = None
+        # Position of each watch folder in config.watch_folders, by path string
+        self._watch_folder_index: Dict[str, int] = {}
+        self._index_watch_folders()
+        self._status_json: Optional[Tuple[float, bytes]] = None
+        # (worker signature, body, ETag) of the last /api/jobs/active response
+        self._active_jobs_json: Optional[Tuple[tuple, bytes, str]] = None
+        self.app = FastAPI(
+            title="RecodeX Dashboard",
+            version="0.1.0",
+            default_response_class=OrjsonResponse
+        )
+        # Job lists and statistics compress well; tiny responses aren't worth it
+        self.app.add_middleware(GZipMiddleware, minimum_size=1024)
         
         # Setup templates (we'll create basic HTML templates)
         self.templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
+        # Rendered pages by template name
+        self._pages: Dict[str, bytes] = {}
         
         # Setup routes
         self._setup_routes()
     
+    def _page(self, template_name: str, title: str) -> HTMLResponse:
+        """Serve a page, rendering its template only on first use.
+        
+        The pages only depend on their title, so the HTML never changes.
+        """
+        content = self._pages.get(template_name)
+        if content is None:
+            content = self.templates.get_template(template_name).render(title=title).encode()
+            self._pages[template_name] = content
+        return HTMLResponse(content)
+    
+    def _index_watch_folders(self):
+        """Rebuild the path -> position index of the configured watch folders."""
+        self._watch_folder_index.clear()
+        for index, folder in enumerate(self.config.watch_folders):
+            self._watch_folder_index.setdefault(str(folder.path), index)
+    
+    def _config_changed(self):
+        """Drop the rendered config and schedule saving it to disk."""
+        self._config_json = None
+        
+        config_path = self.service.config_path
+        if not config_path:
+            return
+        
+        self._config_dirty = True
+        if self._config_saver is None or self._config_saver.done():
+            self._config_saver = asyncio.ensure_future(self._save_config(config_path))
+    
+    async def _save_config(self, config_path: Path):
+        """Write the config once edits have settled, coalescing bursts into one write."""
+        while self._config_dirty:
+            try:
+                await asyncio.sleep(CONFIG_SAVE_DELAY)
+            except asyncio.CancelledError:
+                # Shutting down; don't lose the last edits
+                self.config.to_yaml(config_path)
+                raise
+            
+            self._config_dirty = False
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.config.to_yaml, config_path)
+            except Exception as e:
+                logger.error(f"Failed to save configuration to {config_path}: {e}")
+    
     def _setup_routes(self):
         """Setup FastAPI routes."""
         
         @self.app.get("/", response_class=HTMLResponse)
-        async def dashboard(request: Request):
+        async def dashboard():
             """Main dashboard page."""
-            return self.templates.TemplateResponse("dashboard.html", {
-                "request": request,
-                "title": "RecodeX Dashboard"
-            })
+            return self._page("dashboard.html", "RecodeX Dashboard")
         
         @self.app.get("/config", response_class=HTMLResponse)
-        async def config_page(request: Request):
+        async def config_page():
             """Configuration page."""
-            return self.templates.TemplateResponse("config.html", {
-                "request": request,
-                "title": "RecodeX Configuration"
-            })
+            return self._page("config.html", "RecodeX Configuration")
         
         @self.app.get("/api/status")
         async def get_status():
             """Get service status."""
+            now = time.monotonic()
+            if self._status_json is not None and now - self._status_json[0] < STATUS_CACHE_TTL:
+                return Response(self._status_json[1], media_type="application/json")
+            
             try:
-                return self.service.get_status()
+                content = orjson.dumps(self.service.get_status(), default=_orjson_default)
+                self._status_json = (now, content)
+                return Response(content, media_type="application/json")
             except Exception as e:
                 logger.error(f"Error getting status: {e}")
                 return {
@@ -105,7 +295,11 @@ class WebDashboard:
         async def get_statistics():
             """Get processing statistics."""
             try:
-                return await self.service.get_statistics()
+                statistics = await self.service.get_statistics()
+                for key in ("top_space_savers", "recent_records"):
+                    if key in statistics:
+                        statistics[key] = [_record_dict(record) for record in statistics[key]]
+                return OrjsonResponse(statistics)
             except Exception as e:
                 logger.error(f"Error getting statistics: {e}")
                 return {
@@ -116,37 +310,45 @@ class WebDashboard:
                 }
         
         @self.app.get("/api/config")
-        async def get_config():
-            """Get current configuration."""
-            return {
-                "watch_folders": [
-                    {
-                        "path": str(folder.path),
-                        "profile": folder.profile,
-                        "recursive": folder.recursive,
-                        "extensions": folder.extensions,
-                        "output_path": str(folder.output_path) if folder.output_path else None,
-                        "delete_original": folder.delete_original
-                    }
-                    for folder in self.config.watch_folders
-                ],
-                "profiles": {
-                    name: {
-                        "name": profile.name,
-                        "video_codec": profile.video_codec,
-                        "video_bitrate": profile.video_bitrate,
-                        "video_crf": profile.video_crf,
-                        "audio_codec": profile.audio_codec,
-                        "audio_bitrate": profile.audio_bitrate,
-                        "audio_normalize": profile.audio_normalize,
-                        "subtitles": profile.subtitles,
-                        "container": profile.container,
-                        "hardware_accel": profile.hardware_accel,
-                        "preset": profile.preset
+        async def get_config(request: Request):
+            """Get current configuration, or 304 if the client's copy is current."""
+            if self._config_json is None:
+                self._config_json = orjson.dumps({
+                    "watch_folders": [
+                        {
+                            "path": str(folder.path),
+                            "profile": folder.profile,
+                            "recursive": folder.recursive,
+                            "extensions": folder.extensions,
+                            "output_path": str(folder.output_path) if folder.output_path else None,
+                            "delete_original": folder.delete_original
+                        }
+                        for folder in self.config.watch_folders
+                    ],
+                    "profiles": {
+                        name: {
+                            "name": profile.name,
+                            "video_codec": profile.video_codec,
+                            "video_bitrate": profile.video_bitrate,
+                            "video_crf": profile.video_crf,
+                            "audio_codec": profile.audio_codec,
+                            "audio_bitrate": profile.audio_bitrate,
+                            "audio_normalize": profile.audio_normalize,
+                            "subtitles": profile.subtitles,
+                            "container": profile.container,
+                            "hardware_accel": profile.hardware_accel,
+                            "preset": profile.preset
+                        }
+                        for name, profile in self.config.profiles.items()
                     }
-                    for name, profile in self.config.profiles.items()
-                }
-            }
+                })
+                self._config_etag = _etag(self._config_json)
+            
+            # no-cache makes browsers revalidate, which costs only a 304 while unchanged
+            headers = {"ETag": self._config_etag, "Cache-Control": "no-cache"}
+            if _etag_matches(request.headers.get("if-none-match"), self._config_etag):
+                return Response(status_code=304, headers=headers)
+            return Response(self._config_json, media_type="application/json", headers=headers)
         
         @self.app.post("/api/config/profiles")
         async def create_profile(request: ProfileRequest):
@@ -170,11 +372,7 @@ class WebDashboard:
                 # Update configuration
                 profile_key = request.name.lower().replace(" ", "_")
                 self.config.profiles[profile_key] = profile
-                
-                # Save configuration
-                config_path = self.service.config_path
-                if config_path:
-                    self.config.to_yaml(config_path)
+                self._config_changed()
                 
                 return {"status": "success", "message": f"Profile '{request.name}' saved successfully"}
                 
@@ -189,11 +387,7 @@ class WebDashboard:
                     raise HTTPException(status_code=404, detail="Profile not found")
                 
                 del self.config.profiles[profile_name]
-                
-                # Save configuration
-                config_path = self.service.config_path
-                if config_path:
-                    self.config.to_yaml(config_path)
+                self._config_changed()
                 
                 return {"status": "success", "message": f"Profile '{profile_name}' deleted successfully"}
                 
@@ -216,22 +410,14 @@ class WebDashboard:
                     delete_original=request.delete_original
                 )
                 
-                # Check if folder already exists (by path)
-                existing_index = None
-                for i, folder in enumerate(self.config.watch_folders):
-                    if str(folder.path) == request.path:
-                        existing_index = i
-                        break
-                
+                # Replace the folder with the same path, if any
+                existing_index = self._watch_folder_index.get(str(watch_folder.path))
                 if existing_index is not None:
                     self.config.watch_folders[existing_index] = watch_folder
                 else:
+                    self._watch_folder_index[str(watch_folder.path)] = len(self.config.watch_folders)
                     self.config.watch_folders.append(watch_folder)
-                
-                # Save configuration
-                config_path = self.service.config_path
-                if config_path:
-                    self.config.to_yaml(config_path)
+                self._config_changed()
                 
                 return {"status": "success", "message": f"Watch folder '{request.path}' saved successfully"}
                 
@@ -247,11 +433,8 @@ class WebDashboard:
                 
                 folder_path = str(self.config.watch_folders[folder_index].path)
                 del self.config.watch_folders[folder_index]
-                
-                # Save configuration
-                config_path = self.service.config_path
-                if config_path:
-                    self.config.to_yaml(config_path)
+                self._index_watch_folders()
+                self._config_changed()
                 
                 return {"status": "success", "message": f"Watch folder '{folder_path}' deleted successfully"}
                 
@@ -261,8 +444,11 @@ class WebDashboard:
         @self.app.get("/api/hardware-acceleration")
         async def get_hardware_acceleration():
             """Get available hardware acceleration options."""
-            from ..core import HardwareAcceleration
-            return HardwareAcceleration.get_available_accelerations()
+            # Cached after the first call, which runs ffmpeg; keep that off the event loop
+            accelerations = await asyncio.get_running_loop().run_in_executor(
+                None, HardwareAcceleration.get_available_accelerations
+            )
+            return OrjsonResponse(accelerations)
         
         @self.app.post("/api/transcode")
         async def add_transcode_job(request: TranscodeRequest, background_tasks: BackgroundTasks):
@@ -284,9 +470,8 @@ class WebDashboard:
             except Exception as e:
                 raise HTTPException(status_code=400, detail=str(e))
         
-        @self.app.get("/api/jobs/active")
-        async def get_active_jobs():
-            """Get currently active jobs."""
+        async def active_jobs_payload() -> list:
+            """Build the list of currently active jobs."""
             try:
                 if self.service.worker_manager:
                     return self.service.worker_manager.get_active_jobs()
@@ -295,23 +480,50 @@ class WebDashboard:
                 logger.error(f"Error getting active jobs: {e}")
                 return []
         
+        async def jobs_payload() -> dict:
+            """Build the pending, completed and failed job lists."""
+            try:
+                if self.service.db_manager:
+                    grouped = await self.service.db_manager.get_jobs_grouped(
+                        tuple(JOB_SERIALIZERS)
+                    )
+                    return {
+                        status: [JOB_SERIALIZERS[status](job) for job in jobs]
+                        for status, jobs in grouped.items()
+                    }
+                return {status: [] for status in JOB_SERIALIZERS}
+            except Exception as e:
+                logger.error(f"Error getting jobs: {e}")
+                return {status: [] for status in JOB_SERIALIZERS}
+        
+        @self.app.get("/api/jobs/active")
+        async def get_active_jobs(request: Request):
+            """Get currently active jobs, rebuilt only when a job's progress or status moved."""
+            worker_manager = self.service.worker_manager
+            signature = worker_manager.get_active_jobs_signature() if worker_manager else ()
+            
+            cached = self._active_jobs_json
+            if cached is None or cached[0] != signature:
+                content = orjson.dumps(await active_jobs_payload(), default=_orjson_default)
+                cached = self._active_jobs_json = (signature, content, _etag(content))
+            
+            headers = {"ETag": cached[2], "Cache-Control": "no-cache"}
+            if _etag_matches(request.headers.get("if-none-match"), cached[2]):
+                return Response(status_code=304, headers=headers)
+            return Response(cached[1], media_type="application/json", headers=headers)
+        
+        @self.app.get("/api/jobs")
+        async def get_jobs():
+            """Get pending, completed and failed jobs in one request."""
+            return OrjsonResponse(await jobs_payload())
+        
         @self.app.get("/api/jobs/pending")
         async def get_pending_jobs():
             """Get pending jobs from database."""
             try:
                 if self.service.db_manager:
                     jobs = await self.service.db_manager.get_pending_jobs()
-                    return [
-                        {
-                            "id": job.id,
-                            "input_path": job.input_path,
-                            "output_path": job.output_path,
-                            "profile_name": job.profile_name,
-                            "created_at": job.created_at.isoformat() if job.created_at else None,
-                            "status": job.status
-                        }
-                        for job in jobs
-                    ]
+                    return OrjsonResponse([_pending_job_dict(job) for job in jobs])
                 return []
             except Exception as e:
                 logger.error(f"Error getting pending jobs: {e}")
@@ -323,23 +535,7 @@ class WebDashboard:
             try:
                 if self.service.db_manager:
                     jobs = await self.service.db_manager.get_completed_jobs()
-                    return [
-                        {
-                            "id": job.id,
-                            "input_path": job.input_path,
-                            "output_path": job.output_path,
-                            "profile_name": job.profile_name,
-                            "created_at": job.created_at.isoformat() if job.created_at else None,
-                            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-                            "status": job.status,
-                            "processing_time": job.processing_time,
-                            "original_size": job.original_size,
-                            "final_size": job.final_size,
-                            "space_saved": job.space_saved,
-                            "compression_ratio": job.compression_ratio
-                        }
-                        for job in jobs
-                    ]
+                    return OrjsonResponse([_completed_job_dict(job) for job in jobs])
                 return []
             except Exception as e:
                 logger.error(f"Error getting completed jobs: {e}")
@@ -351,18 +547,7 @@ class WebDashboard:
             try:
                 if self.service.db_manager:
                     jobs = await self.service.db_manager.get_failed_jobs()
-                    return [
-                        {
-                            "id": job.id,
-                            "input_path": job.input_path,
-                            "output_path": job.output_path,
-                            "profile_name": job.profile_name,
-                            "created_at": job.created_at.isoformat() if job.created_at else None,
-                            "status": job.status,
-                            "error_message": job.error_message
-                        }
-                        for job in jobs
-                    ]
+                    return OrjsonResponse([_failed_job_dict(job) for job in jobs])
                 return []
             except Exception as e:
                 logger.error(f"Error getting failed jobs: {e}")
@@ -386,35 +571,67 @@ class WebDashboard:
             except Exception as e:
                 logger.error(f"Error reprocessing job {job_id}: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
-
-
-def create_templates_directory():
-    """Create basic HTML templates for the web dashboard."""
-    templates_dir = Path(__file__).parent / "templates"
-    templates_dir.mkdir(exist_ok=True)
-    
-    # Only create dashboard.html if it doesn't already exist
-    dashboard_file = templates_dir / "dashboard.html"
-    if not dashboard_file.exists():
-        # Read enhanced dashboard template
-        enhanced_template_path = Path("/tmp/enhanced_dashboard.html")
-        if enhanced_template_path.exists():
-            dashboard_html = enhanced_template_path.read_text()
-        else:
-            # Fallback to basic template if enhanced one doesn't exist
-            dashboard_html = '''<!DOCTYPE html>
-<html><head><title>{{ title }}</title></head>
-<body><h1>RecodeX Dashboard</h1><p>Enhanced configuration interface will be available soon.</p></body>
-</html>'''
         
-        dashboard_file.write_text(dashboard_html)
+        @self.app.websocket("/ws")
+        async def push_updates(websocket: WebSocket):
+            """Push dashboard state on connect and whenever it changes.
+            
+            Each message only carries the sections ("status", "active_jobs",
+            "jobs") that differ from what this client was last sent.
+            """
+            await websocket.accept()
+            changes = self.service.db_manager.changes
+            receiving = asyncio.ensure_future(websocket.receive())
+            sent: Dict[str, bytes] = {}
+            version = None
+            
+            try:
+                while True:
+                    try:
+                        status = self.service.get_status()
+                    except Exception as e:
+                        logger.error(f"Error getting status: {e}")
+                        status = {"service_running": False, "error": str(e)}
+                    sections = {"status": status, "active_jobs": await active_jobs_payload()}
+                    
+                    # Job lists only change with the database
+                    if changes.version != version:
+                        version = changes.version
+                        sections["jobs"] = await jobs_payload()
+                    
+                    update = {}
+                    for name, payload in sections.items():
+                        content = orjson.dumps(payload, default=_orjson_default)
+                        if sent.get(name) != content:
+                            sent[name] = content
+                            update[name] = payload
+                    if update:
+                        await websocket.send_text(
+                            orjson.dumps(update, default=_orjson_default).decode()
+                        )
+                    
+                    # Idle dashboards sleep until the next write; busy ones also
+                    # wake periodically to follow job progress
+                    changed = asyncio.ensure_future(changes.wait_for_change(version))
+                    done, _ = await asyncio.wait(
+                        {changed, receiving},
+                        timeout=LIVE_UPDATE_INTERVAL if sections["active_jobs"] else None,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    changed.cancel()
+                    
+                    if receiving in done:
+                        if receiving.result()["type"] == "websocket.disconnect":
+                            break
+                        receiving = asyncio.ensure_future(websocket.receive())
+            except WebSocketDisconnect:
+                pass
+            finally:
+                receiving.cancel()
 
 
 async def run_web_server(config: RecodeXConfig, service: "RecodeXService"):
     """Run the web server."""
-    # Create templates
-    create_templates_directory()
-    
     # Create dashboard
     dashboard = WebDashboard(config, service)
     
@@ -424,7 +641,13 @@ async def run_web_server(config: RecodeXConfig, service: "RecodeXService"):
         host=config.web.host,
         port=config.web.port,
         reload=config.web.reload,
-        log_level="info"
+        log_level="info",
+        # A log line per dashboard poll is noise and costs event loop time
+        access_log=False,
+        limit_concurrency=SERVER_LIMIT_CONCURRENCY,
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=SERVER_SHUTDOWN_TIMEOUT
     )
     
     server = uvicorn.Server(server_config)
@@ -2,18 +2,23 @@
 
 import asyncio
 import logging
-from datetime import datetime
+import random
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Optional
 
 from ..config import RecodeXConfig, TranscodeProfile
 from ..core import TranscodeEngine, TranscodeJob
-from ..database import DatabaseManager, TranscodeRecord
+from ..database import DatabaseManager, Statistics, TranscodeRecord
 from ..monitoring import FileMonitor
-from ..web import run_web_server
 
 logger = logging.getLogger(__name__)
 
+# Seconds a worker waits after an error, doubling per consecutive error up to the max
+WORKER_BACKOFF_MIN = 1.0
+WORKER_BACKOFF_MAX = 60.0
+WORKER_STOP_TIMEOUT = 30.0
+
 
 class TranscodeWorker:
     """Individual worker for processing transcoding jobs."""
@@ -25,31 +30,48 @@ class TranscodeWorker:
         self.transcode_engine = TranscodeEngine()
         self.current_job: Optional[TranscodeJob] = None
         self.running = False
+        self._stop_event = asyncio.Event()
+        # Distinguishes consecutive jobs in status snapshots
+        self.jobs_started = 0
+        self._backoff = WORKER_BACKOFF_MIN
+        # Status dicts handed to the dashboard; refreshed in place on each poll
+        self._active_job: Optional[dict] = None
+        self._status = {
+            "worker_id": worker_id,
+            "running": False,
+            "current_job": {"input_path": None, "progress": 0.0, "status": "idle"}
+        }
     
     async def start(self, file_monitor: FileMonitor):
         """Start the worker loop."""
         self.running = True
+        self._stop_event.clear()
         logger.info(f"Worker {self.worker_id} started")
         
         while self.running:
             try:
-                # Get next job from monitor
+                # Wait for the next job from the monitor
                 job_data = await file_monitor.get_job()
-                
-                if not job_data:
-                    continue
-                
                 await self._process_job(job_data, file_monitor)
                 
+                self._backoff = WORKER_BACKOFF_MIN
+                
             except Exception as e:
-                logger.error(f"Worker {self.worker_id} error: {e}")
-                await asyncio.sleep(5)  # Wait before retrying
+                # Jittered so failing workers don't retry in lockstep; stop() cuts the wait short
+                delay = self._backoff * random.uniform(0.5, 1.0)
+                self._backoff = min(self._backoff * 2, WORKER_BACKOFF_MAX)
+                logger.error(f"Worker {self.worker_id} error: {e} (retrying in {delay:.1f}s)")
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
         
         logger.info(f"Worker {self.worker_id} stopped")
     
     async def stop(self):
         """Stop the worker."""
         self.running = False
+        self._stop_event.set()
         
         # Wait for current job to finish if running
         if self.current_job and self.current_job.status == "running":
@@ -58,12 +80,28 @@ class TranscodeWorker:
             # For now, we'll let it complete naturally
     
     async def _process_job(self, job_data: dict, file_monitor: FileMonitor):
-        """Process a single transcoding job."""
+        """Process a single transcoding job and signal when it is over."""
+        try:
+            # No session scope here: each record write opens and closes its own
+            # session, so nothing holds a connection while ffmpeg runs
+            await self._run_job(job_data, file_monitor)
+        finally:
+            # Wake up anyone waiting on this job (e.g. the transcode command),
+            # even when its record could not be created
+            done = job_data.get("done")
+            if done is not None:
+                done.set()
+    
+    async def _run_job(self, job_data: dict, file_monitor: FileMonitor):
+        """Transcode one job and record the outcome."""
         input_path = job_data["input_path"]
         output_path = job_data["output_path"]
         profile = job_data["profile"]
+        # Converted once for the record, the status dict and the log lines
+        input_str = str(input_path)
+        output_str = str(output_path)
         
-        logger.info(f"Worker {self.worker_id} processing: {input_path}")
+        logger.info(f"Worker {self.worker_id} processing: {input_str}")
         
         # Check if this is a database job (reprocessing) or a new job
         db_record_id = job_data.get("db_record_id")
@@ -73,13 +111,15 @@ class TranscodeWorker:
             record_id = db_record_id
             logger.info(f"Processing reprocessing job with database record ID: {record_id}")
         else:
-            # Create new database record for new files
+            # Create new database record for new files, already running
+            now = datetime.now(timezone.utc)
             record = TranscodeRecord(
-                input_path=str(input_path),
-                output_path=str(output_path),
+                input_path=input_str,
+                output_path=output_str,
                 profile_name=profile.name,
-                status="pending",
-                created_at=datetime.utcnow()
+                status="running",
+                created_at=now,
+                started_at=now
             )
             
             # Add to database
@@ -88,18 +128,26 @@ class TranscodeWorker:
         
         try:
             # Create transcoding job
-            self.current_job = TranscodeJob(input_path, output_path, profile)
-            
-            # Update record status to running
-            await self.db_manager.update_record(
-                record_id,
-                status="running",
-                started_at=datetime.utcnow()
+            self.current_job = TranscodeJob(
+                input_path,
+                output_path,
+                profile,
+                media_info=job_data.get("media_info"),
+                original_size=job_data.get("original_size")
             )
+            self.jobs_started += 1
+            self._active_job = {
+                "worker_id": self.worker_id,
+                "input_path": input_str,
+                "output_path": output_str,
+                "profile": profile.name,
+                "progress": 0.0,
+                "status": self.current_job.status
+            }
             
             # Dry run mode check
             if self.config.worker.dry_run:
-                logger.info(f"DRY RUN: Would transcode {input_path} -> {output_path}")
+                logger.info(f"DRY RUN: Would transcode {input_str} -> {output_str}")
                 await asyncio.sleep(2)  # Simulate processing time
                 success = True
             else:
@@ -111,7 +159,7 @@ class TranscodeWorker:
                 await self.db_manager.update_record(
                     record_id,
                     status="completed",
-                    completed_at=datetime.utcnow(),
+                    completed_at=datetime.now(timezone.utc),
                     original_size=self.current_job.original_size,
                     final_size=self.current_job.final_size,
                     processing_time=self.current_job.get_duration(),
@@ -122,44 +170,53 @@ class TranscodeWorker:
                 if not db_record_id:
                     file_monitor.mark_job_processed(job_data)
                 
-                logger.info(f"Worker {self.worker_id} completed: {input_path}")
+                logger.info(f"Worker {self.worker_id} completed: {input_str}")
                 
             else:
                 await self.db_manager.update_record(
                     record_id,
                     status="failed",
-                    completed_at=datetime.utcnow(),
+                    completed_at=datetime.now(timezone.utc),
                     error_message=self.current_job.error_message,
                     processing_time=self.current_job.get_duration()
                 )
                 
-                logger.error(f"Worker {self.worker_id} failed: {input_path}")
+                logger.error(f"Worker {self.worker_id} failed: {input_str}")
             
         except Exception as e:
-            logger.error(f"Worker {self.worker_id} exception processing {input_path}: {e}")
+            logger.error(f"Worker {self.worker_id} exception processing {input_str}: {e}")
             
             # Update record as failed
             await self.db_manager.update_record(
                 record_id,
                 status="failed",
-                completed_at=datetime.utcnow(),
+                completed_at=datetime.now(timezone.utc),
                 error_message=str(e)
             )
         
         finally:
             self.current_job = None
+            self._active_job = None
+    
+    def get_active_job(self) -> Optional[dict]:
+        """Get the running job's details, or None when idle."""
+        job, active = self.current_job, self._active_job
+        if job is None or active is None:
+            return None
+        active["progress"] = job.progress
+        active["status"] = job.status
+        return active
     
     def get_status(self) -> dict:
         """Get current worker status."""
-        return {
-            "worker_id": self.worker_id,
-            "running": self.running,
-            "current_job": {
-                "input_path": str(self.current_job.input_path) if self.current_job else None,
-                "progress": self.current_job.progress if self.current_job else 0.0,
-                "status": self.current_job.status if self.current_job else "idle"
-            }
-        }
+        self._status["running"] = self.running
+        current = self._status["current_job"]
+        active = self.get_active_job()
+        if active is None:
+            current.update(input_path=None, progress=0.0, status="idle")
+        else:
+            current.update(input_path=active["input_path"], progress=active["progress"], status=active["status"])
+        return self._status
 
 
 class WorkerManager:
@@ -201,16 +258,18 @@ class WorkerManager:
         
         logger.info("Stopping worker manager...")
         
-        # Stop all workers
-        for worker in self.workers.values():
-            await worker.stop()
+        # Stop all workers at once rather than one after another
+        await asyncio.gather(*(worker.stop() for worker in self.workers.values()))
         
         # Cancel worker tasks
         for task in self.worker_tasks.values():
             task.cancel()
         
-        # Wait for tasks to complete
-        await asyncio.gather(*self.worker_tasks.values(), return_exceptions=True)
+        # Wait for tasks to complete, but don't let one stuck worker hold up shutdown
+        if self.worker_tasks:
+            _, pending = await asyncio.wait(self.worker_tasks.values(), timeout=WORKER_STOP_TIMEOUT)
+            if pending:
+                logger.warning(f"{len(pending)} worker(s) did not stop within {WORKER_STOP_TIMEOUT:.0f}s")
         
         self.workers.clear()
         self.worker_tasks.clear()
@@ -239,17 +298,20 @@ class WorkerManager:
         active_jobs = []
         
         for worker in self.workers.values():
-            if worker.current_job:
-                active_jobs.append({
-                    "worker_id": worker.worker_id,
-                    "input_path": str(worker.current_job.input_path),
-                    "output_path": str(worker.current_job.output_path),
-                    "profile": worker.current_job.profile.name,
-                    "progress": worker.current_job.progress,
-                    "status": worker.current_job.status
-                })
+            active = worker.get_active_job()
+            if active is not None:
+                active_jobs.append(active)
         
         return active_jobs
+    
+    def get_active_jobs_signature(self) -> tuple:
+        """Get a cheap value that changes whenever get_active_jobs() would."""
+        signature = []
+        for worker in self.workers.values():
+            job = worker.current_job
+            if job is not None:
+                signature.append((worker.worker_id, worker.jobs_started, job.progress, job.status))
+        return tuple(signature)
 
 
 class RecodeXService:
@@ -275,7 +337,12 @@ class RecodeXService:
         await self.db_manager.initialize()
         
         # Create file monitor
-        self.file_monitor = FileMonitor(self.config.watch_folders, self.config.profiles, self.db_manager)
+        self.file_monitor = FileMonitor(
+            self.config.watch_folders,
+            self.config.profiles,
+            self.db_manager,
+            state_path=self.config.database.state_path
+        )
         await self.file_monitor.start()
         
         # Create and start worker manager
@@ -283,7 +350,7 @@ class RecodeXService:
         await self.worker_manager.start(self.file_monitor)
         
         # Start web server
-        self.web_server_task = asyncio.create_task(run_web_server(self.config, self))
+        self._start_web_server()
         
         self.running = True
         logger.info("RecodeX service started")
@@ -299,11 +366,18 @@ class RecodeXService:
         await self.db_manager.initialize()
         
         # Start web server
-        self.web_server_task = asyncio.create_task(run_web_server(self.config, self))
+        self._start_web_server()
         
         self.running = True
         logger.info("RecodeX web interface started")
     
+    def _start_web_server(self):
+        """Start the dashboard as a background task."""
+        # Imported here so CLI commands that never serve the dashboard skip FastAPI/uvicorn
+        from ..web import run_web_server
+        
+        self.web_server_task = asyncio.create_task(run_web_server(self.config, self))
+    
     async def stop(self):
         """Stop the RecodeX service."""
         if not self.running:
@@ -373,17 +447,18 @@ class RecodeXService:
     
     async def get_statistics(self) -> dict:
         """Get processing statistics."""
-        stats = await self.db_manager.get_statistics()
-        
-        return {
-            "total_processed": await stats.get_total_processed(),
-            "total_space_saved": await stats.get_total_space_saved(),
-            "total_original_size": await stats.get_total_original_size(),
-            "average_compression_ratio": await stats.get_average_compression_ratio(),
-            "average_processing_time": await stats.get_average_processing_time(),
-            "top_space_savers": await stats.get_top_space_savers(),
-            "recent_records": await stats.get_recent_records(),
-            "statistics_by_profile": await stats.get_statistics_by_profile(),
-            "statistics_by_codec": await stats.get_statistics_by_codec(),
-            "queue_status": await stats.get_queue_status()
-        }
\ No newline at end of file
+        async with self.db_manager.session_scope():
+            stats = Statistics()
+            
+            return {
+                "total_processed": await stats.get_total_processed(),
+                "total_space_saved": await stats.get_total_space_saved(),
+                "total_original_size": await stats.get_total_original_size(),
+                "average_compression_ratio": await stats.get_average_compression_ratio(),
+                "average_processing_time": await stats.get_average_processing_time(),
+                "top_space_savers": await stats.get_top_space_savers(),
+                "recent_records": await stats.get_recent_records(),
+                "statistics_by_profile": await stats.get_statistics_by_profile(),
+                "statistics_by_codec": await stats.get_statistics_by_codec(),
+                "queue_status": await stats.get_queue_status()
+            }
\ No newline at end of file
@@ -3,111 +3,114 @@
 Simple script to start RecodeX web interface for demonstration.
 """
 
-import asyncio
+import atexit
+import os
 import tempfile
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
+from recodex.cli import run_async
 from recodex.config import RecodeXConfig
 from recodex.web import WebDashboard
 from recodex.database import DatabaseManager, TranscodeRecord
-from recodex.workers import RecodeXService
 import uvicorn
 
 
+# Sample jobs for the demo database, built into fresh records on every setup
+_DEMO_COMPLETED_AT = datetime.now(timezone.utc)
+_DEMO_JOBS = (
+    dict(
+        input_path="/demo/video1.mp4",
+        output_path="/demo/video1_compressed.mp4",
+        profile_name="high_quality",
+        status="pending",
+        original_size=5000000
+    ),
+    dict(
+        input_path="/demo/video2.mkv",
+        output_path="/demo/video2_compressed.mp4", 
+        profile_name="mobile",
+        status="pending",
+        original_size=3000000
+    ),
+    dict(
+        input_path="/demo/movie1.avi",
+        output_path="/demo/movie1_compressed.mp4",
+        profile_name="high_quality",
+        status="completed",
+        completed_at=_DEMO_COMPLETED_AT,
+        processing_time=120.5,
+        original_size=15000000,
+        final_size=8000000,
+        original_codec="xvid",
+        final_codec="h264"
+    ),
+    dict(
+        input_path="/demo/movie2.wmv",
+        output_path="/demo/movie2_compressed.mp4",
+        profile_name="streaming",
+        status="completed", 
+        completed_at=_DEMO_COMPLETED_AT,
+        processing_time=95.2,
+        original_size=12000000,
+        final_size=6500000,
+        original_codec="wmv3",
+        final_codec="h264"
+    ),
+    dict(
+        input_path="/demo/corrupted.mp4",
+        output_path="/demo/corrupted_compressed.mp4",
+        profile_name="high_quality",
+        status="failed",
+        error_message="Input file is corrupted or unreadable",
+        original_size=8000000
+    ),
+    dict(
+        input_path="/demo/unsupported.flv",
+        output_path="/demo/unsupported_compressed.mp4",
+        profile_name="mobile",
+        status="failed", 
+        error_message="Codec not supported by hardware acceleration",
+        original_size=2500000
+    )
+)
+
+
 async def setup_demo_data():
     """Setup demo data for the web interface."""
-    # Create temporary database
-    db_file = Path("/tmp/demo_recodex.db")
-    if db_file.exists():
-        db_file.unlink()
+    # Create a fresh temporary database per run, removed again on exit
+    fd, name = tempfile.mkstemp(prefix="recodex_demo_", suffix=".db")
+    os.close(fd)
+    db_file = Path(name)
+    for suffix in ("", "-wal", "-shm"):  # SQLite's WAL sidecar files too
+        atexit.register(Path(name + suffix).unlink, missing_ok=True)
     
     db_url = f"sqlite:///{db_file}"
     db_manager = DatabaseManager(db_url)
     await db_manager.initialize()
     
     # Create sample jobs for demonstration
-    jobs = [
-        TranscodeRecord(
-            input_path="/demo/video1.mp4",
-            output_path="/demo/video1_compressed.mp4",
-            profile_name="high_quality",
-            status="pending",
-            original_size=5000000
-        ),
-        TranscodeRecord(
-            input_path="/demo/video2.mkv",
-            output_path="/demo/video2_compressed.mp4", 
-            profile_name="mobile",
-            status="pending",
-            original_size=3000000
-        ),
-        TranscodeRecord(
-            input_path="/demo/movie1.avi",
-            output_path="/demo/movie1_compressed.mp4",
-            profile_name="high_quality",
-            status="completed",
-            completed_at=datetime.utcnow(),
-            processing_time=120.5,
-            original_size=15000000,
-            final_size=8000000,
-            original_codec="xvid",
-            final_codec="h264"
-        ),
-        TranscodeRecord(
-            input_path="/demo/movie2.wmv",
-            output_path="/demo/movie2_compressed.mp4",
-            profile_name="streaming",
-            status="completed", 
-            completed_at=datetime.utcnow(),
-            processing_time=95.2,
-            original_size=12000000,
-            final_size=6500000,
-            original_codec="wmv3",
-            final_codec="h264"
-        ),
-        TranscodeRecord(
-            input_path="/demo/corrupted.mp4",
-            output_path="/demo/corrupted_compressed.mp4",
-            profile_name="high_quality",
-            status="failed",
-            error_message="Input file is corrupted or unreadable",
-            original_size=8000000
-        ),
-        TranscodeRecord(
-            input_path="/demo/unsupported.flv",
-            output_path="/demo/unsupported_compressed.mp4",
-            profile_name="mobile",
-            status="failed", 
-            error_message="Codec not supported by hardware acceleration",
-            original_size=2500000
-        )
-    ]
+    jobs = [TranscodeRecord(**job) for job in _DEMO_JOBS]
     
-    # Add jobs to database
-    for job in jobs:
-        await db_manager.add_record(job)
+    # Add jobs to database in one transaction
+    await db_manager.add_records(jobs)
     
     print(f"✅ Created demo database with {len(jobs)} sample jobs")
-    await db_manager.close()
-    return db_file
+    return db_file, db_manager
 
 
-def main():
-    """Start the web interface with demo data."""
-    print("🎬 Starting RecodeX Web Interface Demo")
-    print("=" * 50)
-    
+async def run_demo():
+    """Set up the demo data and serve the dashboard on the same event loop."""
     # Setup demo data
-    db_file = asyncio.run(setup_demo_data())
+    db_file, db_manager = await setup_demo_data()
     
     # Create minimal config for web interface
     config = RecodeXConfig()
     
     # Create mock service with database
     class MockService:
-        def __init__(self, db_file):
-            self.db_manager = DatabaseManager(f"sqlite:///{db_file}")
+        def __init__(self, db_manager):
+            self.db_manager = db_manager
             self.worker_manager = None
             self.config_path = None
             
@@ -144,10 +147,7 @@ def main():
                 "average_processing_time": 107.85
             }
     
-    service = MockService(db_file)
-    
-    # Initialize database
-    asyncio.run(service.db_manager.initialize())
+    service = MockService(db_manager)
     
     # Create web dashboard
     dashboard = WebDashboard(config, service)
@@ -160,8 +160,23 @@ def main():
     print("\nPress Ctrl+C to stop the server")
     print("=" * 50)
     
-    # Start the web server
-    uvicorn.run(dashboard.app, host="127.0.0.1", port=8000, log_level="warning")
+    # Serve on the loop run_async already set up (uvloop when installed); "auto" picks httptools
+    server = uvicorn.Server(uvicorn.Config(
+        dashboard.app, host="127.0.0.1", port=8000, http="auto", log_level="warning"
+    ))
+    await server.serve()
+
+
+def main():
+    """Start the web interface with demo data."""
+    print("🎬 Starting RecodeX Web Interface Demo")
+    print("=" * 50)
+    
+    try:
+        run_async(run_demo())
+    except KeyboardInterrupt:
+        # uvicorn re-raises Ctrl+C once it has shut down; that's the normal way out
+        pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+"""Shared fixtures for the RecodeX tests."""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from recodex.database import DatabaseManager
+
+
+@pytest.fixture
+def db_path():
+    """Path to a fresh SQLite database file, removed again after the test."""
+    # mkstemp + close rather than an open NamedTemporaryFile, which SQLite can't reopen on Windows
+    fd, name = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    yield Path(name)
+    for suffix in ("", "-wal", "-shm"):
+        Path(name + suffix).unlink(missing_ok=True)
+
+
+@pytest_asyncio.fixture
+async def db_manager():
+    """Initialized DatabaseManager on a private in-memory SQLite database."""
+    # In-memory aiosqlite engines get SQLAlchemy's StaticPool, so every session sees the same database
+    manager = DatabaseManager("sqlite:///:memory:")
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+@pytest_asyncio.fixture
+async def file_db_manager(db_path):
+    """Initialized DatabaseManager on a SQLite file, for tests that need real separate connections."""
+    manager = DatabaseManager(f"sqlite:///{db_path}")
+    await manager.initialize()
+    yield manager
+    await manager.close()
@@ -0,0 +1,34 @@
+"""Tests for the RecodeX command line helpers."""
+
+import asyncio
+import subprocess
+import sys
+import pytest
+
+from recodex.cli import run_async
+
+
+def test_run_async_returns_result():
+    """Test that run_async drives a coroutine and returns its result."""
+    async def compute():
+        await asyncio.sleep(0)
+        return 42
+    
+    assert run_async(compute()) == 42
+
+
+def test_run_async_uses_uvloop_when_available():
+    """Test that run_async runs on uvloop when it is installed."""
+    uvloop = pytest.importorskip("uvloop")
+    
+    async def loop_type():
+        return type(asyncio.get_running_loop())
+    
+    assert issubclass(run_async(loop_type()), uvloop.Loop)
+
+
+def test_cli_import_skips_web_stack():
+    """Test that importing the CLI does not pull in FastAPI or uvicorn."""
+    code = "import sys, recodex.cli; print(sorted({'fastapi', 'uvicorn', 'recodex.web'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -1,11 +1,14 @@
 """Tests for RecodeX configuration."""
 
+import os
 import pytest
 from pathlib import Path
 import tempfile
 import yaml
+from pydantic import ValidationError
+from unittest.mock import patch
 
-from recodex.config import RecodeXConfig, TranscodeProfile, WatchFolder, load_config
+from recodex.config import RecodeXConfig, TranscodeProfile, WatchFolder, build_profile_index, load_config
 
 
 def test_transcode_profile_creation():
@@ -24,6 +27,35 @@ def test_transcode_profile_creation():
     assert profile.hardware_accel is True  # Default value
 
 
+
+def test_transcode_profile_frozen():
+    """Test that profiles are immutable and hashable."""
+    profile = TranscodeProfile(name="test_profile")
+    
+    with pytest.raises(ValidationError):
+        profile.video_codec = "h265"
+    assert profile == TranscodeProfile(name="test_profile")
+    assert len({profile, TranscodeProfile(name="test_profile")}) == 1
+
+
+
+def test_build_profile_index():
+    """Test that the profile index resolves keys before names and is read-only."""
+    first = TranscodeProfile(name="Shared")
+    second = TranscodeProfile(name="Shared")
+    keyed = TranscodeProfile(name="Other")
+    index = build_profile_index({"a": first, "b": second, "Shared": keyed})
+    
+    assert index["a"] == ("a", first)
+    assert index["Other"] == ("Shared", keyed)
+    # "Shared" is both a name and a key; the key wins
+    assert index["Shared"] == ("Shared", keyed)
+    assert build_profile_index({"a": first, "b": second})["Shared"][1] is first
+    
+    with pytest.raises(TypeError):
+        index["c"] = ("c", first)
+
+
 def test_watch_folder_creation():
     """Test creating a watch folder configuration."""
     folder = WatchFolder(
@@ -104,4 +136,80 @@ def test_load_config_nonexistent_file():
         config = load_config(non_existent_path)
         
         # Should return default config
-        assert len(config.profiles) == 3  # Default profiles
\ No newline at end of file
+        assert len(config.profiles) == 3  # Default profiles
+
+def test_load_config_cached_until_file_changes():
+    """Test that an unchanged config file is only parsed once."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path = Path(temp_dir) / "config.yaml"
+        RecodeXConfig(log_level="DEBUG").to_yaml(config_path)
+        
+        with patch.object(RecodeXConfig, "from_yaml", wraps=RecodeXConfig.from_yaml) as from_yaml:
+            first = load_config(config_path)
+            second = load_config(config_path)
+        assert from_yaml.call_count == 1
+        assert second.log_level == "DEBUG"
+        
+        # Unsaved edits to one caller's config don't leak into the next
+        first.log_level = "ERROR"
+        first.profiles["scratch"] = TranscodeProfile(name="scratch")
+        third = load_config(config_path)
+        assert third is not first and third is not second
+        assert third.log_level == "DEBUG"
+        assert "scratch" not in third.profiles
+        
+        RecodeXConfig(log_level="WARNING").to_yaml(config_path)
+        # Make sure the mtime differs even on coarse-grained filesystems
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        
+        reloaded = load_config(config_path)
+        assert reloaded is not first
+        assert reloaded.log_level == "WARNING"
+        
+        # An edit that keeps the mtime (coarse timestamps) is still seen if the size changed
+        mtime_ns = config_path.stat().st_mtime_ns
+        RecodeXConfig(log_level="CRITICAL").to_yaml(config_path)
+        os.utime(config_path, ns=(mtime_ns, mtime_ns))
+        assert load_config(config_path).log_level == "CRITICAL"
+
+
+def test_to_yaml_replaces_file_atomically():
+    """Test that saving swaps in a complete file and leaves no temporary behind."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path = Path(temp_dir) / "config.yaml"
+        RecodeXConfig(log_level="DEBUG").to_yaml(config_path)
+        
+        with patch("recodex.config.yaml.dump", side_effect=RuntimeError("disk full")):
+            with pytest.raises(RuntimeError):
+                RecodeXConfig(log_level="WARNING").to_yaml(config_path)
+        assert RecodeXConfig.from_yaml(config_path).log_level == "DEBUG"
+        
+        RecodeXConfig(log_level="WARNING").to_yaml(config_path)
+        assert RecodeXConfig.from_yaml(config_path).log_level == "WARNING"
+        assert [p.name for p in Path(temp_dir).iterdir()] == ["config.yaml"]
+
+
+def test_default_config_without_instance():
+    """Test that the default configuration can be built from the class."""
+    config = RecodeXConfig.get_default_config()
+    
+    assert isinstance(config, RecodeXConfig)
+    assert set(config.profiles) == {"high_quality", "balanced", "small_file"}
+
+
+def test_watch_folder_extension_set():
+    """Test that watch folder extensions are available as a lower-cased set."""
+    folder = WatchFolder(
+        path=Path("/test/path"),
+        profile="test_profile",
+        extensions=[".MP4", ".mkv"]
+    )
+    
+    assert folder.ext_set == frozenset({".mp4", ".mkv"})
+    assert folder.ext_set is folder.ext_set
+    assert "ext_set" not in folder.model_dump()
+    
+    # Extensions written without the leading dot still match file suffixes
+    folder = WatchFolder(path=Path("/test/path"), profile="test_profile", extensions=["MKV", ".avi"])
+    assert folder.ext_set == frozenset({".mkv", ".avi"})
@@ -1,10 +1,14 @@
 """Tests for RecodeX core functionality."""
 
+import asyncio
+import os
 import pytest
 import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch, AsyncMock
 
+import ffmpeg
+
 from recodex.core import HardwareAcceleration, MediaInfo, TranscodeJob, TranscodeEngine
 from recodex.config import TranscodeProfile
 
@@ -51,6 +55,7 @@ def test_transcode_job_creation():
     assert job.profile == profile
     assert job.status == "pending"
     assert job.progress == 0.0
+    assert not hasattr(job, "__dict__")  # Slotted to keep queued jobs small
 
 
 def test_transcode_job_calculations():
@@ -272,4 +277,269 @@ async def test_transcode_job_dry_run():
     finally:
         input_path.unlink()
         if output_path.exists():
-            output_path.unlink()
\ No newline at end of file
+            output_path.unlink()
+
+def test_hardware_acceleration_detection_is_cached():
+    """Test that hardware detection only probes once until invalidated."""
+    HardwareAcceleration.invalidate_cache()
+    try:
+        with patch("recodex.core.subprocess.run", side_effect=FileNotFoundError) as mock_run:
+            accelerations = HardwareAcceleration.get_available_accelerations()
+            probes = mock_run.call_count
+            assert probes > 0
+            
+            TranscodeEngine()
+            assert HardwareAcceleration.get_available_accelerations() is accelerations
+            assert mock_run.call_count == probes
+            
+            HardwareAcceleration.invalidate_cache()
+            HardwareAcceleration.get_available_accelerations()
+            assert mock_run.call_count == probes * 2
+    finally:
+        HardwareAcceleration.invalidate_cache()
+
+
+def test_hardware_acceleration_from_ffmpeg_capabilities():
+    """Test that acceleration support is parsed from ffmpeg's own listings."""
+    hwaccels = "Hardware acceleration methods:\ncuda\nvaapi\nqsv\n\n"
+    encoders = (
+        "Encoders:\n"
+        " V..... = Video\n"
+        " ------\n"
+        " V....D libx264              libx264 H.264 / AVC (codec h264)\n"
+        " V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)\n"
+        " V....D hevc_vaapi           H.265/HEVC (VAAPI) (codec hevc)\n"
+    )
+    
+    def fake_run(cmd, **kwargs):
+        output = hwaccels if cmd[-1] == "-hwaccels" else encoders
+        return Mock(returncode=0, stdout=output)
+    
+    HardwareAcceleration.invalidate_cache()
+    try:
+        with patch("recodex.core.subprocess.run", side_effect=fake_run) as mock_run:
+            with patch("recodex.core.Path.exists", return_value=True):
+                accelerations = HardwareAcceleration.get_available_accelerations()
+            
+            assert accelerations == {"nvenc": True, "qsv": False, "amf": False, "vaapi": True}
+            assert mock_run.call_count == 2
+    finally:
+        HardwareAcceleration.invalidate_cache()
+
+
+def _fake_process(stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0):
+    """Create a stand-in for an asyncio subprocess with canned output."""
+    process = Mock()
+    process.stdout = asyncio.StreamReader()
+    process.stdout.feed_data(stdout)
+    process.stdout.feed_eof()
+    process.stderr = asyncio.StreamReader()
+    process.stderr.feed_data(stderr)
+    process.stderr.feed_eof()
+    process.wait = AsyncMock(return_value=returncode)
+    process.returncode = returncode
+    return process
+
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_reuses_media_info():
+    """Test that a job's existing probe result is used for progress tracking."""
+    media_info = MediaInfo(Path("/input.mp4"))
+    media_info._info = {"format": {"duration": "10.0"}, "streams": []}
+    job = TranscodeJob(Path("/input.mp4"), Path("/output.mp4"), TranscodeProfile(name="test"), media_info=media_info)
+    
+    engine = TranscodeEngine()
+    output_stream = ffmpeg.output(ffmpeg.input(str(job.input_path)), str(job.output_path))
+    
+    with patch("recodex.core.ffmpeg.probe") as mock_probe, \
+         patch("recodex.core.asyncio.create_subprocess_exec", AsyncMock(return_value=_fake_process())):
+        result = await engine._run_ffmpeg(output_stream, job)
+    
+    mock_probe.assert_not_called()
+    assert result.returncode == 0
+    assert job.progress == 100.0
+
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_parses_progress_from_stdout():
+    """Test that progress is read from ffmpeg's -progress output."""
+    media_info = MediaInfo(Path("/input.mp4"))
+    media_info._info = {"format": {"duration": "10.0"}, "streams": []}
+    job = TranscodeJob(Path("/input.mp4"), Path("/output.mp4"), TranscodeProfile(name="test"), media_info=media_info)
+    
+    engine = TranscodeEngine()
+    output_stream = ffmpeg.output(ffmpeg.input(str(job.input_path)), str(job.output_path))
+    progress = b"frame=1\nout_time_us=N/A\nprogress=continue\nframe=50\nout_time_us=5000000\nprogress=continue\n"
+    process = _fake_process(stdout=progress, stderr=b"Conversion failed!\n", returncode=1)
+    
+    with patch("recodex.core.asyncio.create_subprocess_exec", AsyncMock(return_value=process)) as mock_exec:
+        result = await engine._run_ffmpeg(output_stream, job)
+    
+    cmd = mock_exec.call_args.args
+    assert cmd[1:4] == ("-progress", "pipe:1", "-nostats")
+    assert job.progress == 50.0
+    assert result.returncode == 1
+    assert b"Conversion failed!" in result.stderr
+
+
+def test_transcode_engine_input_options():
+    """Test that hardware encoders get matching hardware decoding."""
+    engine = TranscodeEngine()
+    engine.hardware_accel = {"nvenc": True, "qsv": False, "amf": False, "vaapi": False}
+    
+    profile = TranscodeProfile(name="nvenc_test", video_codec="h264")
+    video_options = engine._get_video_options(profile)
+    assert video_options["c:v"] == "h264_nvenc"
+    assert engine._get_input_options(video_options) == {
+        "hwaccel": "cuda", "hwaccel_output_format": "cuda"
+    }
+    
+    engine.hardware_accel = {"nvenc": False, "qsv": False, "amf": False, "vaapi": True}
+    video_options = engine._get_video_options(profile)
+    assert engine._get_input_options(video_options)["hwaccel"] == "vaapi"
+    
+    # Software encoding keeps software decoding
+    software = TranscodeProfile(name="sw_test", video_codec="h264", hardware_accel=False)
+    assert engine._get_input_options(engine._get_video_options(software)) == {}
+
+
+def test_transcode_engine_builds_single_decode_for_multiple_outputs():
+    """Test that several renditions share one ffmpeg run and one decode."""
+    engine = TranscodeEngine()
+    engine.hardware_accel = {"nvenc": False, "qsv": False, "amf": False, "vaapi": False}
+    
+    small = TranscodeProfile(name="small", video_codec="h265", video_crf=28, hardware_accel=False)
+    large = TranscodeProfile(name="large", video_codec="h264", video_crf=20, subtitles="none", hardware_accel=False)
+    outputs = [(Path("/out/small.mp4"), small), (Path("/out/large.mp4"), large)]
+    temp_outputs = [Path("/out/small.tmp.mp4"), Path("/out/large.tmp.mp4")]
+    
+    cmd = ffmpeg.compile(engine._build_command(Path("/input.mkv"), outputs, temp_outputs))
+    
+    assert cmd.count("-i") == 1
+    assert "[0:v]split=2" in cmd[cmd.index("-filter_complex") + 1]
+    assert cmd.index("/out/small.tmp.mp4") < cmd.index("/out/large.tmp.mp4")
+    assert "libx265" in cmd and "libx264" in cmd
+    # Subtitles are only mapped for the output that keeps them
+    assert cmd.count("0:s?") == 1
+
+
+def test_transcode_job_defaults_to_single_output():
+    """Test that a job without explicit outputs writes its own output path."""
+    profile = TranscodeProfile(name="test")
+    job = TranscodeJob(Path("/input.mp4"), Path("/output.mp4"), profile)
+    
+    assert job.outputs == [(Path("/output.mp4"), profile)]
+
+
+@pytest.mark.asyncio
+async def test_needs_transcoding_checks_audio_and_bitrate():
+    """Test the audio and bitrate checks, which share a single probe."""
+    media_info = MediaInfo(Path("/input.mkv"))
+    mock_info = {
+        "streams": [
+            {"codec_type": "video", "codec_name": "h264"},
+            {"codec_type": "audio", "codec_name": "ac3"},
+            {"codec_type": "audio", "codec_name": "aac"}
+        ],
+        "format": {"bit_rate": "8000000"}
+    }
+    
+    with patch("ffmpeg.probe", return_value=mock_info) as mock_probe:
+        # First audio stream is AC-3, so converting to AAC is needed
+        aac_profile = TranscodeProfile(name="aac", video_codec="h264", audio_codec="aac")
+        assert await media_info.needs_transcoding(aac_profile) is True
+        
+        # 8 Mbps is well above a 2 Mbps target
+        bitrate_profile = TranscodeProfile(name="2m", video_codec="h264", video_bitrate="2M")
+        assert await media_info.needs_transcoding(bitrate_profile) is True
+        
+        # Matching codecs within the bitrate budget are left alone
+        keep_profile = TranscodeProfile(name="keep", video_codec="h264", video_bitrate="8M")
+        assert await media_info.needs_transcoding(keep_profile) is False
+    
+    mock_probe.assert_called_once()
+
+
+def test_media_info_file_size_stats_once():
+    """Test that the file size is read from a single cached stat."""
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+        f.write(b"x" * 1234)
+        f.flush()
+        media_info = MediaInfo(Path(f.name))
+        
+        with patch("recodex.core.os.stat", wraps=os.stat) as mock_stat:
+            assert media_info.get_file_size() == 1234
+            assert media_info.get_file_size() == 1234
+        
+        mock_stat.assert_called_once()
+
+
+def test_transcode_job_accepts_known_original_size():
+    """Test that a size measured by the scanner is kept on the job."""
+    job = TranscodeJob(Path("/input.mp4"), Path("/output.mp4"), TranscodeProfile(name="test"), original_size=4096)
+    assert job.original_size == 4096
+
+
+@pytest.mark.asyncio
+async def test_transcode_engine_run_many_bounds_concurrency():
+    """Test that run_many runs jobs in parallel up to the concurrency limit."""
+    engine = TranscodeEngine()
+    jobs = [
+        TranscodeJob(Path(f"/in_{i}.mp4"), Path(f"/out_{i}.mp4"), TranscodeProfile(name="Test"))
+        for i in range(5)
+    ]
+    running = 0
+    peak = 0
+    
+    async def fake_transcode(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return job is not jobs[2]
+    
+    with patch.object(engine, "transcode", side_effect=fake_transcode):
+        results = await engine.run_many(jobs, concurrency=2)
+    
+    assert results == [True, True, False, True, True]
+    assert peak == 2
+
+
+def test_transcode_engine_default_concurrency():
+    """Test that NVENC is limited to its session count and software encodes to half the cores."""
+    engine = TranscodeEngine()
+    
+    engine.hardware_accel = {"nvenc": True}
+    assert engine.default_concurrency() == 2
+    
+    engine.hardware_accel = {"nvenc": False}
+    with patch("recodex.core.os.cpu_count", return_value=8):
+        assert engine.default_concurrency() == 4
+    with patch("recodex.core.os.cpu_count", return_value=None):
+        assert engine.default_concurrency() == 1
+
+
+@pytest.mark.asyncio
+async def test_transcode_passthrough_copies_without_ffmpeg():
+    """Test that a stream-copy job into the same container is copied, not run through ffmpeg."""
+    profile = TranscodeProfile(name="remux", video_codec="copy", audio_codec="copy")
+    engine = TranscodeEngine()
+    assert engine._get_video_options(profile) == {"c:v": "copy"}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = Path(temp_dir) / "movie.mkv"
+        input_path.write_bytes(b"fake video data")
+        output_path = Path(temp_dir) / "out" / "movie.mkv"
+        output_path.parent.mkdir()
+        
+        job = TranscodeJob(input_path, output_path, profile)
+        with patch.object(engine, '_run_ffmpeg') as mock_ffmpeg:
+            assert await engine.transcode(job) is True
+        
+        mock_ffmpeg.assert_not_called()
+        assert output_path.read_bytes() == b"fake video data"
+        assert job.final_size == job.original_size
+        
+        # A different container still needs ffmpeg to remux
+        assert not engine._is_passthrough(input_path, [(output_path.with_suffix(".mp4"), profile)])
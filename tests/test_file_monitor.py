@@ -0,0 +1,815 @@
+"""Tests for the inotify-based file monitor."""
+
+import asyncio
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from watchdog.events import FileCreatedEvent
+
+from recodex.config import WatchFolder, TranscodeProfile
+from recodex.core import MediaInfo
+from recodex.database import ChangeNotifier, DatabaseManager, TranscodeRecord
+from recodex.monitoring import (
+    DIR_NAMES_TTL, IN_Q_OVERFLOW, SCAN_CONCURRENCY, DecisionStore, FileMonitor, Inotify, MediaFileHandler,
+    _iter_media_files, _mount_type
+)
+
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+
+
+def _make_monitor(watch_path: Path, recursive: bool = False) -> FileMonitor:
+    """Create a monitor for a single watch folder."""
+    watch_folder = WatchFolder(
+        path=watch_path,
+        profile="test_profile",
+        extensions=[".mp4", ".mkv"],
+        recursive=recursive
+    )
+    profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+    return FileMonitor([watch_folder], profiles)
+
+
+@pytest.mark.asyncio
+async def test_single_inotify_instance_for_all_folders():
+    """Test that all watch folders share one inotify file descriptor."""
+    with tempfile.TemporaryDirectory() as dir_a, tempfile.TemporaryDirectory() as dir_b:
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        monitor = FileMonitor([
+            WatchFolder(path=Path(dir_a), profile="test_profile", recursive=False),
+            WatchFolder(path=Path(dir_b), profile="test_profile", recursive=False),
+        ], profiles)
+
+        await monitor.start()
+        try:
+            assert isinstance(monitor._inotify, Inotify)
+            assert monitor.observers == []
+            assert len(monitor._watches) == 2
+        finally:
+            await monitor.stop()
+
+        assert monitor._inotify is None
+
+
+@pytest.mark.asyncio
+async def test_new_file_dispatched_to_handler():
+    """Test that a new file in a watch folder reaches its handler."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+
+        seen = asyncio.Queue()
+
+        async def mock_process_file(file_path, closed=False):
+            await seen.put(file_path)
+
+        monitor.handlers[0]._process_new_file = mock_process_file
+
+        try:
+            (watch_path / "movie.mp4").write_bytes(b"fake video content")
+            file_path = await asyncio.wait_for(seen.get(), timeout=2.0)
+            assert file_path == watch_path / "movie.mp4"
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_recursive_folder_watches_subdirectories():
+    """Test that recursive watch folders get a watch per subdirectory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        (watch_path / "season1").mkdir()
+        monitor = _make_monitor(watch_path, recursive=True)
+        await monitor.start()
+
+        seen = asyncio.Queue()
+
+        async def mock_process_file(file_path, closed=False):
+            await seen.put(file_path)
+
+        monitor.handlers[0]._process_new_file = mock_process_file
+
+        try:
+            watched = {path for _handler, path in monitor._watches.values()}
+            assert watch_path / "season1" in watched
+
+            (watch_path / "season1" / "episode.mkv").write_bytes(b"fake video content")
+            file_path = await asyncio.wait_for(seen.get(), timeout=2.0)
+            assert file_path == watch_path / "season1" / "episode.mkv"
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_non_media_files_are_filtered():
+    """Test that files with unwatched extensions never reach the handler."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+
+        seen = asyncio.Queue()
+
+        async def mock_process_file(file_path, closed=False):
+            await seen.put(file_path)
+
+        monitor.handlers[0]._process_new_file = mock_process_file
+
+        try:
+            (watch_path / "notes.txt").write_text("not a video")
+            (watch_path / "MOVIE.MKV").write_bytes(b"fake video content")
+            file_path = await asyncio.wait_for(seen.get(), timeout=2.0)
+            assert file_path == watch_path / "MOVIE.MKV"
+            assert seen.empty()
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_new_subdirectory_is_watched():
+    """Test that subdirectories created after start are picked up."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path, recursive=True)
+        await monitor.start()
+
+        seen = asyncio.Queue()
+
+        async def mock_process_file(file_path, closed=False):
+            await seen.put(file_path)
+
+        monitor.handlers[0]._process_new_file = mock_process_file
+
+        try:
+            new_dir = watch_path / "season2"
+            new_dir.mkdir()
+            # Let the monitor register the new directory before writing into it
+            for _ in range(50):
+                if any(path == new_dir for _h, path in monitor._watches.values()):
+                    break
+                await asyncio.sleep(0.01)
+
+            (new_dir / "episode.mp4").write_bytes(b"fake video content")
+            file_path = await asyncio.wait_for(seen.get(), timeout=2.0)
+            assert file_path == new_dir / "episode.mp4"
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_ready_and_first_job_events():
+    """Test that the monitor signals readiness and the first queued job."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        assert not monitor.ready.is_set()
+        
+        await monitor.start()
+        try:
+            assert monitor.ready.is_set()
+            assert not monitor._first_job.is_set()
+            
+            input_file = watch_path / "manual.txt"
+            input_file.write_text("not watched, queued by hand")
+            await monitor.add_manual_job(input_file, "test_profile")
+            
+            await asyncio.wait_for(monitor._first_job.wait(), timeout=1.0)
+        finally:
+            await monitor.stop()
+        
+        assert not monitor.ready.is_set()
+
+
+@pytest.mark.asyncio
+async def test_queue_overflow_triggers_rescan():
+    """Test that an inotify queue overflow re-dispatches files in the watch folder."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+        
+        seen = asyncio.Queue()
+        
+        async def mock_process_file(file_path, closed=False):
+            await seen.put(file_path)
+        
+        monitor.handlers[0]._process_new_file = mock_process_file
+        
+        try:
+            # Simulate events lost to an overflow: the file exists but its event is never read
+            asyncio.get_running_loop().remove_reader(monitor._inotify.fd)
+            (watch_path / "missed.mp4").write_bytes(b"fake video content")
+            
+            pending = [[(-1, IN_Q_OVERFLOW, b"")]]
+            monitor._inotify.read_events = lambda: pending.pop() if pending else []
+            monitor._drain()
+            
+            file_path = await asyncio.wait_for(seen.get(), timeout=2.0)
+            assert file_path == watch_path / "missed.mp4"
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_mark_job_processed_uses_closest_watch_folder():
+    """Test that a finished job is marked on the handler of its deepest watch folder."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        outer = Path(temp_dir)
+        inner = outer / "shows"
+        inner.mkdir()
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        outer_folder = WatchFolder(path=outer, profile="test_profile", recursive=True)
+        inner_folder = WatchFolder(path=inner, profile="test_profile", recursive=False)
+        monitor = FileMonitor([outer_folder, inner_folder], profiles)
+        await monitor.start()
+        
+        try:
+            outer_handler, inner_handler = monitor.handlers
+            input_path = inner / "episode.mp4"
+            monitor.mark_job_processed({"input_path": input_path, "watch_folder": inner_folder})
+            
+            assert str(input_path) in inner_handler.processed_files
+            assert str(input_path) not in outer_handler.processed_files
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_mark_job_processed_deletes_original_off_loop():
+    """Test that originals are deleted in the executor and manual jobs are accepted."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile", delete_original=True)
+        monitor = FileMonitor([watch_folder], profiles)
+        
+        input_path = watch_path / "movie.mp4"
+        input_path.write_bytes(b"fake video content")
+        monitor.mark_job_processed({"input_path": input_path, "watch_folder": watch_folder})
+        assert len(monitor._tasks) == 1
+        await asyncio.gather(*monitor._tasks)
+        assert not input_path.exists()
+        
+        manual_path = watch_path / "manual.mp4"
+        manual_path.write_bytes(b"fake video content")
+        monitor.mark_job_processed({"input_path": manual_path, "watch_folder": None})
+        assert manual_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_mark_job_processed_records_off_loop_before_deleting():
+    """Test that the processed record is written in the executor and the original deleted only afterwards."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile", delete_original=True)
+        monitor = FileMonitor([watch_folder], profiles)
+        store = DecisionStore(watch_path / "state.db")
+        handler = MediaFileHandler(
+            watch_folder, monitor.job_queue, profiles, asyncio.get_running_loop(), decisions=store
+        )
+        monitor._handler_by_root[watch_path] = handler
+        
+        input_path = watch_path / "movie.mp4"
+        input_path.write_bytes(b"fake video content")
+        st = input_path.stat()
+        threads = []
+        original_mark_processed = store.mark_processed
+        
+        def mark_processed(*args):
+            threads.append(threading.current_thread())
+            original_mark_processed(*args)
+        
+        store.mark_processed = mark_processed
+        try:
+            monitor.mark_job_processed({"input_path": input_path, "watch_folder": watch_folder})
+            assert str(input_path) in handler.processed_files
+            assert len(monitor._tasks) == 2
+            await asyncio.gather(*monitor._tasks)
+            
+            assert not input_path.exists()
+            assert len(threads) == 1 and threads[0] is not threading.main_thread()
+            assert store.is_processed(str(input_path), st.st_size, st.st_mtime_ns)
+        finally:
+            store.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_file_ready_stats_once_per_check():
+    """Test that the readiness wait issues a single stat per poll and returns the stable size."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+        
+        try:
+            input_file = watch_path / "movie.mp4"
+            input_file.write_bytes(b"fake video content")
+            
+            with patch("recodex.monitoring.asyncio.sleep", new=AsyncMock()), \
+                    patch("recodex.monitoring.os.stat", wraps=os.stat) as stat:
+                size = await monitor.handlers[0]._wait_for_file_ready(input_file)
+                missing = await monitor.handlers[0]._wait_for_file_ready(watch_path / "gone.mp4", timeout=2)
+            
+            assert size == len(b"fake video content")
+            assert missing is None
+            # One growing check and three stable ones, then two misses
+            assert stat.call_count == 6
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_closed_file_skips_readiness_wait():
+    """Test that files reported on close-after-write are not polled for stability."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+        
+        handler = monitor.handlers[0]
+        handler._wait_for_file_ready = AsyncMock(return_value=None)
+        # Stop right after the readiness step
+        handler._is_already_processed = AsyncMock(return_value=True)
+        
+        try:
+            input_file = watch_path / "movie.mp4"
+            input_file.write_bytes(b"fake video content")
+            for _ in range(200):
+                if str(input_file) in handler.processed_files:
+                    break
+                await asyncio.sleep(0.01)
+            
+            assert str(input_file) in handler.processed_files
+            handler._wait_for_file_ready.assert_not_awaited()
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_already_processed_check_lists_output_directory_once():
+    """Test that output checks for every profile share one cached directory listing."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {
+            "small": TranscodeProfile(name="small", container="mkv"),
+            "archive": TranscodeProfile(name="archive", container="mp4")
+        }
+        watch_folder = WatchFolder(path=watch_path, profile="small")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        
+        with patch("recodex.monitoring.os.scandir", wraps=os.scandir) as scandir:
+            assert not await handler._is_already_processed(watch_path / "a.mp4")
+            assert not await handler._is_already_processed(watch_path / "b.mp4")
+            assert scandir.call_count == 1
+            
+            # A finished transcode invalidates the listing of its output directory
+            (watch_path / "a_archive.mp4").write_bytes(b"output")
+            handler.mark_processed(watch_path / "a.mp4")
+            assert await handler._is_already_processed(watch_path / "a.mp4")
+            assert scandir.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_output_directory_listed_off_loop():
+    """Test that a cache miss lists the output directory in the executor, not on the loop."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        (watch_path / "a_small.mkv").write_bytes(b"output")
+        profiles = {"small": TranscodeProfile(name="small", container="mkv")}
+        watch_folder = WatchFolder(path=watch_path, profile="small")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        threads = []
+        real_scandir = os.scandir
+        
+        def scandir(path):
+            threads.append(threading.current_thread())
+            return real_scandir(path)
+        
+        with patch("recodex.monitoring.os.scandir", side_effect=scandir):
+            assert await handler._is_already_processed(watch_path / "a.mp4")
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_output_directory_listing_invalidated_expired_and_bounded():
+    """Test that watchdog events and the listing TTL refresh output listings, and the cache stays bounded."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"small": TranscodeProfile(name="small", container="mkv")}
+        watch_folder = WatchFolder(path=watch_path, profile="small")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        handler._process_new_file = AsyncMock()
+        
+        assert not await handler._is_already_processed(watch_path / "a.mp4")
+        (watch_path / "a_small.mkv").write_bytes(b"output")
+        # Watchdog events arrive without the closed flag
+        handler._schedule(watch_path / "b.mp4")
+        assert await handler._is_already_processed(watch_path / "a.mp4")
+        
+        # Changes no event reported show up once the listing expires
+        assert not await handler._is_already_processed(watch_path / "c.mp4")
+        (watch_path / "c_small.mkv").write_bytes(b"output")
+        assert not await handler._is_already_processed(watch_path / "c.mp4")
+        with patch("recodex.monitoring.time.monotonic", return_value=time.monotonic() + DIR_NAMES_TTL):
+            assert await handler._is_already_processed(watch_path / "c.mp4")
+        
+        with patch("recodex.monitoring.DIR_NAMES_CACHE_SIZE", 2):
+            for name in ("x", "y", "z"):
+                await handler._dir_names(watch_path / name)
+        assert list(handler._dir_names_cache) == [os.path.join(temp_dir, "y"), os.path.join(temp_dir, "z")]
+
+
+def test_iter_media_files_filters_by_extension():
+    """Test that the existing-files walk honours recursion and extension filtering."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "season1").mkdir()
+        for name in ("movie.MP4", "notes.txt", ".mp4", "season1/episode.mkv", "season1/cover.jpg"):
+            (root / name).write_bytes(b"data")
+        extensions = frozenset({".mp4", ".mkv"})
+        
+        assert set(_iter_media_files(root, False, extensions)) == {root / "movie.MP4"}
+        assert set(_iter_media_files(root, True, extensions)) == {
+            root / "movie.MP4",
+            root / "season1" / "episode.mkv"
+        }
+        assert list(_iter_media_files(root / "missing", True, extensions)) == []
+
+
+@pytest.mark.asyncio
+async def test_existing_files_scanned_concurrently():
+    """Test that the startup scan processes existing files in parallel, up to the limit."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        monitor = _make_monitor(watch_path)
+        await monitor.start()
+        
+        running = 0
+        peak = 0
+        seen = []
+        
+        async def mock_process_file(file_path, closed=False):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            seen.append(file_path)
+        
+        monitor.handlers[0]._process_new_file = mock_process_file
+        
+        try:
+            # Only the scan should see these files
+            asyncio.get_running_loop().remove_reader(monitor._inotify.fd)
+            for i in range(SCAN_CONCURRENCY * 2):
+                (watch_path / f"movie_{i}.mp4").write_bytes(b"fake video content")
+            
+            await monitor._scan_existing_files()
+            
+            assert len(seen) == SCAN_CONCURRENCY * 2
+            assert peak == SCAN_CONCURRENCY
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_transcoding_decision_cached_per_file_version():
+    """Test that a file is probed once until its size or mtime changes."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        
+        input_file = watch_path / "movie.mp4"
+        input_file.write_bytes(b"fake video content")
+        
+        with patch("recodex.monitoring.MediaInfo.needs_transcoding", new=AsyncMock(return_value=False)) as probe:
+            assert not await handler._needs_transcoding(MediaInfo(input_file), profiles["test_profile"])
+            assert not await handler._needs_transcoding(MediaInfo(input_file), profiles["test_profile"])
+            assert probe.await_count == 1
+            
+            os.utime(input_file, ns=(0, 0))
+            await handler._needs_transcoding(MediaInfo(input_file), profiles["test_profile"])
+            assert probe.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_watchdog_events_filtered_before_scheduling():
+    """Test that watchdog events for non-media files are dropped without scheduling work."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile", extensions=[".mp4"])
+        event_loop = Mock()
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, event_loop)
+        
+        handler.on_created(FileCreatedEvent(os.path.join(temp_dir, "notes.txt")))
+        handler.on_created(FileCreatedEvent(os.path.join(temp_dir, ".mp4")))
+        event_loop.call_soon_threadsafe.assert_not_called()
+        
+        handler.on_created(FileCreatedEvent(os.path.join(temp_dir, "movie.MP4")))
+        event_loop.call_soon_threadsafe.assert_called_once_with(handler._schedule, watch_path / "movie.MP4")
+
+
+@pytest.mark.asyncio
+async def test_watchdog_event_processed_on_loop():
+    """Test that a watchdog event from another thread is processed on the event loop."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile", extensions=[".mp4"])
+        loop = asyncio.get_running_loop()
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, loop)
+        
+        seen = asyncio.Queue()
+        
+        async def mock_process_file(file_path, closed=False):
+            await seen.put((file_path, asyncio.get_running_loop()))
+        
+        handler._process_new_file = mock_process_file
+        
+        event = FileCreatedEvent(os.path.join(temp_dir, "movie.mp4"))
+        await loop.run_in_executor(None, handler.on_created, event)
+        
+        file_path, processed_on = await asyncio.wait_for(seen.get(), timeout=2.0)
+        assert file_path == watch_path / "movie.mp4"
+        assert processed_on is loop
+
+
+@pytest.mark.asyncio
+async def test_processed_files_bounded():
+    """Test that the processed-files record evicts its oldest entries past the limit."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        
+        with patch("recodex.monitoring.PROCESSED_FILES_LIMIT", 2):
+            for name in ("a.mp4", "b.mp4", "a.mp4", "c.mp4"):
+                handler.mark_processed(watch_path / name)
+        
+        # a.mp4 was refreshed, so b.mp4 is the oldest and gets evicted
+        assert list(handler.processed_files) == [str(watch_path / "a.mp4"), str(watch_path / "c.mp4")]
+
+
+@pytest.mark.asyncio
+async def test_output_directory_created_once():
+    """Test that the output directory is created on first use and not re-created per file."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        output_dir = watch_path / "out" / "nested"
+        profile = TranscodeProfile(name="small")
+        watch_folder = WatchFolder(path=watch_path, profile="small", output_path=output_dir)
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), {"small": profile}, asyncio.get_running_loop())
+        
+        with patch.object(Path, "mkdir", autospec=True, side_effect=Path.mkdir) as mkdir:
+            assert handler._get_output_path(watch_path / "a.mp4", profile) == output_dir / "a_small.mp4"
+            assert output_dir.is_dir()
+            first_calls = mkdir.call_count
+            
+            assert handler._get_output_path(watch_path / "b.mp4", profile) == output_dir / "b_small.mp4"
+            assert mkdir.call_count == first_calls
+
+
+@pytest.mark.asyncio
+async def test_duplicate_events_during_readiness_wait_dropped():
+    """Test that a second event for a file still settling does not start another wait."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile")
+        handler = MediaFileHandler(watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop())
+        
+        input_file = watch_path / "movie.mp4"
+        input_file.write_bytes(b"fake video content")
+        
+        async def slow_wait(file_path):
+            await asyncio.sleep(0.05)
+            return None
+        
+        handler._wait_for_file_ready = AsyncMock(side_effect=slow_wait)
+        handler._is_already_processed = AsyncMock(return_value=True)
+        
+        await asyncio.gather(
+            handler._process_new_file(input_file),
+            handler._process_new_file(input_file)
+        )
+        
+        assert handler._wait_for_file_ready.await_count == 1
+        assert str(input_file) in handler.processed_files
+        assert str(input_file) not in handler.processing_files
+
+
+@pytest.mark.asyncio
+async def test_network_folder_polled_for_new_files_only():
+    """Test that folders on network mounts are polled and only new files are reported."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        (watch_path / "existing.mp4").write_bytes(b"old")
+        monitor = _make_monitor(watch_path)
+        
+        with patch("recodex.monitoring._mount_type", return_value="nfs"), \
+             patch.object(MediaFileHandler, "_process_new_file", new=AsyncMock()):
+            await monitor.start()
+            try:
+                assert monitor._watches == {}
+                assert len(monitor.pollers) == 1
+                poller = monitor.pollers[0]
+                
+                (watch_path / "new.mkv").write_bytes(b"new")
+                (watch_path / "notes.txt").write_bytes(b"skip")
+                assert await poller.poll() == [watch_path / "new.mkv"]
+                assert await poller.poll() == []
+            finally:
+                await monitor.stop()
+        
+        assert monitor.pollers == []
+
+
+def test_mount_type_finds_longest_mount_point():
+    """Test that a path resolves to the filesystem of its closest mount."""
+    mounts = "rootfs / ext4 rw 0 0\nserver:/media /mnt/media nfs4 rw 0 0\n"
+    with patch("builtins.open", return_value=io.StringIO(mounts)):
+        assert _mount_type(Path("/mnt/media/movies")) == "nfs4"
+    with patch("builtins.open", return_value=io.StringIO(mounts)):
+        assert _mount_type(Path("/mnt/mediaX")) == "ext4"
+
+
+@pytest.mark.asyncio
+async def test_decisions_persist_across_handlers():
+    """Test that a restarted handler reuses stored decisions and processing history."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile")
+        input_file = watch_path / "movie.mp4"
+        input_file.write_bytes(b"fake video content")
+        
+        store = DecisionStore(watch_path / "state.db")
+        try:
+            with patch("recodex.monitoring.MediaInfo.needs_transcoding", new=AsyncMock(return_value=True)) as probe:
+                for _ in range(2):
+                    handler = MediaFileHandler(
+                        watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop(), decisions=store
+                    )
+                    assert await handler._needs_transcoding(MediaInfo(input_file), profiles["test_profile"])
+                assert probe.await_count == 1
+            
+            assert not await handler._is_already_processed(input_file)
+            await handler.mark_processed(input_file)
+            handler = MediaFileHandler(
+                watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop(), decisions=store
+            )
+            assert await handler._is_already_processed(input_file)
+        finally:
+            store.close()
+
+
+@pytest.mark.asyncio
+async def test_decisions_follow_profile_edits_and_run_off_loop():
+    """Test that decisions made under an edited profile are not reused and the store is used off the loop."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_path = Path(temp_dir)
+        profile = TranscodeProfile(name="Test Profile")
+        profiles = {"test_profile": profile}
+        watch_folder = WatchFolder(path=watch_path, profile="test_profile")
+        input_file = watch_path / "movie.mp4"
+        input_file.write_bytes(b"fake video content")
+        
+        store = DecisionStore(watch_path / "state.db")
+        threads = []
+        original_get = store.get
+        
+        def get(*args):
+            threads.append(threading.current_thread())
+            return original_get(*args)
+        
+        store.get = get
+        try:
+            handler = MediaFileHandler(
+                watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop(), decisions=store
+            )
+            with patch("recodex.monitoring.MediaInfo.needs_transcoding", new=AsyncMock(side_effect=[False, True])) as probe:
+                assert not await handler._needs_transcoding(MediaInfo(input_file), profile)
+                # Same name, different settings
+                edited = profile.model_copy(update={"video_crf": 30})
+                assert await handler._needs_transcoding(MediaInfo(input_file), edited)
+                assert probe.await_count == 2
+                
+                # Both decisions are remembered, in memory and in the store
+                assert not await handler._needs_transcoding(MediaInfo(input_file), profile)
+                handler = MediaFileHandler(
+                    watch_folder, asyncio.Queue(), profiles, asyncio.get_running_loop(), decisions=store
+                )
+                assert await handler._needs_transcoding(MediaInfo(input_file), edited)
+                assert probe.await_count == 2
+            
+            assert threads and threading.main_thread() not in threads
+        finally:
+            store.close()
+
+
+@pytest.mark.asyncio
+async def test_get_job_waits_for_queue_or_database_change():
+    """Test that get_job sleeps until a job is queued or the database changes."""
+    db_manager = Mock()
+    db_manager.changes = ChangeNotifier()
+    db_manager.get_pending_jobs = AsyncMock(return_value=[])
+    db_manager.claim_record = AsyncMock(return_value=True)
+    profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+    monitor = FileMonitor([], profiles, db_manager)
+    
+    waiting = asyncio.ensure_future(monitor.get_job())
+    await asyncio.sleep(0.05)
+    assert not waiting.done()
+    assert db_manager.get_pending_jobs.await_count == 1
+    
+    queued_job = {"input_path": Path("/media/a.mp4")}
+    monitor.job_queue.put_nowait(queued_job)
+    assert await asyncio.wait_for(waiting, timeout=1) is queued_job
+    
+    waiting = asyncio.ensure_future(monitor.get_job())
+    await asyncio.sleep(0.05)
+    db_manager.get_pending_jobs.return_value = [SimpleNamespace(
+        id=5, input_path="/media/b.mp4", output_path="/media/b_out.mp4", profile_name="test_profile"
+    )]
+    db_manager.changes.notify()
+    job = await asyncio.wait_for(waiting, timeout=1)
+    assert job["db_record_id"] == 5
+    assert monitor.job_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_pending_job_claimed_by_one_worker(db_path):
+    """Test that workers woken together never take the same pending database job."""
+    db_manager = DatabaseManager(f"sqlite:///{db_path}")
+    await db_manager.initialize()
+    try:
+        await db_manager.add_records([
+            TranscodeRecord(
+                input_path=f"/media/{name}.mp4",
+                output_path=f"/media/{name}_out.mp4",
+                profile_name="test_profile",
+                status="pending"
+            )
+            for name in ("a", "b")
+        ])
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        monitor = FileMonitor([], profiles, db_manager)
+        
+        jobs = await asyncio.gather(*(monitor._get_pending_job_from_db() for _ in range(3)))
+        
+        claimed = sorted(job["db_record_id"] for job in jobs if job)
+        assert len(claimed) == 2 and len(set(claimed)) == 2
+        assert jobs.count(None) == 1
+        assert await db_manager.get_pending_jobs() == []
+        # A record that is already running can't be claimed again
+        assert not await db_manager.claim_record(claimed[0])
+    finally:
+        await db_manager.close()
+
+
+@pytest.mark.asyncio
+async def test_pending_job_with_missing_profile_fails_once(db_path, caplog):
+    """Test that a pending job whose profile is gone is failed once instead of blocking the jobs behind it."""
+    db_manager = DatabaseManager(f"sqlite:///{db_path}")
+    await db_manager.initialize()
+    try:
+        await db_manager.add_records([
+            TranscodeRecord(
+                input_path=f"/media/{name}.mp4",
+                output_path=f"/media/{name}_out.mp4",
+                profile_name=profile_name,
+                status="pending"
+            )
+            for name, profile_name in (("a", "deleted_profile"), ("b", "test_profile"))
+        ])
+        profiles = {"test_profile": TranscodeProfile(name="Test Profile")}
+        monitor = FileMonitor([], profiles, db_manager)
+        
+        with caplog.at_level(logging.ERROR, logger="recodex.monitoring"):
+            jobs = await asyncio.gather(*(monitor._get_pending_job_from_db() for _ in range(3)))
+        
+        assert [job["input_path"] for job in jobs if job] == [Path("/media/b.mp4")]
+        errors = [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+        assert len(errors) == 1 and "deleted_profile" in errors[0]
+        failed = await db_manager.get_failed_jobs()
+        assert [job.input_path for job in failed] == ["/media/a.mp4"]
+        assert failed[0].error_message == "Profile 'deleted_profile' not found"
+    finally:
+        await db_manager.close()
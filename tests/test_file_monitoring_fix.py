@@ -4,88 +4,89 @@ import asyncio
 import tempfile
 import pytest
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, patch
+
+from watchdog.events import FileSystemEvent
 
 from recodex.config import WatchFolder, TranscodeProfile
 from recodex.monitoring import MediaFileHandler
 
 
-@pytest.mark.asyncio
-async def test_file_handler_async_task_creation():
-    """Test that MediaFileHandler can handle file events without crashing."""
-    # Create temporary directory
+@pytest.fixture
+def handler_env():
+    """Watch folder on a temporary directory plus the profiles it refers to."""
     with tempfile.TemporaryDirectory() as temp_dir:
-        watch_path = Path(temp_dir)
-        
-        # Create watch folder configuration
         watch_folder = WatchFolder(
-            path=watch_path,
+            path=Path(temp_dir),
             profile="test_profile",
             extensions=[".mp4", ".mkv"],
             recursive=False
         )
-        
-        # Create test profile
         profile = TranscodeProfile(
             name="Test Profile",
             video_codec="h264",
             audio_codec="aac",
             container="mp4"
         )
-        profiles = {"test_profile": profile}
-        
-        # Create job queue and event loop
-        job_queue = asyncio.Queue()
-        event_loop = asyncio.get_running_loop()
-        
-        # Create handler
-        handler = MediaFileHandler(watch_folder, job_queue, profiles, event_loop)
-        
-        # Mock the _process_new_file method to avoid file processing logic
-        async def mock_process_file(file_path):
-            """Mock coroutine for _process_new_file."""
-            pass
-        
-        handler._process_new_file = mock_process_file
-        
-        # Create a mock event
-        mock_event = Mock()
-        mock_event.is_directory = False
-        mock_event.src_path = str(watch_path / "test.mp4")
-        
-        # Test that on_created doesn't raise an exception
-        # This would previously fail with "RuntimeWarning: coroutine was never awaited"
-        try:
-            handler.on_created(mock_event)
-            # Give time for the coroutine to be scheduled
-            await asyncio.sleep(0.1)
-            assert True, "on_created should not raise an exception"
-        except Exception as e:
-            pytest.fail(f"on_created raised an exception: {e}")
-        
-        # Test on_moved as well
-        mock_event.dest_path = mock_event.src_path
-        try:
-            handler.on_moved(mock_event)
-            await asyncio.sleep(0.1)
-            assert True, "on_moved should not raise an exception"
-        except Exception as e:
-            pytest.fail(f"on_moved raised an exception: {e}")
+        yield watch_folder, profile, {"test_profile": profile}
+
+
+def _file_event(path: Path):
+    """Watchdog event for a regular file."""
+    return MagicMock(spec=FileSystemEvent, is_directory=False, src_path=str(path))
+
+
+@pytest.mark.asyncio
+async def test_file_handler_async_task_creation(handler_env):
+    """Test that MediaFileHandler can handle file events without crashing."""
+    watch_folder, profile, profiles = handler_env
+    watch_path = watch_folder.path
+    
+    # Create job queue and event loop
+    job_queue = asyncio.Queue()
+    event_loop = asyncio.get_running_loop()
+    
+    # Create handler
+    handler = MediaFileHandler(watch_folder, job_queue, profiles, event_loop)
+    
+    # Mock the _process_new_file method to avoid file processing logic
+    processed = asyncio.Event()
+    
+    async def mock_process_file(file_path):
+        """Mock coroutine for _process_new_file."""
+        processed.set()
+    
+    handler._process_new_file = mock_process_file
+    
+    # Create a mock event
+    mock_event = _file_event(watch_path / "test.mp4")
+    
+    # Test that on_created doesn't raise an exception
+    # This would previously fail with "RuntimeWarning: coroutine was never awaited"
+    try:
+        handler.on_created(mock_event)
+        # Wait until the scheduled coroutine has actually run
+        await asyncio.wait_for(processed.wait(), timeout=1.0)
+    except Exception as e:
+        pytest.fail(f"on_created raised an exception: {e}")
+    
+    # Test on_moved as well
+    mock_event.dest_path = mock_event.src_path
+    processed.clear()
+    try:
+        handler.on_moved(mock_event)
+        await asyncio.wait_for(processed.wait(), timeout=1.0)
+    except Exception as e:
+        pytest.fail(f"on_moved raised an exception: {e}")
 
 
 @pytest.mark.asyncio
-async def test_event_loop_reference():
+async def test_event_loop_reference(handler_env):
     """Test that the MediaFileHandler correctly stores the event loop reference."""
-    # Create minimal test setup
-    watch_folder = WatchFolder(
-        path=Path("/tmp"),
-        profile="test",
-        extensions=[".mp4"]
-    )
+    watch_folder, _, profiles = handler_env
     
     job_queue = asyncio.Queue()
     event_loop = asyncio.get_running_loop()
-    profiles = {}
     
     # Create handler
     handler = MediaFileHandler(watch_folder, job_queue, profiles, event_loop)
@@ -96,65 +97,45 @@ async def test_event_loop_reference():
 
 
 @pytest.mark.asyncio
-async def test_future_result_handling():
+async def test_future_result_handling(handler_env):
     """Test that MediaFileHandler properly handles Future results from run_coroutine_threadsafe."""
-    # Create temporary directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        watch_path = Path(temp_dir)
-        
-        # Create watch folder configuration
-        watch_folder = WatchFolder(
-            path=watch_path,
-            profile="test_profile",
-            extensions=[".mp4", ".mkv"],
-            recursive=False
-        )
-        
-        # Create test profile
-        profile = TranscodeProfile(
-            name="Test Profile",
-            video_codec="h264",
-            audio_codec="aac",
-            container="mp4"
-        )
-        profiles = {"test_profile": profile}
-        
-        # Create job queue and event loop
-        job_queue = asyncio.Queue()
-        event_loop = asyncio.get_running_loop()
-        
-        # Create handler
-        handler = MediaFileHandler(watch_folder, job_queue, profiles, event_loop)
-        
-        # Mock the _process_new_file method to simulate an exception
-        async def mock_process_file_with_error(file_path):
-            """Mock coroutine that raises an exception."""
-            raise ValueError("Test exception")
-        
-        handler._process_new_file = mock_process_file_with_error
-        
-        # Track if the future callback was called
-        callback_called = asyncio.Event()
-        original_callback = handler._handle_future_result
-        
-        def tracking_callback(future):
-            original_callback(future)
-            callback_called.set()
-        
-        handler._handle_future_result = tracking_callback
-        
-        # Create a mock event
-        mock_event = Mock()
-        mock_event.is_directory = False
-        mock_event.src_path = str(watch_path / "test.mp4")
-        
-        # Test that on_created properly handles the future even with exceptions
-        handler.on_created(mock_event)
-        
-        # Wait for the callback to be called
-        await asyncio.wait_for(callback_called.wait(), timeout=2.0)
-        
-        assert callback_called.is_set(), "Future callback should have been called"
+    watch_folder, profile, profiles = handler_env
+    watch_path = watch_folder.path
+    
+    # Create job queue and event loop
+    job_queue = asyncio.Queue()
+    event_loop = asyncio.get_running_loop()
+    
+    # Create handler
+    handler = MediaFileHandler(watch_folder, job_queue, profiles, event_loop)
+    
+    # Mock the _process_new_file method to simulate an exception
+    async def mock_process_file_with_error(file_path):
+        """Mock coroutine that raises an exception."""
+        raise ValueError("Test exception")
+    
+    handler._process_new_file = mock_process_file_with_error
+    
+    # Track if the future callback was called
+    callback_called = asyncio.Event()
+    original_callback = handler._handle_future_result
+    
+    def tracking_callback(future):
+        original_callback(future)
+        callback_called.set()
+    
+    handler._handle_future_result = tracking_callback
+    
+    # Create a mock event
+    mock_event = _file_event(watch_path / "test.mp4")
+    
+    # Test that on_created properly handles the future even with exceptions
+    handler.on_created(mock_event)
+    
+    # Wait for the callback to be called
+    await asyncio.wait_for(callback_called.wait(), timeout=2.0)
+    
+    assert callback_called.is_set(), "Future callback should have been called"
 
 
 def test_handler_initialization():
@@ -1,143 +1,586 @@
 """Test for job management and reprocessing functionality."""
 
 import asyncio
-import tempfile
+import sqlite3
 import pytest
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
 
-from recodex.database import DatabaseManager, TranscodeRecord
+from recodex.config import RecodeXConfig, TranscodeProfile
+from recodex.database import DatabaseManager, Statistics, TranscodeRecord, current_session
+from recodex.workers import TranscodeWorker, WorkerManager
 
 
 @pytest.mark.asyncio
-async def test_job_list_methods():
+async def test_job_list_methods(db_manager):
     """Test that we can get pending, completed, and failed job lists."""
-    # Create a temporary database
-    with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
-        db_url = f"sqlite:///{temp_db.name}"
-        db_manager = DatabaseManager(db_url)
-        await db_manager.initialize()
-        
-        # Create some test records
-        test_records = [
-            TranscodeRecord(
-                input_path="/test/input1.mp4",
-                output_path="/test/output1.mp4",
-                profile_name="test_profile",
-                status="pending"
-            ),
-            TranscodeRecord(
-                input_path="/test/input2.mp4",
-                output_path="/test/output2.mp4",
-                profile_name="test_profile",
-                status="completed",
-                completed_at=datetime.utcnow(),
-                processing_time=60.0,
-                original_size=1000000,
-                final_size=500000
-            ),
-            TranscodeRecord(
-                input_path="/test/input3.mp4",
-                output_path="/test/output3.mp4",
-                profile_name="test_profile",
-                status="failed",
-                error_message="Test error"
-            )
-        ]
-        
-        # Add records to database
-        for record in test_records:
-            await db_manager.add_record(record)
-        
-        # Test getting job lists
-        pending_jobs = await db_manager.get_pending_jobs()
-        completed_jobs = await db_manager.get_completed_jobs()
-        failed_jobs = await db_manager.get_failed_jobs()
-        
-        assert len(pending_jobs) == 1
-        assert len(completed_jobs) == 1
-        assert len(failed_jobs) == 1
-        
-        assert pending_jobs[0].status == "pending"
-        assert completed_jobs[0].status == "completed"
-        assert failed_jobs[0].status == "failed"
-        
-        await db_manager.close()
-
-
-@pytest.mark.asyncio
-async def test_job_reprocessing():
-    """Test that we can reprocess completed and failed jobs."""
-    # Create a temporary database
-    with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
-        db_url = f"sqlite:///{temp_db.name}"
-        db_manager = DatabaseManager(db_url)
-        await db_manager.initialize()
-        
-        # Create a completed job
-        completed_record = TranscodeRecord(
-            input_path="/test/input.mp4",
-            output_path="/test/output.mp4",
+    # Create some test records
+    test_records = [
+        TranscodeRecord(
+            input_path="/test/input1.mp4",
+            output_path="/test/output1.mp4",
+            profile_name="test_profile",
+            status="pending"
+        ),
+        TranscodeRecord(
+            input_path="/test/input2.mp4",
+            output_path="/test/output2.mp4",
             profile_name="test_profile",
             status="completed",
-            completed_at=datetime.utcnow(),
+            completed_at=datetime.now(timezone.utc),
             processing_time=60.0,
             original_size=1000000,
             final_size=500000
+        ),
+        TranscodeRecord(
+            input_path="/test/input3.mp4",
+            output_path="/test/output3.mp4",
+            profile_name="test_profile",
+            status="failed",
+            error_message="Test error"
         )
-        
-        await db_manager.add_record(completed_record)
-        
-        # Get the record ID
-        completed_jobs = await db_manager.get_completed_jobs()
-        job_id = completed_jobs[0].id
-        
-        # Test reprocessing
-        reprocess_result = await db_manager.reprocess_job(job_id)
-        
-        assert reprocess_result["status"] == "pending"
-        assert reprocess_result["input_path"] == "/test/input.mp4"
-        assert reprocess_result["output_path"] == "/test/output.mp4"
-        assert reprocess_result["profile_name"] == "test_profile"
-        
-        # Check that a new pending job was created
-        pending_jobs = await db_manager.get_pending_jobs()
-        assert len(pending_jobs) == 1
-        assert pending_jobs[0].id == reprocess_result["id"]
-        assert pending_jobs[0].status == "pending"
-        
-        await db_manager.close()
+    ]
+    
+    # Add records to database in one transaction
+    await db_manager.add_records(test_records)
+    
+    # Test getting job lists
+    pending_jobs = await db_manager.get_pending_jobs()
+    completed_jobs = await db_manager.get_completed_jobs()
+    failed_jobs = await db_manager.get_failed_jobs()
+    
+    assert len(pending_jobs) == 1
+    assert len(completed_jobs) == 1
+    assert len(failed_jobs) == 1
+    
+    assert pending_jobs[0].status == "pending"
+    assert completed_jobs[0].status == "completed"
+    assert failed_jobs[0].status == "failed"
+    
+    # The completed list is served from the (status, completed_at) index, not a sort
+    async with db_manager.engine.connect() as conn:
+        plan = (await conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM transcode_records WHERE status = 'completed' "
+            "ORDER BY completed_at DESC LIMIT 50"
+        )).all()
+    assert any("ix_transcode_status_completed" in row[-1] for row in plan)
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
+    
+    # The single-query variant returns the same lists
+    grouped = await db_manager.get_jobs_grouped()
+    assert {status: [job.id for job in jobs] for status, jobs in grouped.items()} == {
+        "pending": [pending_jobs[0].id],
+        "completed": [completed_jobs[0].id],
+        "failed": [failed_jobs[0].id]
+    }
+
+
+@pytest.mark.asyncio
+async def test_job_reprocessing(db_manager):
+    """Test that we can reprocess completed and failed jobs."""
+    # Create a completed job
+    completed_record = TranscodeRecord(
+        input_path="/test/input.mp4",
+        output_path="/test/output.mp4",
+        profile_name="test_profile",
+        status="completed",
+        completed_at=datetime.now(timezone.utc),
+        processing_time=60.0,
+        original_size=1000000,
+        final_size=500000
+    )
+    
+    await db_manager.add_record(completed_record)
+    
+    # Get the record ID
+    completed_jobs = await db_manager.get_completed_jobs()
+    job_id = completed_jobs[0].id
+    
+    # Test reprocessing
+    reprocess_result = await db_manager.reprocess_job(job_id)
+    
+    assert reprocess_result["status"] == "pending"
+    assert reprocess_result["input_path"] == "/test/input.mp4"
+    assert reprocess_result["output_path"] == "/test/output.mp4"
+    assert reprocess_result["profile_name"] == "test_profile"
+    
+    # Check that a new pending job was created
+    pending_jobs = await db_manager.get_pending_jobs()
+    assert len(pending_jobs) == 1
+    assert pending_jobs[0].id == reprocess_result["id"]
+    assert pending_jobs[0].status == "pending"
 
 
 @pytest.mark.asyncio
-async def test_reprocess_invalid_job():
+async def test_reprocess_invalid_job(db_manager):
     """Test that reprocessing fails for invalid job states."""
-    # Create a temporary database
-    with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
-        db_url = f"sqlite:///{temp_db.name}"
-        db_manager = DatabaseManager(db_url)
+    # Create a pending job (should not be reprocessable)
+    pending_record = TranscodeRecord(
+        input_path="/test/input.mp4",
+        output_path="/test/output.mp4",
+        profile_name="test_profile",
+        status="pending"
+    )
+    
+    await db_manager.add_record(pending_record)
+    
+    # Get the record ID
+    pending_jobs = await db_manager.get_pending_jobs()
+    job_id = pending_jobs[0].id
+    
+    # Test reprocessing should fail
+    with pytest.raises(ValueError, match="cannot be reprocessed"):
+        await db_manager.reprocess_job(job_id)
+    
+    # Test reprocessing non-existent job
+    with pytest.raises(ValueError, match="not found"):
+        await db_manager.reprocess_job(99999)
+
+
+@pytest.mark.asyncio
+async def test_add_records_batch(db_manager):
+    """Test that several records can be inserted in one transaction."""
+    records = [
+        TranscodeRecord(
+            input_path=f"/test/input{i}.mp4",
+            output_path=f"/test/output{i}.mp4",
+            profile_name="test_profile",
+            status="pending"
+        )
+        for i in range(5)
+    ]
+    
+    await db_manager.add_records(records)
+    
+    # Primary keys are populated on the passed instances
+    assert all(record.id is not None for record in records)
+    
+    pending_jobs = await db_manager.get_pending_jobs()
+    assert len(pending_jobs) == 5
+    
+    # Empty batches are a no-op
+    await db_manager.add_records([])
+
+
+@pytest.mark.asyncio
+async def test_get_jobs_grouped(db_manager):
+    """Test that job lists for several statuses come back from one call, ordered like the per-status lists."""
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    
+    def record(i, status, created, completed=None):
+        return TranscodeRecord(
+            input_path=f"/test/input{i}.mp4",
+            output_path=f"/test/output{i}.mp4",
+            profile_name="test_profile",
+            status=status,
+            created_at=base + timedelta(minutes=created),
+            completed_at=None if completed is None else base + timedelta(minutes=completed)
+        )
+    
+    # Insertion order differs from every list's sort order
+    await db_manager.add_records([
+        record(0, "pending", 5),
+        record(1, "completed", 0, completed=30),
+        record(2, "pending", 1),
+        record(3, "failed", 2),
+        record(4, "pending", 3),
+        record(5, "running", 4),
+        record(6, "completed", 1, completed=10),
+        record(7, "failed", 9),
+        record(8, "completed", 2, completed=20)
+    ])
+    
+    grouped = await db_manager.get_jobs_grouped()
+    assert set(grouped) == {"pending", "completed", "failed"}
+    ids = {status: [job.input_path[-5] for job in jobs] for status, jobs in grouped.items()}
+    # Pending in run order, completed by completion time, failed newest first
+    assert ids == {"pending": ["2", "4", "0"], "completed": ["1", "8", "6"], "failed": ["7", "3"]}
+    assert [job.id for job in grouped["pending"]] == [job.id for job in await db_manager.get_pending_jobs()]
+    assert [job.id for job in grouped["completed"]] == [job.id for job in await db_manager.get_completed_jobs()]
+    assert [job.id for job in grouped["failed"]] == [job.id for job in await db_manager.get_failed_jobs()]
+    
+    # Each status is limited independently
+    limited = await db_manager.get_jobs_grouped(limit_each=1)
+    assert [job.input_path for job in limited["pending"]] == ["/test/input2.mp4"]
+    assert [job.input_path for job in limited["completed"]] == ["/test/input1.mp4"]
+    
+    # Statuses without jobs still get an empty list
+    empty = await db_manager.get_jobs_grouped(statuses=("cancelled",))
+    assert empty == {"cancelled": []}
+    
+    # Capped at the per-status lists' default of 50
+    await db_manager.add_records([record(100 + i, "failed", 10 + i) for i in range(55)])
+    assert len((await db_manager.get_jobs_grouped(("failed",)))["failed"]) == 50
+
+
+@pytest.mark.asyncio
+async def test_worker_signals_job_done(db_manager):
+    """Test that the worker sets the job's done event once it finishes."""
+    worker = TranscodeWorker(0, db_manager, RecodeXConfig())
+    worker.transcode_engine.transcode = AsyncMock(return_value=False)
+    
+    job = {
+        "input_path": Path("/test/input.mp4"),
+        "output_path": Path("/test/output.mp4"),
+        "profile": TranscodeProfile(name="test_profile"),
+        "watch_folder": None,
+        "done": asyncio.Event()
+    }
+    
+    with patch.object(db_manager, "update_record", wraps=db_manager.update_record) as update_record:
+        await worker._process_job(job, Mock())
+    
+    assert job["done"].is_set()
+    failed_jobs = await db_manager.get_failed_jobs()
+    assert len(failed_jobs) == 1
+    # Inserted as running, then one terminal update
+    assert failed_jobs[0].started_at is not None
+    assert update_record.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_signals_done_when_record_insert_fails(db_manager):
+    """Test that a job whose record cannot be created still releases its waiter."""
+    worker = TranscodeWorker(0, db_manager, RecodeXConfig())
+    worker.transcode_engine.transcode = AsyncMock(return_value=True)
+    job = {
+        "input_path": Path("/test/input.mp4"),
+        "output_path": Path("/test/output.mp4"),
+        "profile": TranscodeProfile(name="test_profile"),
+        "watch_folder": None,
+        "done": asyncio.Event()
+    }
+    
+    with patch.object(db_manager, "add_record", AsyncMock(side_effect=RuntimeError("database is locked"))):
+        with pytest.raises(RuntimeError):
+            await worker._process_job(job, Mock())
+    
+    # What the transcode command waits on
+    await asyncio.wait_for(job["done"].wait(), timeout=1)
+    worker.transcode_engine.transcode.assert_not_awaited()
+    assert worker.get_active_job() is None
+
+
+@pytest.mark.asyncio
+async def test_worker_status_reuses_snapshot(db_manager):
+    """Test that worker status dicts are built once per job and refreshed in place."""
+    worker = TranscodeWorker(0, db_manager, RecodeXConfig())
+    seen = []
+    
+    async def transcode(job):
+        active = worker.get_active_job()
+        job.progress = 50.0
+        seen.append((active, worker.get_active_job(), worker.get_status()["current_job"]["progress"]))
+        return True
+    
+    worker.transcode_engine.transcode = transcode
+    await worker._process_job({
+        "input_path": Path("/test/input.mp4"),
+        "output_path": Path("/test/output.mp4"),
+        "profile": TranscodeProfile(name="test_profile"),
+        "watch_folder": None
+    }, Mock())
+    
+    first, second, progress = seen[0]
+    assert first is second
+    assert first["input_path"] == "/test/input.mp4"
+    assert first["progress"] == progress == 50.0
+    assert worker.get_active_job() is None
+    assert worker.get_status()["current_job"]["status"] == "idle"
+
+
+@pytest.mark.asyncio
+async def test_worker_holds_no_session_while_transcoding(file_db_manager):
+    """Test that the worker doesn't keep a database session open during the transcode."""
+    worker = TranscodeWorker(0, file_db_manager, RecodeXConfig())
+    scoped = []
+    
+    async def transcode(job):
+        try:
+            scoped.append(current_session())
+        except RuntimeError:
+            scoped.append(None)
+        # Another connection can write while the job runs
+        await file_db_manager.add_records([TranscodeRecord(
+            input_path="/test/other.mp4",
+            output_path="/test/other_out.mp4",
+            profile_name="test_profile",
+            status="pending"
+        )])
+        return True
+    
+    worker.transcode_engine.transcode = transcode
+    await worker._process_job({
+        "input_path": Path("/test/input.mp4"),
+        "output_path": Path("/test/output.mp4"),
+        "profile": TranscodeProfile(name="test_profile"),
+        "watch_folder": None
+    }, Mock())
+    
+    assert scoped == [None]
+    assert len(await file_db_manager.get_completed_jobs()) == 1
+    assert len(await file_db_manager.get_pending_jobs()) == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_backs_off_and_stops_promptly():
+    """Test that worker errors back off exponentially and stop() interrupts the wait."""
+    worker = TranscodeWorker(0, Mock(), RecodeXConfig())
+    file_monitor = Mock()
+    file_monitor.get_job = AsyncMock(side_effect=RuntimeError("database unavailable"))
+    
+    with patch("recodex.workers.random.uniform", return_value=0.01):
+        task = asyncio.ensure_future(worker.start(file_monitor))
+        await asyncio.sleep(0.1)
+    assert worker._backoff > 2.0
+    
+    # The backoff has grown well past the test's patience; stop must not wait for it
+    with patch("recodex.workers.random.uniform", return_value=1.0):
+        await asyncio.sleep(0.05)
+        await worker.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_worker_manager_stop_is_bounded():
+    """Test that a worker ignoring cancellation cannot hold up WorkerManager.stop."""
+    release = asyncio.Event()
+    
+    async def stubborn_worker():
+        while not release.is_set():
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                pass
+    
+    workers = [TranscodeWorker(worker_id, Mock(), RecodeXConfig()) for worker_id in range(2)]
+    manager = WorkerManager(RecodeXConfig(), Mock())
+    for worker in workers:
+        worker.running = True
+    manager.workers = dict(enumerate(workers))
+    manager.worker_tasks = {0: asyncio.ensure_future(stubborn_worker()), 1: asyncio.ensure_future(asyncio.sleep(60))}
+    manager.running = True
+    await asyncio.sleep(0)
+    
+    with patch("recodex.workers.WORKER_STOP_TIMEOUT", 0.1):
+        await asyncio.wait_for(manager.stop(), timeout=1)
+    assert not manager.running
+    assert not any(worker.running for worker in workers)
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_status_index_added_to_existing_database(db_path):
+    """Test that initialize migrates databases created before the status indexes and space_saved."""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE transcode_records (id INTEGER PRIMARY KEY, input_path VARCHAR NOT NULL, "
+            "output_path VARCHAR NOT NULL, profile_name VARCHAR NOT NULL, created_at DATETIME, "
+            "completed_at DATETIME, status VARCHAR NOT NULL, original_size INTEGER, final_size INTEGER)"
+        )
+        conn.execute(
+            "INSERT INTO transcode_records (input_path, output_path, profile_name, status, "
+            "original_size, final_size) VALUES ('/in.mp4', '/out.mp4', 'test_profile', 'completed', 3000, 1000)"
+        )
+    
+    db_manager = DatabaseManager(f"sqlite:///{db_path}")
+    try:
         await db_manager.initialize()
-        
-        # Create a pending job (should not be reprocessable)
-        pending_record = TranscodeRecord(
+    finally:
+        await db_manager.close()
+    
+    with sqlite3.connect(db_path) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        "ix_transcode_status_id",
+        "ix_transcode_status_completed",
+        "ix_transcode_status_created",
+        "ix_transcode_status_sizes",
+        "ix_transcode_status_space_saved"
+    } <= indexes
+    
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT space_saved FROM transcode_records").fetchone() == (2000,)
+
+
+@pytest.mark.asyncio
+async def test_average_compression_ratio(db_manager):
+    """Test that the average compression ratio is computed across completed jobs."""
+    def record(status, original_size, final_size):
+        return TranscodeRecord(
             input_path="/test/input.mp4",
             output_path="/test/output.mp4",
             profile_name="test_profile",
+            status=status,
+            original_size=original_size,
+            final_size=final_size
+        )
+    
+    await db_manager.add_records([
+        record("completed", 1000, 500),   # 2.0x
+        record("completed", 3000, 1000),  # 3.0x
+        record("completed", 1000, 0),     # Ignored: no output size
+        record("failed", 1000, 100)       # Ignored: not completed
+    ])
+    
+    async with await db_manager.get_session() as session:
+        ratio = await Statistics(session).get_average_compression_ratio()
+    assert ratio == pytest.approx(2.5)
+
+
+@pytest.mark.asyncio
+async def test_queue_status_counts(db_manager):
+    """Test that queue status counts every tracked status, defaulting to zero."""
+    await db_manager.add_records([
+        TranscodeRecord(
+            input_path=f"/test/input_{i}.mp4",
+            output_path=f"/test/output_{i}.mp4",
+            profile_name="test_profile",
+            status=status
+        )
+        for i, status in enumerate(["pending", "pending", "failed", "completed"])
+    ])
+    
+    async with await db_manager.get_session() as session:
+        queue_status = await Statistics(session).get_queue_status()
+    assert queue_status == {"pending": 2, "running": 0, "failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_applied(file_db_manager):
+    """Test that SQLite connections are opened with WAL and the tuned pragmas."""
+    async with file_db_manager.engine.connect() as conn:
+        pragmas = {
+            name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "temp_store", "cache_size", "busy_timeout")
+        }
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "temp_store": 2,  # MEMORY
+        "cache_size": -65536,
+        "busy_timeout": 5000
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_add_record_batched(db_manager):
+    """Test that concurrent add_record calls share a transaction and a bad record fails alone."""
+    add_records = AsyncMock(wraps=db_manager.add_records)
+    db_manager.add_records = add_records
+    
+    records = [
+        TranscodeRecord(
+            input_path=f"/test/input_{i}.mp4",
+            output_path=f"/test/output_{i}.mp4",
+            profile_name="test_profile",
             status="pending"
         )
+        for i in range(5)
+    ]
+    await asyncio.gather(*(db_manager.add_record(record) for record in records))
+    
+    assert add_records.await_count == 1
+    assert all(record.id is not None for record in records)
+    
+    bad_record = TranscodeRecord(
+        input_path="/test/bad.mp4",
+        output_path="/test/bad_out.mp4",
+        profile_name="test_profile",
+        status=None
+    )
+    good_record = TranscodeRecord(
+        input_path="/test/good.mp4",
+        output_path="/test/good_out.mp4",
+        profile_name="test_profile",
+        status="pending"
+    )
+    results = await asyncio.gather(
+        db_manager.add_record(bad_record),
+        db_manager.add_record(good_record),
+        return_exceptions=True
+    )
+    
+    assert isinstance(results[0], Exception)
+    assert results[1] is None
+    assert good_record.id is not None
+
+
+@pytest.mark.asyncio
+async def test_update_record(db_manager):
+    """Test that update_record changes only the given columns (plus space_saved) and ignores unknown ids."""
+    record = TranscodeRecord(
+        input_path="/test/input.mp4",
+        output_path="/test/output.mp4",
+        profile_name="test_profile",
+        status="pending"
+    )
+    await db_manager.add_record(record)
+    
+    await db_manager.update_record(record.id, status="failed", error_message="boom")
+    await db_manager.update_record(record.id + 1, status="completed")
+    
+    jobs = await db_manager.get_jobs_grouped(("failed",))
+    assert [job.id for job in jobs["failed"]] == [record.id]
+    assert jobs["failed"][0].error_message == "boom"
+    assert jobs["failed"][0].input_path == "/test/input.mp4"
+    assert jobs["failed"][0].space_saved is None
+    
+    # space_saved follows the sizes, including ones already on the row
+    await db_manager.update_record(record.id, original_size=3000, final_size=1000)
+    jobs = await db_manager.get_jobs_grouped(("failed",))
+    assert jobs["failed"][0].space_saved == 2000
+    
+    await db_manager.update_record(record.id, final_size=4000)
+    jobs = await db_manager.get_jobs_grouped(("failed",))
+    assert jobs["failed"][0].space_saved == 0
+
+
+@pytest.mark.asyncio
+async def test_iter_statistics_records(db_manager):
+    """Test that the streaming statistics helpers match the list versions."""
+    await db_manager.add_records([
+        TranscodeRecord(
+            input_path=f"/test/input_{i}.mp4",
+            output_path=f"/test/output_{i}.mp4",
+            profile_name="test_profile",
+            status="completed",
+            original_size=1000 * (i + 1),
+            final_size=500
+        )
+        for i in range(5)
+    ])
+    
+    async with await db_manager.get_session() as session:
+        stats = Statistics(session)
+        top = [record.id async for record in stats.iter_top_space_savers(limit=3)]
+        recent = [record.id async for record in stats.iter_recent_records(limit=3)]
         
-        await db_manager.add_record(pending_record)
-        
-        # Get the record ID
-        pending_jobs = await db_manager.get_pending_jobs()
-        job_id = pending_jobs[0].id
-        
-        # Test reprocessing should fail
-        with pytest.raises(ValueError, match="cannot be reprocessed"):
-            await db_manager.reprocess_job(job_id)
+        assert top == [record.id for record in await stats.get_top_space_savers(limit=3)]
+        assert recent == [record.id for record in await stats.get_recent_records(limit=3)]
+    assert len(top) == 3
+    assert len(recent) == 3
+
+
+@pytest.mark.asyncio
+async def test_session_scope_shares_session_per_task(db_manager):
+    """Test that session_scope reuses one session within a task but not across tasks."""
+    with pytest.raises(RuntimeError):
+        current_session()
+    
+    async with db_manager.session_scope() as session:
+        async with db_manager.session_scope() as nested:
+            assert nested is session
+        assert current_session() is session
+        assert Statistics().session is session
         
-        # Test reprocessing non-existent job
-        with pytest.raises(ValueError, match="not found"):
-            await db_manager.reprocess_job(99999)
+        async def other_task_session():
+            async with db_manager.session_scope() as other:
+                return other
         
-        await db_manager.close()
\ No newline at end of file
+        assert await asyncio.create_task(other_task_session()) is not session
+        assert await Statistics().get_total_processed() == 0
+    
+    with pytest.raises(RuntimeError):
+        current_session()
@@ -1,114 +1,102 @@
 """Test for profile lookup fix."""
 
 import asyncio
+import logging
 from pathlib import Path
+from unittest.mock import Mock, patch
+from types import MappingProxyType
 import pytest
 
 from recodex.config import RecodeXConfig, WatchFolder, TranscodeProfile
 from recodex.monitoring import MediaFileHandler
 
 
-def test_profile_lookup_by_name():
-    """Test that profile lookup works with profile names."""
-    # Create a config with default profiles
-    config = RecodeXConfig().get_default_config()
-    
-    # Create a watch folder with profile name (legacy configuration)
-    watch_folder = WatchFolder(
-        path=Path("/test/movies"),
-        profile="Small File"  # This is the profile NAME, not the key
-    )
-    
-    # Create a mock job queue and event loop
-    job_queue = asyncio.Queue()
-    event_loop = asyncio.new_event_loop()
-    
-    # Create MediaFileHandler instance
-    handler = MediaFileHandler(watch_folder, job_queue, config.profiles, event_loop)
-    
-    # Test profile lookup by name
-    profile = handler._find_profile("Small File")
-    assert profile is not None
-    assert profile.name == "Small File"
-    assert profile.video_codec == "h265"
-    assert profile.video_crf == 28
+@pytest.fixture(scope="session")
+def default_profiles():
+    """The default profiles, built once and read-only so no test can change them for the others."""
+    return MappingProxyType(RecodeXConfig.get_default_config().profiles)
 
 
-def test_profile_lookup_by_key():
-    """Test that profile lookup works with profile keys."""
-    # Create a config with default profiles
-    config = RecodeXConfig().get_default_config()
-    
-    # Create a watch folder with profile key (new configuration)
-    watch_folder = WatchFolder(
-        path=Path("/test/tv"),
-        profile="balanced"  # This is the profile KEY
+@pytest.mark.parametrize("lookup,expected_name,expected_codec,expected_crf", [
+    ("Small File", "Small File", "h265", 28),  # profile NAME (legacy configuration)
+    ("balanced", "Balanced", "h264", 23),  # profile KEY
+    ("Balanced", "Balanced", "h264", 23),  # matches profile.name exactly
+    ("BALANCED", None, None, None),  # lookups are case sensitive
+    ("Non Existent Profile", None, None, None),
+])
+def test_profile_lookup(default_profiles, lookup, expected_name, expected_codec, expected_crf):
+    """Test that profiles are found by key or exact name, and nothing else."""
+    watch_folder = WatchFolder(path=Path("/test/lookup"), profile=lookup)
+    
+    # Lookups never touch the queue or the loop
+    handler = MediaFileHandler(
+        watch_folder, Mock(spec=asyncio.Queue), default_profiles, Mock(spec=asyncio.AbstractEventLoop)
     )
     
-    # Create a mock job queue and event loop
-    job_queue = asyncio.Queue()
-    event_loop = asyncio.new_event_loop()
-    
-    # Create MediaFileHandler instance
-    handler = MediaFileHandler(watch_folder, job_queue, config.profiles, event_loop)
-    
-    # Test profile lookup by key
-    profile = handler._find_profile("balanced")
-    assert profile is not None
-    assert profile.name == "Balanced"
-    assert profile.video_codec == "h264"
-    assert profile.video_crf == 23
+    profile = handler._find_profile(lookup)
+    if expected_name is None:
+        assert profile is None
+    else:
+        assert profile is not None
+        assert (profile.name, profile.video_codec, profile.video_crf) == (expected_name, expected_codec, expected_crf)
 
 
-def test_profile_lookup_nonexistent():
-    """Test that profile lookup returns None for non-existent profiles."""
-    # Create a config with default profiles
+def test_profile_lookup_by_name_follows_edits():
+    """Test that name lookups see profiles replaced or removed after the handler was created."""
     config = RecodeXConfig().get_default_config()
+    watch_folder = WatchFolder(path=Path("/test/edits"), profile="Small File")
+    handler = MediaFileHandler(watch_folder, Mock(spec=asyncio.Queue), config.profiles, Mock(spec=asyncio.AbstractEventLoop))
     
-    # Create a watch folder with non-existent profile
-    watch_folder = WatchFolder(
-        path=Path("/test/nothing"),
-        profile="Non Existent Profile"
-    )
+    assert handler._find_profile("Small File") is config.profiles["small_file"]
     
-    # Create a mock job queue and event loop
-    job_queue = asyncio.Queue()
-    event_loop = asyncio.new_event_loop()
+    # Replaced in place, as the dashboard does when a profile is saved
+    config.profiles["small_file"] = TranscodeProfile(name="Small File", video_codec="av1")
+    assert handler._find_profile("Small File").video_codec == "av1"
     
-    # Create MediaFileHandler instance
-    handler = MediaFileHandler(watch_folder, job_queue, config.profiles, event_loop)
-    
-    # Test profile lookup for non-existent profile
-    profile = handler._find_profile("Non Existent Profile")
-    assert profile is None
+    # Renamed, then removed
+    config.profiles["small_file"] = TranscodeProfile(name="Tiny File")
+    assert handler._find_profile("Small File") is None
+    assert handler._find_profile("Tiny File") is config.profiles["small_file"]
+    del config.profiles["small_file"]
+    assert handler._find_profile("Tiny File") is None
 
 
-def test_profile_lookup_case_sensitivity():
-    """Test that profile lookup is case sensitive."""
-    # Create a config with default profiles
+def test_watch_profile_resolved_once():
+    """Test that the watch folder's profile is resolved up front and again only after an edit."""
     config = RecodeXConfig().get_default_config()
-    
-    # Create a watch folder
-    watch_folder = WatchFolder(
-        path=Path("/test/case"),
-        profile="balanced"
-    )
-    
-    # Create a mock job queue and event loop
-    job_queue = asyncio.Queue()
-    event_loop = asyncio.new_event_loop()
-    
-    # Create MediaFileHandler instance
-    handler = MediaFileHandler(watch_folder, job_queue, config.profiles, event_loop)
-    
-    # Test exact match
-    profile = handler._find_profile("balanced")
-    assert profile is not None
-    
-    # Test case mismatch
-    profile = handler._find_profile("Balanced")
-    assert profile is not None  # Should work because it matches profile.name
-    
-    # Test complete mismatch
-    profile = handler._find_profile("BALANCED")
-    assert profile is None
\ No newline at end of file
+    watch_folder = WatchFolder(path=Path("/test/resolved"), profile="Small File")
+    handler = MediaFileHandler(watch_folder, Mock(spec=asyncio.Queue), config.profiles, Mock(spec=asyncio.AbstractEventLoop))
+    
+    with patch.object(handler, "_lookup_profile", wraps=handler._lookup_profile) as lookup:
+        assert handler._watch_profile() is config.profiles["small_file"]
+        assert handler._watch_profile() is config.profiles["small_file"]
+        assert lookup.call_count == 0
+        
+        config.profiles["small_file"] = TranscodeProfile(name="Small File", video_codec="av1")
+        assert handler._watch_profile().video_codec == "av1"
+        assert lookup.call_count == 1
+
+
+def test_missing_watch_profile_reported_at_construction(default_profiles, caplog):
+    """Test that a watch folder naming an unknown profile is reported when its handler is created."""
+    watch_folder = WatchFolder(path=Path("/test/missing"), profile="Archive")
+    
+    with caplog.at_level(logging.ERROR, logger="recodex.monitoring"):
+        handler = MediaFileHandler(
+            watch_folder, Mock(spec=asyncio.Queue), default_profiles, Mock(spec=asyncio.AbstractEventLoop)
+        )
+    
+    assert handler._watch_profile() is None
+    errors = [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert "'Archive'" in errors[0] and "/test/missing" in errors[0]
+    assert "balanced" in errors[0]
+    
+    # Known profiles are not reported
+    caplog.clear()
+    with caplog.at_level(logging.ERROR, logger="recodex.monitoring"):
+        MediaFileHandler(
+            WatchFolder(path=Path("/test/known"), profile="balanced"),
+            Mock(spec=asyncio.Queue), default_profiles, Mock(spec=asyncio.AbstractEventLoop)
+        )
+    assert not caplog.records
@@ -0,0 +1,20 @@
+"""Tests for RecodeX helper functions."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from recodex.utils import basename
+
+
+@pytest.mark.parametrize("path", [
+    "/media/movies/film.mkv",
+    "film.mkv",
+    "/media/with space/épisode 01.mp4",
+    "relative/dir/clip.webm",
+])
+def test_basename_matches_path_name(path):
+    """Test that basename agrees with Path.name for stored paths."""
+    path = path.replace("/", os.sep)
+    assert basename(path) == Path(path).name
@@ -1,115 +1,133 @@
 """Integration test for the web API endpoints."""
 
 import asyncio
+import json
 import tempfile
+import time
 import pytest
 from pathlib import Path
-from datetime import datetime
-from unittest.mock import Mock
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 
 from fastapi.testclient import TestClient
-from recodex.web import WebDashboard
+from sqlalchemy import delete
+from recodex.web import STATUS_CACHE_TTL, OrjsonResponse, WebDashboard
 from recodex.config import RecodeXConfig
-from recodex.database import DatabaseManager, TranscodeRecord
+from recodex.database import ChangeNotifier, DatabaseManager, TranscodeRecord
 
 
-@pytest.mark.asyncio
-async def test_web_api_endpoints():
-    """Test that the new web API endpoints work correctly."""
-    # Create a temporary database
-    with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
-        db_url = f"sqlite:///{temp_db.name}"
-        db_manager = DatabaseManager(db_url)
-        await db_manager.initialize()
-        
-        # Create test records
-        test_records = [
-            TranscodeRecord(
-                input_path="/test/pending.mp4",
-                output_path="/test/pending_out.mp4",
-                profile_name="test_profile",
-                status="pending"
-            ),
-            TranscodeRecord(
-                input_path="/test/completed.mp4",
-                output_path="/test/completed_out.mp4",
-                profile_name="test_profile",
-                status="completed",
-                completed_at=datetime.utcnow(),
-                processing_time=60.0,
-                original_size=1000000,
-                final_size=500000
-            ),
-            TranscodeRecord(
-                input_path="/test/failed.mp4",
-                output_path="/test/failed_out.mp4",
-                profile_name="test_profile",
-                status="failed",
-                error_message="Test error"
-            )
-        ]
-        
-        # Add records to database
-        for record in test_records:
-            await db_manager.add_record(record)
-        
-        # Create mock service with database
-        mock_service = Mock()
-        mock_service.db_manager = db_manager
-        mock_service.worker_manager = None
-        
-        # Create config and web dashboard
-        config = RecodeXConfig()
-        dashboard = WebDashboard(config, mock_service)
-        
-        # Create test client
-        client = TestClient(dashboard.app)
-        
-        # Test pending jobs endpoint
-        response = client.get("/api/jobs/pending")
-        assert response.status_code == 200
-        pending_jobs = response.json()
-        assert len(pending_jobs) == 1
-        assert pending_jobs[0]["status"] == "pending"
-        assert pending_jobs[0]["input_path"] == "/test/pending.mp4"
-        
-        # Test completed jobs endpoint
-        response = client.get("/api/jobs/completed")
-        assert response.status_code == 200
-        completed_jobs = response.json()
-        assert len(completed_jobs) == 1
-        assert completed_jobs[0]["status"] == "completed"
-        assert completed_jobs[0]["input_path"] == "/test/completed.mp4"
-        assert completed_jobs[0]["processing_time"] == 60.0
-        
-        # Test failed jobs endpoint
-        response = client.get("/api/jobs/failed")
-        assert response.status_code == 200
-        failed_jobs = response.json()
-        assert len(failed_jobs) == 1
-        assert failed_jobs[0]["status"] == "failed"
-        assert failed_jobs[0]["input_path"] == "/test/failed.mp4"
-        assert failed_jobs[0]["error_message"] == "Test error"
-        
-        # Test reprocessing completed job
-        completed_job_id = completed_jobs[0]["id"]
-        response = client.post(f"/api/jobs/{completed_job_id}/reprocess")
-        assert response.status_code == 200
-        reprocess_result = response.json()
-        assert reprocess_result["status"] == "success"
-        assert "new_job" in reprocess_result
-        
-        # Verify new pending job was created
-        response = client.get("/api/jobs/pending")
-        assert response.status_code == 200
-        pending_jobs = response.json()
-        assert len(pending_jobs) == 2  # Original pending + reprocessed
-        
-        # Test reprocessing invalid job (should fail)
-        response = client.post("/api/jobs/99999/reprocess")
-        assert response.status_code == 400
-        
-        await db_manager.close()
+def _sample_records():
+    """One pending, one completed and one failed job."""
+    return [
+        TranscodeRecord(
+            input_path="/test/pending.mp4",
+            output_path="/test/pending_out.mp4",
+            profile_name="test_profile",
+            status="pending"
+        ),
+        TranscodeRecord(
+            input_path="/test/completed.mp4",
+            output_path="/test/completed_out.mp4",
+            profile_name="test_profile",
+            status="completed",
+            completed_at=datetime.now(timezone.utc),
+            processing_time=60.0,
+            original_size=1000000,
+            final_size=500000
+        ),
+        TranscodeRecord(
+            input_path="/test/failed.mp4",
+            output_path="/test/failed_out.mp4",
+            profile_name="test_profile",
+            status="failed",
+            error_message="Test error"
+        )
+    ]
+
+
+async def _clear_records(db_manager):
+    """Delete every job record."""
+    async with db_manager.session_scope() as session:
+        await session.execute(delete(TranscodeRecord))
+        await session.commit()
+
+
+@pytest.fixture(scope="module")
+def jobs_dashboard():
+    """Dashboard and in-memory database built once for the job endpoint tests."""
+    db_manager = DatabaseManager("sqlite:///:memory:")
+    mock_service = Mock()
+    mock_service.db_manager = db_manager
+    mock_service.worker_manager = None
+    
+    # The database is used from the client's event loop, so set it up there too
+    with TestClient(WebDashboard(RecodeXConfig(), mock_service).app) as client:
+        client.portal.call(db_manager.initialize)
+        yield client, db_manager
+        client.portal.call(db_manager.close)
+
+
+@pytest.fixture
+def jobs_client(jobs_dashboard):
+    """Shared dashboard client over a job table holding just the sample records."""
+    client, db_manager = jobs_dashboard
+    client.portal.call(_clear_records, db_manager)
+    client.portal.call(db_manager.add_records, _sample_records())
+    return client
+
+
+def test_job_list_endpoints(jobs_client):
+    """Test the pending, completed and failed job endpoints."""
+    response = jobs_client.get("/api/jobs/pending")
+    assert response.status_code == 200
+    pending_jobs = response.json()
+    assert len(pending_jobs) == 1
+    assert pending_jobs[0]["status"] == "pending"
+    assert pending_jobs[0]["input_path"] == "/test/pending.mp4"
+    
+    response = jobs_client.get("/api/jobs/completed")
+    assert response.status_code == 200
+    completed_jobs = response.json()
+    assert len(completed_jobs) == 1
+    assert completed_jobs[0]["status"] == "completed"
+    assert completed_jobs[0]["input_path"] == "/test/completed.mp4"
+    assert completed_jobs[0]["processing_time"] == 60.0
+    
+    response = jobs_client.get("/api/jobs/failed")
+    assert response.status_code == 200
+    failed_jobs = response.json()
+    assert len(failed_jobs) == 1
+    assert failed_jobs[0]["status"] == "failed"
+    assert failed_jobs[0]["input_path"] == "/test/failed.mp4"
+    assert failed_jobs[0]["error_message"] == "Test error"
+
+
+def test_reprocess_endpoint(jobs_client):
+    """Test that reprocessing a completed job queues a new pending job."""
+    completed_job_id = jobs_client.get("/api/jobs/completed").json()[0]["id"]
+    response = jobs_client.post(f"/api/jobs/{completed_job_id}/reprocess")
+    assert response.status_code == 200
+    reprocess_result = response.json()
+    assert reprocess_result["status"] == "success"
+    assert "new_job" in reprocess_result
+    
+    # Original pending + reprocessed
+    assert len(jobs_client.get("/api/jobs/pending").json()) == 2
+    
+    # Unknown jobs can't be reprocessed
+    assert jobs_client.post("/api/jobs/99999/reprocess").status_code == 400
+
+
+def test_grouped_jobs_endpoint(jobs_client):
+    """Test that /api/jobs returns every list in one response."""
+    response = jobs_client.get("/api/jobs")
+    assert response.status_code == 200
+    grouped = response.json()
+    assert set(grouped) == {"pending", "completed", "failed"}
+    assert len(grouped["pending"]) == 1
+    assert grouped["completed"][0]["processing_time"] == 60.0
+    assert grouped["failed"][0]["error_message"] == "Test error"
 
 
 def test_web_dashboard_creation():
@@ -120,4 +138,217 @@ def test_web_dashboard_creation():
     dashboard = WebDashboard(config, mock_service)
     assert dashboard.app is not None
     assert dashboard.config is config
-    assert dashboard.service is mock_service
\ No newline at end of file
+    assert dashboard.service is mock_service
+
+def test_orjson_response_serializes_paths():
+    """Test that API responses encode Path values as strings."""
+    response = OrjsonResponse({"path": Path("/media/movie.mkv"), "size": 1})
+    assert json.loads(response.body) == {"path": "/media/movie.mkv", "size": 1}
+
+
+def test_config_and_status_payloads_cached():
+    """Test that /api/config is rendered once per edit and /api/status is reused briefly."""
+    mock_service = Mock()
+    mock_service.config_path = None
+    mock_service.get_status.return_value = {"service_running": True}
+    config = RecodeXConfig()
+    dashboard = WebDashboard(config, mock_service)
+    client = TestClient(dashboard.app)
+    
+    first = client.get("/api/config")
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/json"
+    assert client.get("/api/config").content == first.content
+    assert dashboard._config_json == first.content
+    
+    # Editing the config drops the cached payload
+    assert client.post("/api/config/profiles", json={"name": "Test Profile"}).status_code == 200
+    assert "test_profile" in client.get("/api/config").json()["profiles"]
+    assert client.delete("/api/config/profiles/test_profile").status_code == 200
+    assert "test_profile" not in client.get("/api/config").json()["profiles"]
+    
+    assert client.get("/api/status").json() == {"service_running": True}
+    assert client.get("/api/status").json() == {"service_running": True}
+    assert mock_service.get_status.call_count == 1
+    
+    with patch("recodex.web.time.monotonic", return_value=time.monotonic() + STATUS_CACHE_TTL + 1):
+        client.get("/api/status")
+    assert mock_service.get_status.call_count == 2
+
+
+def test_websocket_pushes_snapshot_then_changes():
+    """Test that /ws sends a full snapshot, then only the sections a write changed."""
+    db_manager = Mock()
+    db_manager.changes = ChangeNotifier()
+    db_manager.get_jobs_grouped = AsyncMock(return_value={"pending": [], "completed": [], "failed": []})
+    db_manager.reprocess_job = AsyncMock(side_effect=lambda job_id: db_manager.changes.notify() or {"id": 2})
+    mock_service = Mock()
+    mock_service.db_manager = db_manager
+    mock_service.worker_manager = None
+    mock_service.get_status.return_value = {"service_running": True}
+    client = TestClient(WebDashboard(RecodeXConfig(), mock_service).app)
+    
+    with client.websocket_connect("/ws") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot == {
+            "status": {"service_running": True},
+            "active_jobs": [],
+            "jobs": {"pending": [], "completed": [], "failed": []}
+        }
+        
+        job = SimpleNamespace(
+            id=2, input_path="/test/a.mp4", output_path="/test/a_out.mp4",
+            profile_name="test_profile", created_at=None, status="pending"
+        )
+        db_manager.get_jobs_grouped.return_value = {"pending": [job], "completed": [], "failed": []}
+        assert client.post("/api/jobs/1/reprocess").status_code == 200
+        
+        update = websocket.receive_json()
+        assert list(update) == ["jobs"]
+        assert [pending["id"] for pending in update["jobs"]["pending"]] == [2]
+
+
+def test_config_etag_revalidation():
+    """Test that /api/config answers 304 to a matching ETag until the config changes."""
+    mock_service = Mock()
+    mock_service.config_path = None
+    client = TestClient(WebDashboard(RecodeXConfig(), mock_service).app)
+    
+    first = client.get("/api/config")
+    etag = first.headers["etag"]
+    
+    unchanged = client.get("/api/config", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    
+    assert client.post("/api/config/profiles", json={"name": "Test Profile"}).status_code == 200
+    changed = client.get("/api/config", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_statistics_records_serialized():
+    """Test that /api/statistics renders record lists with every column."""
+    record = TranscodeRecord(
+        id=1, input_path="/test/a.mp4", output_path="/test/a_out.mp4", profile_name="test_profile",
+        status="completed", original_size=1000, final_size=400, space_saved=600,
+        completed_at=datetime(2024, 1, 1, tzinfo=timezone.utc)
+    )
+    mock_service = Mock()
+    mock_service.get_statistics = AsyncMock(return_value={
+        "total_processed": 1, "top_space_savers": [record], "recent_records": [record]
+    })
+    client = TestClient(WebDashboard(RecodeXConfig(), mock_service).app)
+    
+    statistics = client.get("/api/statistics").json()
+    assert statistics["total_processed"] == 1
+    saver = statistics["top_space_savers"][0]
+    assert saver["space_saved"] == 600
+    assert saver["completed_at"] == "2024-01-01T00:00:00+00:00"
+    assert statistics["recent_records"] == statistics["top_space_savers"]
+
+
+def test_config_edits_saved_once_per_burst():
+    """Test that several config edits in a row are written to disk once."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        mock_service = Mock()
+        mock_service.config_path = Path(temp_dir) / "config.yaml"
+        config = RecodeXConfig()
+        
+        with patch("recodex.web.CONFIG_SAVE_DELAY", 0.05), \
+             patch.object(RecodeXConfig, "to_yaml", autospec=True) as to_yaml, \
+             TestClient(WebDashboard(config, mock_service).app) as client:
+            for name in ("One", "Two", "Three"):
+                assert client.post("/api/config/profiles", json={"name": name}).status_code == 200
+            assert to_yaml.call_count == 0
+            
+            time.sleep(0.3)
+            to_yaml.assert_called_once_with(config, mock_service.config_path)
+
+
+def test_watch_folder_updates_by_path():
+    """Test that saving a watch folder with a known path replaces it in place."""
+    mock_service = Mock()
+    mock_service.config_path = None
+    config = RecodeXConfig()
+    client = TestClient(WebDashboard(config, mock_service).app)
+    
+    for path in ("/media/a", "/media/b", "/media/c"):
+        assert client.post("/api/config/watch-folders", json={"path": path, "profile": "balanced"}).status_code == 200
+    assert client.post("/api/config/watch-folders", json={"path": "/media/b", "profile": "small_file"}).status_code == 200
+    assert [(str(f.path), f.profile) for f in config.watch_folders] == [
+        ("/media/a", "balanced"), ("/media/b", "small_file"), ("/media/c", "balanced")
+    ]
+    
+    assert client.delete("/api/config/watch-folders/0").status_code == 200
+    assert client.post("/api/config/watch-folders", json={"path": "/media/c", "profile": "small_file"}).status_code == 200
+    assert [(str(f.path), f.profile) for f in config.watch_folders] == [
+        ("/media/b", "small_file"), ("/media/c", "small_file")
+    ]
+
+
+def test_request_models_reject_unknown_fields():
+    """Test that request bodies with unknown fields are rejected."""
+    mock_service = Mock()
+    mock_service.config_path = None
+    config = RecodeXConfig()
+    client = TestClient(WebDashboard(config, mock_service).app)
+    
+    response = client.post("/api/config/watch-folders", json={"path": "/media/a", "profile": "balanced", "recursve": False})
+    assert response.status_code == 422
+    assert config.watch_folders == []
+    
+    assert client.post("/api/config/watch-folders", json={"path": "/media/a", "profile": "balanced"}).status_code == 200
+    assert client.post("/api/config/watch-folders", json={"path": "/media/b", "profile": "balanced"}).status_code == 200
+    config.watch_folders[0].extensions.append(".ts")
+    assert ".ts" not in config.watch_folders[1].extensions
+
+
+def test_pages_rendered_once():
+    """Test that the HTML pages are rendered on first request and then reused."""
+    dashboard = WebDashboard(RecodeXConfig(), Mock())
+    client = TestClient(dashboard.app)
+    
+    with patch.object(dashboard.templates, "get_template", wraps=dashboard.templates.get_template) as get_template:
+        first = client.get("/")
+        assert first.status_code == 200
+        assert "<title>RecodeX Dashboard</title>" in first.text
+        assert client.get("/").content == first.content
+        assert "<title>RecodeX Configuration</title>" in client.get("/config").text
+        assert get_template.call_count == 2
+
+
+def test_large_responses_gzipped():
+    """Test that large JSON responses are compressed and small ones are not."""
+    mock_service = Mock()
+    mock_service.get_statistics = AsyncMock(return_value={
+        "statistics_by_profile": {f"profile_{i}": {"count": i} for i in range(200)}
+    })
+    mock_service.get_status.return_value = {"service_running": True}
+    client = TestClient(WebDashboard(RecodeXConfig(), mock_service).app)
+    
+    statistics = client.get("/api/statistics", headers={"Accept-Encoding": "gzip"})
+    assert statistics.headers["content-encoding"] == "gzip"
+    assert len(statistics.json()["statistics_by_profile"]) == 200
+    
+    status = client.get("/api/status", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in status.headers
+
+
+def test_active_jobs_rebuilt_only_on_change():
+    """Test that /api/jobs/active reuses its body until the worker signature changes."""
+    mock_service = Mock()
+    mock_service.worker_manager.get_active_jobs_signature.return_value = ((0, 1, 10.0, "running"),)
+    mock_service.worker_manager.get_active_jobs.return_value = [{"worker_id": 0, "progress": 10.0}]
+    client = TestClient(WebDashboard(RecodeXConfig(), mock_service).app)
+    
+    first = client.get("/api/jobs/active")
+    assert first.json() == [{"worker_id": 0, "progress": 10.0}]
+    assert client.get("/api/jobs/active", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert mock_service.worker_manager.get_active_jobs.call_count == 1
+    
+    mock_service.worker_manager.get_active_jobs_signature.return_value = ((0, 1, 20.0, "running"),)
+    mock_service.worker_manager.get_active_jobs.return_value = [{"worker_id": 0, "progress": 20.0}]
+    changed = client.get("/api/jobs/active", headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.json() == [{"worker_id": 0, "progress": 20.0}]